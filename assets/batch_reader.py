@@ -0,0 +1,298 @@
+"""
+Batch mode for get_secret.py.
+
+Terraform starts one get_secret.py process per module instance. In batch mode
+the processes that read with the same role, in the same region and from the
+same calling identity cooperate through a spool directory:
+
+* each process creates a named pipe ``<spool>/responses/<request>`` and
+  drops its secret id into ``<spool>/pending/<request>.json``;
+* whichever process takes the spool lock first becomes the leader. It waits
+  ``window`` seconds for more requests to arrive, fetches all pending ids with
+  secretsmanager:BatchGetSecretValue, up to 20 ids per call, and writes each
+  response into the pipe of its request;
+* the other processes read their response from their pipe.
+
+Values only pass through the pipes, so no secret value is ever written to
+disk. Each leader also removes requests and pipes older than the timeout,
+left behind by processes that were killed.
+
+A process that gets no usable response (the secret failed in the batch call,
+the leader died, the wait timed out) falls back to a regular GetSecretValue,
+which reports errors the same way the non-batch mode does.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from botocore.exceptions import ClientError
+
+import credentials_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# BatchGetSecretValue accepts up to 20 ids in SecretIdList.
+BATCH_SIZE = 20
+DEFAULT_WINDOW = 0.2
+POLL_INTERVAL = 0.02
+DEFAULT_TIMEOUT = 30
+
+LOG = logging.getLogger(__name__)
+
+
+def spool_dir(*key_parts):
+    """
+    Return the spool directory shared by processes with the same key, or None
+    if batch mode isn't available on this system.
+    """
+    directory = credentials_cache.cache_dir()
+    if directory is None or fcntl is None:
+        return None
+
+    path = os.path.join(directory, "batch-" + credentials_cache.cache_key(*key_parts))
+    for sub in ("pending", "responses"):
+        os.makedirs(os.path.join(path, sub), mode=0o700, exist_ok=True)
+    return path
+
+
+def fetch_in_batch(
+    secretsmanager_client,
+    secret_id,
+    spool,
+    fallback,
+    window=DEFAULT_WINDOW,
+    timeout=DEFAULT_TIMEOUT,
+):
+    """
+    Queue a secret id in the spool and return its value once a leader fetched it.
+
+    :param fallback: Callable that reads the secret directly. It's called when
+        the batch didn't produce a value for this request.
+    """
+    request_id = uuid.uuid4().hex
+    pending = os.path.join(spool, "pending")
+    pipe = os.path.join(spool, "responses", request_id)
+    os.mkfifo(pipe, 0o600)
+    reader = os.open(pipe, os.O_RDONLY | os.O_NONBLOCK)
+    # Our own write end keeps reads from seeing end of file before the
+    # leader has written anything.
+    writer = os.open(pipe, os.O_WRONLY | os.O_NONBLOCK)
+    credentials_cache.write_json(pending, request_id, {"SecretId": secret_id})
+
+    received = b""
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline:
+            received += _read_available(reader)
+            response = _parse_response(received)
+            if response is None:
+                with _try_lock(spool) as leader:
+                    if leader:
+                        remove_stale(spool, timeout)
+                        if _is_pending(pending, request_id):
+                            time.sleep(window)
+                            response = serve_pending(
+                                secretsmanager_client, spool, request_id
+                            )
+                        else:
+                            # Empty response if a leader claimed the request
+                            # and exited without answering it.
+                            received += _read_available(reader)
+                            response = _parse_response(received) or {}
+
+            if response is not None:
+                if "SecretString" in response:
+                    return response["SecretString"]
+                break
+
+            time.sleep(POLL_INTERVAL)
+    finally:
+        os.close(reader)
+        os.close(writer)
+        _remove(os.path.join(pending, f"{request_id}.json"))
+        _remove(pipe)
+
+    return fallback()
+
+
+def serve_pending(secretsmanager_client, spool, own_request_id=None):
+    """
+    Fetch the secrets for all pending requests and send their responses.
+
+    Must be called with the spool lock held.
+
+    :param own_request_id: A request of the calling process. Its response is
+        returned instead of sent, the process can't wait for its own pipe.
+    """
+    pending = os.path.join(spool, "pending")
+    responses = os.path.join(spool, "responses")
+
+    requests = {}
+    for name in os.listdir(pending):
+        if not name.endswith(".json"):
+            continue
+        request_id = name[: -len(".json")]
+        request = credentials_cache.read_json(pending, request_id)
+        _remove(os.path.join(pending, name))
+        if request and "SecretId" in request:
+            requests[request_id] = request["SecretId"]
+
+    values = batch_get_secret_values(secretsmanager_client, set(requests.values()))
+    own_response = None
+    for request_id, secret_id in requests.items():
+        response = {}
+        if secret_id in values:
+            response["SecretString"] = values[secret_id]
+        if request_id == own_request_id:
+            own_response = response
+        else:
+            _send(os.path.join(responses, request_id), response)
+    return own_response
+
+
+def remove_stale(spool, max_age=DEFAULT_TIMEOUT):
+    """
+    Remove requests and response pipes older than ``max_age`` seconds. Their
+    processes have given up waiting or were killed.
+    """
+    cutoff = time.time() - max_age
+    for sub in ("pending", "responses"):
+        directory = os.path.join(spool, sub)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.lstat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def batch_get_secret_values(secretsmanager_client, secret_ids):
+    """
+    Read secrets with BatchGetSecretValue, up to ``BATCH_SIZE`` ids per call.
+
+    Returns a dictionary that maps the requested ids to what get_secret() would
+    return for them. Ids missing from the result should be read individually.
+    """
+    secret_ids = sorted(secret_ids)
+    values = {}
+    for i in range(0, len(secret_ids), BATCH_SIZE):
+        chunk = secret_ids[i : i + BATCH_SIZE]
+        try:
+            pages = _batch_get_secret_value_pages(secretsmanager_client, chunk)
+            for page in pages:
+                for secret in page.get("SecretValues", []):
+                    if "SecretString" not in secret:
+                        continue
+                    value = secret["SecretString"]
+                    for secret_id in chunk:
+                        if secret_id in (secret.get("ARN"), secret.get("Name")):
+                            values[secret_id] = "" if value == "NoValue" else value
+                for error in page.get("Errors", []):
+                    if error.get("ErrorCode") == "ResourceNotFoundException":
+                        values[error["SecretId"]] = ""
+        except ClientError as e:
+            # The whole chunk failed, e.g. throttling or no permission for
+            # BatchGetSecretValue. Its ids fall back to individual reads.
+            LOG.warning(
+                "BatchGetSecretValue failed with %s, reading %d secrets one by one",
+                e.response["Error"]["Code"],
+                len(chunk),
+            )
+            continue
+
+    return values
+
+
+def _batch_get_secret_value_pages(secretsmanager_client, secret_ids):
+    kwargs = {"SecretIdList": secret_ids}
+    while True:
+        page = secretsmanager_client.batch_get_secret_value(**kwargs)
+        yield page
+        if not page.get("NextToken"):
+            return
+        kwargs["NextToken"] = page["NextToken"]
+
+
+@contextmanager
+def _try_lock(spool):
+    """
+    Try to take the spool lock without waiting. Yields True if it was taken.
+    """
+    fd = os.open(os.path.join(spool, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+        else:
+            yield True
+    finally:
+        os.close(fd)
+
+
+def _is_pending(pending, request_id):
+    return os.path.exists(os.path.join(pending, f"{request_id}.json"))
+
+
+def _send(pipe, response):
+    """
+    Write the response into the pipe of a request. Nothing happens if the
+    requesting process is gone.
+    """
+    try:
+        fd = os.open(pipe, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        # ENXIO: nobody reads the pipe any more; ENOENT: it was removed.
+        return
+    try:
+        # A large value may not fit into the pipe buffer; wait for the
+        # reader to make room, or for EPIPE if it exits.
+        os.set_blocking(fd, True)
+        data = (json.dumps(response) + "\n").encode()
+        while data:
+            data = data[os.write(fd, data) :]
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _read_available(fd):
+    chunks = []
+    while True:
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            break
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _parse_response(received):
+    """
+    Return the response in what was read from a pipe, or None if it isn't
+    complete yet.
+    """
+    if not received.endswith(b"\n"):
+        return None
+    try:
+        return json.loads(received)
+    except ValueError:
+        return {}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
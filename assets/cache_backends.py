@@ -0,0 +1,323 @@
+"""
+Storage of the secret reader caches.
+
+value_cache.py seals what it stores and keeps the sealed tokens in one of
+these backends:
+
+* ``memory`` keeps them in the process. Useful in long-running programs that
+  import get_secret.py; a one-shot reader run starts with an empty cache.
+* ``file`` keeps one 0600 file per entry in a 0700 directory under the per-user
+  cache directory.
+* ``shared_memory`` keeps all entries in one 0600 POSIX shared memory segment
+  (``/dev/shm``), so they never reach a disk, and are gone after a reboot.
+
+Every backend drops entries older than their TTL and evicts the least recently
+used entries to stay within ``max_entries`` and ``max_bytes``.
+
+Only the standard library is used here.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import credentials_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+BACKENDS = ("memory", "file", "shared_memory")
+DEFAULT_BACKEND = "file"
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+SHM_DIR = "/dev/shm"
+_HEADER = struct.Struct("<I")
+
+
+class MemoryBackend:
+    """
+    Entries in a dictionary of this process.
+    """
+
+    def __init__(
+        self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if _expired(entry, now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["Data"]
+
+    def put(self, key, data, ttl=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = _entry(data, ttl or self.ttl, now)
+            self._entries.move_to_end(key)
+            _evict(self._entries, self.max_entries, self.max_bytes, now)
+
+
+class FileBackend:
+    """
+    One file per entry in a directory. The modification time of a file is the
+    time its entry was last used.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_bytes=DEFAULT_MAX_BYTES,
+        ttl=None,
+    ):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        entry = credentials_cache.read_json(self.directory, key)
+        if entry is None:
+            return None
+        if _expired(entry, now):
+            self._remove(f"{key}.json")
+            return None
+        try:
+            os.utime(os.path.join(self.directory, f"{key}.json"))
+        except OSError:
+            pass
+        return entry.get("Data")
+
+    def put(self, key, data, ttl=None, now=None):
+        now = time.time() if now is None else now
+        credentials_cache.write_json(
+            self.directory, key, _entry(data, ttl or self.ttl, now)
+        )
+        self._evict(now)
+
+    def _evict(self, now):
+        """
+        Stay within the limits: remove expired entries, then the least recently
+        used ones. Entries are only read when the limits are exceeded; below
+        them a put costs one directory scan, and expired entries are removed
+        when they are read.
+        """
+        files = []
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if not item.name.endswith(".json"):
+                    continue
+                try:
+                    st = item.stat()
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, item.name))
+
+        total = sum(size for _, size, _ in files)
+        if len(files) <= self.max_entries and total <= self.max_bytes:
+            return
+
+        live = []
+        for mtime, size, name in files:
+            entry = credentials_cache.read_json(self.directory, name[: -len(".json")])
+            if entry is None or _expired(entry, now):
+                self._remove(name)
+                total -= size
+            else:
+                live.append((mtime, size, name))
+
+        live.sort()
+        while live and (len(live) > self.max_entries or total > self.max_bytes):
+            _, size, name = live.pop(0)
+            total -= size
+            self._remove(name)
+
+    def _remove(self, name):
+        try:
+            os.unlink(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+
+class SharedMemoryBackend:
+    """
+    All entries as one JSON document in a POSIX shared memory segment of
+    ``max_bytes``, locked with flock while it is read or changed.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_bytes=DEFAULT_MAX_BYTES,
+        ttl=None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._segment() as (memory, entries):
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if not _expired(entry, now):
+                entries.move_to_end(key)
+                entry["Used"] = now
+                data = entry["Data"]
+            else:
+                del entries[key]
+                data = None
+            self._store(memory, entries, now)
+            return data
+
+    def put(self, key, data, ttl=None, now=None):
+        now = time.time() if now is None else now
+        with self._segment() as (memory, entries):
+            entries[key] = _entry(data, ttl or self.ttl, now)
+            entries.move_to_end(key)
+            self._store(memory, entries, now)
+
+    @contextmanager
+    def _segment(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            st = os.fstat(fd)
+            if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                raise OSError(f"{self.path} is accessible to other users")
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if st.st_size < self.max_bytes:
+                os.ftruncate(fd, self.max_bytes)
+            with mmap.mmap(fd, 0) as memory:
+                yield memory, self._load(memory)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _load(memory):
+        (length,) = _HEADER.unpack_from(memory)
+        try:
+            document = json.loads(memory[_HEADER.size : _HEADER.size + length])
+        except ValueError:
+            document = []
+        # Stored from least to most recently used.
+        return OrderedDict(
+            (item["Key"], item) for item in document if isinstance(item, dict)
+        )
+
+    def _store(self, memory, entries, now):
+        capacity = min(self.max_bytes, len(memory)) - _HEADER.size
+        _evict(entries, self.max_entries, capacity, now)
+        while True:
+            document = json.dumps(
+                [dict(entry, Key=key) for key, entry in entries.items()]
+            ).encode()
+            if len(document) <= capacity or not entries:
+                break
+            entries.popitem(last=False)
+        _HEADER.pack_into(memory, 0, len(document))
+        memory[_HEADER.size : _HEADER.size + len(document)] = document
+
+
+def open_backend(
+    name=DEFAULT_BACKEND,
+    directory=None,
+    max_entries=None,
+    max_bytes=None,
+    ttl=None,
+):
+    """
+    Return a backend by its name, or None if it can't be used here.
+
+    :param directory: Directory of the file backend.
+    """
+    limits = {
+        "max_entries": max_entries or DEFAULT_MAX_ENTRIES,
+        "max_bytes": max_bytes or DEFAULT_MAX_BYTES,
+        "ttl": ttl,
+    }
+    try:
+        if name == "memory":
+            return MemoryBackend(**limits)
+        if name == "file":
+            return FileBackend(directory, **limits) if directory else None
+        if name == "shared_memory":
+            if not os.path.isdir(SHM_DIR) or not hasattr(os, "getuid"):
+                return None
+            path = os.path.join(SHM_DIR, f"infrahouse-secret-{os.getuid()}")
+            return SharedMemoryBackend(path, **limits)
+    except OSError:
+        return None
+    raise ValueError(f"Unknown cache backend {name!r}")
+
+
+def add_arguments(parser):
+    """
+    Add the cache backend options to an argparse parser.
+    """
+    parser.add_argument(
+        "--cache-backend",
+        choices=BACKENDS,
+        default=DEFAULT_BACKEND,
+        help="Where cached values are kept, sealed. Default: %(default)s.",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        help=f"Most entries in the cache. Default: {DEFAULT_MAX_ENTRIES}.",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        help=f"Most bytes the cache takes. Default: {DEFAULT_MAX_BYTES}.",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        help="Seconds after which a cached value is dropped. Default: no limit.",
+    )
+
+
+def _entry(data, ttl, now):
+    return {"Data": data, "Expires": now + ttl if ttl else None, "Used": now}
+
+
+def _expired(entry, now):
+    expires = entry.get("Expires")
+    return expires is not None and expires <= now
+
+
+def _evict(entries, max_entries, max_bytes, now):
+    """
+    Drop expired entries of an OrderedDict ordered from least to most recently
+    used, then the least recently used ones over the limits.
+    """
+    for key in [key for key, entry in entries.items() if _expired(entry, now)]:
+        del entries[key]
+    total = sum(len(entry["Data"]) for entry in entries.values())
+    while entries and (len(entries) > max_entries or total > max_bytes):
+        _, entry = entries.popitem(last=False)
+        total -= len(entry["Data"])
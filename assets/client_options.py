@@ -0,0 +1,73 @@
+"""
+Command line options that tune the AWS clients of the secret readers.
+
+The module passes var.secret_reader_client_config to the readers as these
+options. They are collected into a plain dictionary, so that they can be sent
+to the daemon as JSON. Options that aren't given keep the defaults of botocore
+(get_secret.py) or of get_secret_lite.py.
+"""
+
+STS_GLOBAL_ENDPOINT = "https://sts.amazonaws.com"
+
+OPTIONS = {
+    # name: (type, help)
+    "retry_mode": (str, "Retry mode of botocore: legacy, standard or adaptive."),
+    "max_attempts": (int, "Maximum number of attempts per request."),
+    "connect_timeout": (float, "Seconds to wait for a connection."),
+    "read_timeout": (float, "Seconds to wait for a response."),
+    "max_pool_connections": (int, "Size of the HTTP connection pool per client."),
+    "secretsmanager_endpoint_url": (str, "Secrets Manager endpoint, e.g. a VPC one."),
+    "sts_endpoint_url": (str, "STS endpoint, e.g. a VPC one."),
+    "rate_limit": (
+        float,
+        "Requests per second per service and region, shared by all readers "
+        "of the user (see rate_limiter.py).",
+    ),
+}
+
+
+def add_arguments(parser):
+    """
+    Add the client options to an argparse parser.
+    """
+    for name, (option_type, help_text) in OPTIONS.items():
+        parser.add_argument(
+            "--" + name.replace("_", "-"), type=option_type, help=help_text
+        )
+    parser.add_argument(
+        "--use-fips-endpoint",
+        action="store_true",
+        default=None,
+        help="Use FIPS endpoints of STS and Secrets Manager.",
+    )
+    parser.add_argument(
+        "--sts-global-endpoint",
+        dest="sts_regional_endpoint",
+        action="store_false",
+        default=None,
+        help="Call STS at sts.amazonaws.com instead of the endpoint in the region.",
+    )
+
+
+def from_args(args):
+    """
+    Return the client options given on the command line as a dictionary.
+    """
+    names = list(OPTIONS) + ["use_fips_endpoint", "sts_regional_endpoint"]
+    return {
+        name: getattr(args, name)
+        for name in names
+        if getattr(args, name, None) is not None
+    }
+
+
+def endpoint_url(options, service):
+    """
+    Return the endpoint URL to use for the service, or None for the default one.
+    """
+    url = options.get(f"{service}_endpoint_url")
+    if url:
+        return url
+    if service == "sts" and options.get("sts_regional_endpoint") is False:
+        return STS_GLOBAL_ENDPOINT
+    return None
@@ -0,0 +1,182 @@
+"""
+On-disk cache of temporary AWS credentials for get_secret.py.
+
+Terraform runs get_secret.py once per module instance, often in parallel.
+Without a cache every run would call sts:AssumeRole on its own. The cache lets
+concurrent runs share one AssumeRole result until the credentials get close
+to expiring.
+
+Only the standard library is used here.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+CACHE_DIR_ENV = "INFRAHOUSE_SECRET_CACHE_DIR"
+
+# Cached credentials that expire sooner than this are treated as expired,
+# so that a long plan doesn't start using credentials that die halfway through.
+EXPIRY_MARGIN = timedelta(minutes=5)
+
+# An access key always belongs to the same identity. Cached identities expire
+# only so that ARNs of long-gone keys don't stay around.
+IDENTITY_TTL = timedelta(hours=12)
+
+
+def cache_dir():
+    """
+    Return the per-user cache directory, creating it if needed.
+
+    The location is ``$INFRAHOUSE_SECRET_CACHE_DIR`` if set, otherwise
+    ``$XDG_CACHE_HOME/infrahouse-secret`` (``~/.cache/infrahouse-secret``).
+    Returns None when the directory can't be used safely: it can't be created,
+    it belongs to another user, or other users can access it.
+    """
+    path = os.environ.get(CACHE_DIR_ENV) or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "infrahouse-secret",
+    )
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    if hasattr(os, "getuid"):
+        if st.st_uid != os.getuid() or st.st_mode & 0o077:
+            return None
+
+    return path
+
+
+def cache_key(*parts):
+    """
+    Build a file-name-safe key from the given parts.
+    """
+    return hashlib.sha256("\n".join(str(p) for p in parts).encode()).hexdigest()
+
+
+@contextmanager
+def locked(directory, key):
+    """
+    Hold an exclusive lock for the given key for the duration of the block.
+
+    Processes that want the same key wait for each other, so only the first
+    of them does the expensive work and the others find its result in the cache.
+    Without fcntl (Windows) the block runs unlocked.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = os.open(os.path.join(directory, f"{key}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def read_json(directory, key):
+    """
+    Return the JSON document stored under the key or None if there isn't a valid one.
+    """
+    try:
+        with open(os.path.join(directory, f"{key}.json")) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(directory, key, document):
+    """
+    Atomically store a JSON document under the key, readable by the owner only.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{key}.")
+    try:
+        with os.fdopen(fd, "w") as fp:
+            json.dump(document, fp)
+        os.replace(tmp_path, os.path.join(directory, f"{key}.json"))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_credentials(directory, key, now=None):
+    """
+    Return cached STS credentials if they are still valid for at least
+    ``EXPIRY_MARGIN``, otherwise None.
+
+    The result has the shape of the ``Credentials`` element of an
+    sts:AssumeRole response, with ``Expiration`` as an ISO 8601 string.
+    """
+    credentials = read_json(directory, key)
+    if not credentials:
+        return None
+    try:
+        # STS XML responses end with "Z", which fromisoformat() accepts
+        # only since Python 3.11.
+        expiration = datetime.fromisoformat(
+            credentials["Expiration"].replace("Z", "+00:00")
+        )
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    if expiration - EXPIRY_MARGIN <= now:
+        return None
+
+    return credentials
+
+
+def save_credentials(directory, key, credentials):
+    """
+    Store the ``Credentials`` element of an sts:AssumeRole response.
+    """
+    expiration = credentials["Expiration"]
+    write_json(
+        directory,
+        key,
+        {
+            "AccessKeyId": credentials["AccessKeyId"],
+            "SecretAccessKey": credentials["SecretAccessKey"],
+            "SessionToken": credentials["SessionToken"],
+            "Expiration": (
+                expiration.isoformat()
+                if isinstance(expiration, datetime)
+                else expiration
+            ),
+        },
+    )
+
+
+def load_identity(directory, access_key, now=None):
+    """
+    Return the cached ARN of the identity that owns the access key, or None.
+    """
+    identity = load_credentials(directory, cache_key("identity", access_key), now)
+    return identity.get("Arn") if identity else None
+
+
+def save_identity(directory, access_key, arn, now=None):
+    """
+    Remember the ARN sts:GetCallerIdentity returned for the access key.
+    """
+    now = now or datetime.now(timezone.utc)
+    write_json(
+        directory,
+        cache_key("identity", access_key),
+        {"Arn": arn, "Expiration": (now + IDENTITY_TTL).isoformat()},
+    )
@@ -1,11 +1,35 @@
+"""
+Read a secret value for the external data source of the module.
+
+The module runs this file as a script. Other programs can import it and call
+read_secret(), or get_client() and get_secret(); boto3 sessions and Secrets
+Manager clients are then shared within the process (see ClientRegistry), so
+reading many secrets builds each client once.
+"""
+
+import argparse
 import json
-import sys
+import os
+import threading
+from datetime import datetime, timezone
 
-import boto3
+# boto3 is imported in the functions that use it: it takes a few hundred
+# milliseconds, and runs answered by the daemon (--daemon) don't need it.
 from botocore.exceptions import ClientError
 
+import batch_reader
+import cache_backends
+import client_options
+import credentials_cache
+import plan_memo
+import rate_limiter
+import secret_daemon
+import timing
+
 
-def get_secret(secretsmanager_client, secret_id):
+def get_secret(
+    secretsmanager_client, secret_id, cache=None, version_id=None, version_stage=None
+):
     """
     Retrieve a value of a secret by its name.
 
@@ -13,14 +37,41 @@ def get_secret(secretsmanager_client, secret_id):
     value "NoValue" (indicating secret_value input was null and no external value
     has been set yet). Terraform output converts empty string to null.
 
+    With a ValueCache (see value_cache.py), the version is looked up with
+    DescribeSecret first, unless version_id is given, and GetSecretValue is
+    called only if the cache doesn't have that version.
+
+    :param version_id: Read this version instead of the AWSCURRENT one.
+    :param version_stage: Read the version with this staging label.
+
     Note: Terraform external data source requires all values to be strings,
     so we cannot return None/null directly.
     """
+    selector = {}
+    if version_id:
+        selector["VersionId"] = version_id
+    if version_stage:
+        selector["VersionStage"] = version_stage
+
     try:
-        response = secretsmanager_client.get_secret_value(
-            SecretId=secret_id,
-        )
-        value = response["SecretString"]
+        value = None
+        if cache is not None:
+            if not version_id:
+                version_id = get_current_version_id(
+                    secretsmanager_client, secret_id, version_stage or "AWSCURRENT"
+                )
+            if version_id:
+                value = cache.get(secret_id, version_id)
+
+        if value is None:
+            with timing.phase("get_secret_value"):
+                response = secretsmanager_client.get_secret_value(
+                    SecretId=secret_id, **selector
+                )
+            value = response["SecretString"]
+            if cache is not None:
+                cache.put(secret_id, response["VersionId"], value)
+
         # Return empty string for placeholder - Terraform output converts to null
         if value == "NoValue":
             return ""
@@ -31,12 +82,288 @@ def get_secret(secretsmanager_client, secret_id):
         raise
 
 
-def get_client(region, role_arn):
-    sts = boto3.client("sts")
+def get_current_version_id(
+    secretsmanager_client, secret_id, version_stage="AWSCURRENT"
+):
+    """
+    Return the id of the version of the secret with the staging label,
+    AWSCURRENT by default, or None if no version has it.
+    """
+    with timing.phase("describe_secret"):
+        response = secretsmanager_client.describe_secret(SecretId=secret_id)
+    for version_id, stages in response.get("VersionIdsToStages", {}).items():
+        if version_stage in stages:
+            return version_id
+    return None
+
+
+def get_version_fingerprint(secretsmanager_client, secret_id):
+    """
+    Return the id of the AWSCURRENT version of the secret: it changes whenever
+    the value does. Returns empty string if the secret doesn't exist or has no
+    value yet.
+
+    Only DescribeSecret is called, so the value is neither downloaded nor
+    decrypted.
+    """
+    try:
+        return get_current_version_id(secretsmanager_client, secret_id) or ""
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ResourceNotFoundException":
+            return ""
+        raise
+
+
+def get_value_cache(role_arn, backend="file", **limits):
+    """
+    Return a ValueCache for reads as the role, or None if values can't be
+    cached here. See value_cache.py.
+
+    :param role_arn: The role the values are read as. Values cached for
+        one role are never answered to another.
+
+    :param backend: Name of the cache backend, see cache_backends.py.
+    :param limits: max_entries, max_bytes and ttl of the backend.
+    """
+    directory = credentials_cache.cache_dir()
+    if directory is None:
+        return None
+
+    # Imported here: trying to import cryptography takes time that readers
+    # without --value-cache shouldn't spend.
+    import value_cache
+
+    storage = cache_backends.open_backend(
+        backend, directory=os.path.join(directory, value_cache.VALUES_DIR), **limits
+    )
+    if storage is None:
+        return None
+    return value_cache.open_cache(directory, backend=storage, identity=role_arn)
+
+
+def read_secret(region, secret_id, role_arn, use_cache=True, options=None):
+    """
+    Return the value of the secret read as the given role, like the script
+    prints it: empty string if the secret has no value.
+    """
+    return get_secret(
+        get_client(region, role_arn, use_cache=use_cache, options=options), secret_id
+    )
+
+
+def get_client(region, role_arn, use_cache=True, options=None):
+    """
+    Return a Secrets Manager client that acts as the given role.
+
+    With use_cache, the client is taken from the process-wide CLIENTS registry.
+    Without it, credentials and client are made anew on every call.
+
+    :param options: Client options, see client_options.py.
+    """
+    if use_cache:
+        return CLIENTS.get(region, role_arn, options=options)
+
+    return client_from_credentials(
+        region,
+        get_credentials(region, role_arn, use_cache=False, options=options),
+        options=options,
+    )
+
+
+class ClientRegistry:
+    """
+    Secrets Manager clients by region, role, source of credentials, AWS_*
+    environment and client options.
+
+    A client made from assumed-role credentials is replaced when the
+    credentials get close to expiring, so a long-running process can keep
+    asking for clients.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, region, role_arn, use_cache=True, options=None):
+        key = (
+            region,
+            role_arn,
+            use_cache,
+            json.dumps(options, sort_keys=True),
+            aws_environment(),
+            get_source_identity(region),
+        )
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            client, expiration = self._clients.get(key, (None, None))
+            if client is None or (
+                expiration and expiration - credentials_cache.EXPIRY_MARGIN <= now
+            ):
+                credentials = get_credentials(
+                    region, role_arn, use_cache=use_cache, options=options
+                )
+                client = client_from_credentials(region, credentials, options=options)
+                expiration = credentials_expiration(credentials)
+                self._clients[key] = (client, expiration)
+
+        return client
+
+
+CLIENTS = ClientRegistry()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def default_session(region):
+    """
+    Return a boto3 session in the region with the default credentials.
+
+    Creating a session loads botocore's data files, so sessions are shared
+    within the process, as long as the AWS_* environment variables stay the same.
+    """
+    boto3 = _import_boto3()
+    key = (region, aws_environment())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = boto3.Session(region_name=region)
+    return session
+
+
+def _import_boto3():
+    # The first import is the boto3_import phase; later ones cost nothing.
+    with timing.phase("boto3_import"):
+        import boto3
+    return boto3
+
+
+def aws_environment():
+    """
+    Return the AWS_* environment variables, which decide what a default
+    session talks to and as whom.
+    """
+    return tuple(
+        sorted(
+            (name, value)
+            for name, value in os.environ.items()
+            if name.startswith("AWS_")
+        )
+    )
+
+
+def credentials_expiration(credentials):
+    """
+    Return when the credentials expire as a datetime, or None for the default ones.
+    """
+    if not credentials:
+        return None
+    expiration = credentials["Expiration"]
+    if isinstance(expiration, datetime):
+        return expiration
+    return datetime.fromisoformat(expiration.replace("Z", "+00:00"))
+
+
+def get_credentials(region, role_arn, use_cache=True, options=None):
+    """
+    Return credentials of the given role, or None if the current session
+    already uses it.
+
+    Credentials of the assumed role are cached on disk (see credentials_cache.py)
+    keyed by the role, the region and the access key of the calling identity,
+    so concurrent runs share one sts:AssumeRole result until it nears expiry.
+    """
+    directory = credentials_cache.cache_dir() if use_cache else None
+    if directory is None:
+        return get_role_credentials(
+            role_arn, use_cache=False, region=region, options=options
+        )
+
+    key = credentials_cache.cache_key(role_arn, region, get_source_identity(region))
+    with credentials_cache.locked(directory, key):
+        credentials = credentials_cache.load_credentials(directory, key)
+        if credentials is None:
+            credentials = get_role_credentials(role_arn, region=region, options=options)
+            if credentials:
+                credentials_cache.save_credentials(directory, key, credentials)
+
+    return credentials
+
+
+def get_secret_in_batch(
+    secretsmanager_client,
+    secret_id,
+    region,
+    role_arn,
+    window=batch_reader.DEFAULT_WINDOW,
+):
+    """
+    Retrieve a value of a secret like get_secret() does, but together with other
+    get_secret.py processes that read secrets in the same region as the same role.
+    See batch_reader.py for how the processes cooperate.
+    """
+
+    def fallback():
+        return get_secret(secretsmanager_client, secret_id)
+
+    spool = batch_reader.spool_dir(region, role_arn, get_source_identity(region))
+    if spool is None:
+        return fallback()
+
+    return batch_reader.fetch_in_batch(
+        secretsmanager_client,
+        secret_id,
+        spool,
+        fallback,
+        window=window,
+    )
+
+
+def get_source_identity(region):
+    """
+    Return the access key ID of the default credentials without calling AWS.
+
+    It identifies the calling identity in cache keys.
+    """
+    credentials = default_session(region).get_credentials()
+    return credentials.access_key if credentials else None
+
+
+def get_caller_arn(session, sts, use_cache=True):
+    """
+    Return the ARN of the identity behind the session.
+
+    The ARN is remembered per access key in the cache directory, so only the
+    first run with new credentials calls sts:GetCallerIdentity.
+    """
+    directory = credentials_cache.cache_dir() if use_cache else None
+    credentials = session.get_credentials() if directory else None
+    if credentials is None:
+        with timing.phase("get_caller_identity"):
+            return sts.get_caller_identity()["Arn"]
+
+    access_key = credentials.access_key
+    current_arn = credentials_cache.load_identity(directory, access_key)
+    if current_arn is None:
+        with timing.phase("get_caller_identity"):
+            current_arn = sts.get_caller_identity()["Arn"]
+        credentials_cache.save_identity(directory, access_key, current_arn)
+    return current_arn
+
+
+def get_role_credentials(role_arn, use_cache=True, region=None, options=None):
+    """
+    Assume the role and return the ``Credentials`` element of the response.
+
+    Returns None if the current session already uses the role.
+    STS is called in the given region unless the options say otherwise.
+    """
+    with timing.phase("sts_client"):
+        session = default_session(region)
+        sts = make_client(session, "sts", options)
 
     # Get current caller identity to check if we're already using the target role
-    caller_identity = sts.get_caller_identity()
-    current_arn = caller_identity["Arn"]
+    current_arn = get_caller_arn(session, sts, use_cache=use_cache)
 
     # Extract role name from the target role ARN
     # Format: arn:aws:iam::{account}:role/{path}/{role-name}
@@ -52,31 +379,233 @@ def get_client(region, role_arn):
     # - Any scenario where re-assuming the same role is unnecessary
     if f"assumed-role/{target_role_name}/" in current_arn:
         # Already using the target role, use current session
-        session = boto3.Session(region_name=region)
-        return session.client("secretsmanager")
+        return None
 
     # Different role - need to assume it (existing behavior)
-    iam_role = sts.assume_role(
-        RoleArn=role_arn, RoleSessionName="terraform-aws-secret-data-source"
+    with timing.phase("assume_role"):
+        iam_role = sts.assume_role(
+            RoleArn=role_arn, RoleSessionName="terraform-aws-secret-data-source"
+        )
+    return iam_role["Credentials"]
+
+
+def client_from_credentials(region, credentials, options=None):
+    """
+    Return a Secrets Manager client that uses the given credentials,
+    or the default ones if they are None.
+    """
+    boto3 = _import_boto3()
+    with timing.phase("secretsmanager_client"):
+        if credentials is None:
+            session = default_session(region)
+        else:
+            session = boto3.Session(
+                region_name=region,
+                aws_access_key_id=credentials["AccessKeyId"],
+                aws_secret_access_key=credentials["SecretAccessKey"],
+                aws_session_token=credentials["SessionToken"],
+            )
+        return make_client(session, "secretsmanager", options)
+
+
+def make_client(session, service, options=None):
+    """
+    Create a client of the service in the session's region, configured with
+    the client options (see client_options.py).
+    """
+    from botocore.config import Config
+
+    region, endpoint_url, config = client_settings(
+        service, session.region_name, options
     )
-    session = boto3.Session(
+    client = session.client(
+        service,
         region_name=region,
-        aws_access_key_id=iam_role["Credentials"]["AccessKeyId"],
-        aws_secret_access_key=iam_role["Credentials"]["SecretAccessKey"],
-        aws_session_token=iam_role["Credentials"]["SessionToken"],
+        endpoint_url=endpoint_url,
+        config=Config(**config),
     )
-    return session.client("secretsmanager")
+    if options and options.get("rate_limit"):
+        rate_limiter.attach(client, options["rate_limit"])
+    return client
 
 
-if __name__ == "__main__":
+def client_settings(service, region, options=None):
+    """
+    Return the region, the endpoint URL and the botocore Config arguments
+    of a client of the service, following the client options.
+    """
+    options = options or {}
+    config = {
+        name: options[name]
+        for name in (
+            "connect_timeout",
+            "read_timeout",
+            "max_pool_connections",
+            "use_fips_endpoint",
+        )
+        if options.get(name) is not None
+    }
+    retries = {
+        key: options[name]
+        for key, name in (
+            ("mode", "retry_mode"),
+            # Counts the first attempt too, like AWS_MAX_ATTEMPTS.
+            ("total_max_attempts", "max_attempts"),
+        )
+        if options.get(name) is not None
+    }
+    if retries:
+        config["retries"] = retries
 
-    print(
-        json.dumps(
-            {
-                "SECRET_VALUE": get_secret(
-                    get_client(region=sys.argv[1], role_arn=sys.argv[3]),
-                    secret_id=sys.argv[2],
-                )
-            }
+    endpoint_url = client_options.endpoint_url(options, service)
+    if endpoint_url == client_options.STS_GLOBAL_ENDPOINT:
+        region = "us-east-1"
+
+    return region, endpoint_url, config
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Print the current value of a secret for the external data source."
+    )
+    parser.add_argument("region")
+    parser.add_argument("secret_id")
+    parser.add_argument("role_arn")
+    parser.add_argument(
+        "--no-credentials-cache",
+        dest="credentials_cache",
+        action="store_false",
+        help="Always call STS instead of reusing cached assumed-role credentials.",
+    )
+    parser.add_argument(
+        "--value-cache",
+        action="store_true",
+        help="Keep the last value of the secret, encrypted, and download it again "
+        "only when its AWSCURRENT version changes. Needs the cryptography package.",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Print the id of the AWSCURRENT version as SECRET_VERSION_ID "
+        "instead of the value.",
+    )
+    client_options.add_arguments(parser)
+    plan_memo.add_arguments(parser)
+    cache_backends.add_arguments(parser)
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Read the secret through a background daemon (see secret_daemon.py), "
+        "starting one if it isn't running.",
+    )
+    parser.add_argument(
+        "--daemon-idle-timeout",
+        type=float,
+        default=secret_daemon.DEFAULT_IDLE_TIMEOUT,
+        help="Seconds without requests before a started daemon exits. "
+        "Default: %(default)s.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read the secret with BatchGetSecretValue together with other "
+        "get_secret.py processes.",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=batch_reader.DEFAULT_WINDOW,
+        help="Seconds the batch leader waits for more requests. "
+        "Default: %(default)s.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    timing.start("get_secret.py")
+    args = parse_args(argv)
+    options = client_options.from_args(args)
+    if args.fingerprint:
+        credentials = get_credentials(
+            args.region,
+            args.role_arn,
+            use_cache=args.credentials_cache,
+            options=options,
+        )
+        client = client_from_credentials(args.region, credentials, options=options)
+        version_id = get_version_fingerprint(client, args.secret_id)
+        with timing.phase("json_serialization"):
+            print(json.dumps({"SECRET_VERSION_ID": version_id}))
+        return
+
+    memo = None
+    if args.memo_ttl:
+        memo = plan_memo.open_memo(
+            args.cache_backend,
+            max_entries=args.cache_max_entries,
+            max_bytes=args.cache_max_bytes,
         )
+    value = plan_memo.memoized(
+        plan_memo.memo_key(
+            args.region, args.secret_id, args.role_arn, scope=args.memo_scope
+        ),
+        args.memo_ttl,
+        lambda: read_value(args, options),
+        memo,
     )
+
+    with timing.phase("json_serialization"):
+        print(json.dumps({"SECRET_VALUE": value}))
+
+
+def read_value(args, options):
+    """
+    Read the secret the way the command line asks for.
+    """
+    if args.daemon:
+        value = secret_daemon.fetch(
+            args.region,
+            args.secret_id,
+            args.role_arn,
+            use_cache=args.credentials_cache,
+            idle_timeout=args.daemon_idle_timeout,
+            options=options,
+        )
+        if value is not None:
+            return value
+
+    credentials = get_credentials(
+        args.region,
+        args.role_arn,
+        use_cache=args.credentials_cache,
+        options=options,
+    )
+    client = client_from_credentials(args.region, credentials, options=options)
+    if args.batch:
+        return get_secret_in_batch(
+            client,
+            args.secret_id,
+            region=args.region,
+            role_arn=args.role_arn,
+            window=args.batch_window,
+        )
+
+    return get_secret(
+        client,
+        secret_id=args.secret_id,
+        cache=(
+            get_value_cache(
+                args.role_arn,
+                args.cache_backend,
+                max_entries=args.cache_max_entries,
+                max_bytes=args.cache_max_bytes,
+                ttl=args.cache_ttl,
+            )
+            if args.value_cache
+            else None
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
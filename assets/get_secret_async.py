@@ -0,0 +1,163 @@
+"""
+asyncio variant of get_secret() and get_client() from get_secret.py.
+
+For services and tools that read many secrets concurrently on one event loop.
+Values follow the same rules as the script: a secret without a value ("NoValue")
+or a missing secret reads as an empty string.
+
+    async with ClientPool() as pool:
+        values = await read_secrets(pool, "us-west-2", role_arn, secret_ids)
+
+ClientPool.get() takes the place of get_client(). The pool keeps one
+aiobotocore client, and with it one pool of HTTP connections, per region,
+role and client options. Assumed-role credentials
+come from get_secret.get_credentials() in a worker thread, so they share the
+on-disk credentials cache with the script. Needs the aiobotocore package.
+"""
+
+import asyncio
+import json
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+import credentials_cache
+import get_secret as sync_reader
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:
+    get_session = None
+
+DEFAULT_POOL_SIZE = 50
+DEFAULT_CONCURRENCY = 50
+
+
+async def get_secret(secretsmanager_client, secret_id):
+    """
+    Retrieve a value of a secret by its name, like get_secret.get_secret().
+
+    Returns empty string if the secret doesn't exist or contains the placeholder
+    value "NoValue".
+    """
+    try:
+        response = await secretsmanager_client.get_secret_value(SecretId=secret_id)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ResourceNotFoundException":
+            return ""
+        raise
+
+    value = response["SecretString"]
+    if value == "NoValue":
+        return ""
+    return value
+
+
+async def read_secrets(
+    pool, region, role_arn, secret_ids, concurrency=DEFAULT_CONCURRENCY, options=None
+):
+    """
+    Read the secrets as the role, at most ``concurrency`` at a time, and return
+    their values by secret id.
+    """
+    client = await pool.get(region, role_arn, options=options)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def read(secret_id):
+        async with semaphore:
+            return await get_secret(client, secret_id)
+
+    secret_ids = list(secret_ids)
+    values = await asyncio.gather(*(read(secret_id) for secret_id in secret_ids))
+    return dict(zip(secret_ids, values))
+
+
+class ClientPool:
+    """
+    Async Secrets Manager clients by region, role and client options.
+
+    Each client has its own pool of up to ``pool_size`` HTTP connections,
+    unless the client options set max_pool_connections. A client made from
+    assumed-role credentials is replaced when the credentials get close to
+    expiring, and the replaced client is closed then, so requests still
+    running on it fail. Other clients are closed when the pool is.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, use_cache=True):
+        if get_session is None:
+            raise RuntimeError("get_secret_async.py needs the aiobotocore package.")
+
+        self._pool_size = pool_size
+        self._use_cache = use_cache
+        self._session = get_session()
+        # key: (client, credentials expiration, exit stack of the client)
+        self._clients = {}
+        self._locks = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for _, _, exit_stack in clients.values():
+            await exit_stack.aclose()
+
+    async def get(self, region, role_arn, options=None):
+        """
+        Return the client for the region and role, creating it if needed.
+        """
+        key = (region, role_arn, json.dumps(options, sort_keys=True))
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            client, expiration, exit_stack = self._clients.get(key, (None, None, None))
+            now = datetime.now(timezone.utc)
+            if client is None or (
+                expiration and expiration - credentials_cache.EXPIRY_MARGIN <= now
+            ):
+                credentials = await asyncio.to_thread(
+                    sync_reader.get_credentials,
+                    region,
+                    role_arn,
+                    use_cache=self._use_cache,
+                    options=options,
+                )
+                new_exit_stack = AsyncExitStack()
+                client = await self._create_client(
+                    region, credentials, options, new_exit_stack
+                )
+                self._clients[key] = (
+                    client,
+                    sync_reader.credentials_expiration(credentials),
+                    new_exit_stack,
+                )
+                if exit_stack is not None:
+                    # The replaced client and its connection pool.
+                    await exit_stack.aclose()
+
+        return client
+
+    async def _create_client(self, region, credentials, options, exit_stack):
+        region, endpoint_url, config = sync_reader.client_settings(
+            "secretsmanager", region, options
+        )
+        config.setdefault("max_pool_connections", self._pool_size)
+        keys = {}
+        if credentials is not None:
+            keys = {
+                "aws_access_key_id": credentials["AccessKeyId"],
+                "aws_secret_access_key": credentials["SecretAccessKey"],
+                "aws_session_token": credentials["SessionToken"],
+            }
+        return await exit_stack.enter_async_context(
+            self._session.create_client(
+                "secretsmanager",
+                region_name=region,
+                endpoint_url=endpoint_url,
+                config=AioConfig(**config),
+                **keys,
+            )
+        )
@@ -0,0 +1,638 @@
+"""
+Variant of get_secret.py that uses only the Python standard library.
+
+Importing boto3 and botocore takes a few hundred milliseconds, and Terraform
+starts the reader once per module instance. This script signs the few STS and
+Secrets Manager requests it needs with its own Signature Version 4
+implementation and talks to AWS with urllib.
+
+It takes the same arguments and prints the same JSON as get_secret.py, and it
+shares the credentials cache with it. It understands credentials from
+environment variables, static keys in the shared credentials/config files,
+the ECS container endpoint and the EC2 instance metadata service. When the
+credentials come from anywhere else (SSO, credential_process, web identity,
+role profiles), it hands the request over to get_secret.py.
+"""
+
+import argparse
+import configparser
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+import cache_backends
+import client_options
+import credentials_cache
+import plan_memo
+import rate_limiter
+import secret_daemon
+import timing
+
+HTTP_TIMEOUT = 30
+IMDS_TIMEOUT = 1
+IMDS_URL = "http://169.254.169.254"
+ECS_URL = "http://169.254.170.2"
+STS_VERSION = "2011-06-15"
+# Attempts of a throttled request, unless the max_attempts client option is set.
+THROTTLE_ATTEMPTS = 3
+
+# Environment variables that override service endpoints, as in botocore.
+ENDPOINT_ENV = {
+    "secretsmanager": "AWS_ENDPOINT_URL_SECRETS_MANAGER",
+    "sts": "AWS_ENDPOINT_URL_STS",
+}
+
+
+class AWSError(Exception):
+    """
+    Error response from an AWS API.
+    """
+
+    def __init__(self, code, message, status=None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+def get_secret(credentials, region, secret_id, options=None):
+    """
+    Retrieve a value of a secret by its name.
+
+    Same semantics as get_secret.get_secret(): returns empty string if the secret
+    doesn't exist or contains the placeholder value "NoValue".
+    """
+    try:
+        with timing.phase("get_secret_value"):
+            response = call_secretsmanager(
+                credentials, region, "GetSecretValue", {"SecretId": secret_id}, options
+            )
+    except AWSError as err:
+        if err.code == "ResourceNotFoundException":
+            return ""
+        raise
+
+    value = response["SecretString"]
+    if value == "NoValue":
+        return ""
+    return value
+
+
+def get_version_fingerprint(credentials, region, secret_id, options=None):
+    """
+    Return the id of the AWSCURRENT version of the secret, like
+    get_secret.get_version_fingerprint().
+    """
+    try:
+        with timing.phase("describe_secret"):
+            response = call_secretsmanager(
+                credentials, region, "DescribeSecret", {"SecretId": secret_id}, options
+            )
+    except AWSError as err:
+        if err.code == "ResourceNotFoundException":
+            return ""
+        raise
+
+    for version_id, stages in response.get("VersionIdsToStages", {}).items():
+        if "AWSCURRENT" in stages:
+            return version_id
+    return ""
+
+
+def get_credentials(region, role_arn, use_cache=True, options=None):
+    """
+    Return credentials of the given role, reusing the credentials cache of
+    get_secret.py. Returns None if the default credentials can't be resolved
+    without botocore.
+    """
+    source = resolve_credentials()
+    if source is None:
+        return None
+
+    directory = credentials_cache.cache_dir() if use_cache else None
+    if directory is None:
+        return get_role_credentials(source, region, role_arn, options=options) or source
+
+    key = credentials_cache.cache_key(role_arn, region, source["AccessKeyId"])
+    with credentials_cache.locked(directory, key):
+        credentials = credentials_cache.load_credentials(directory, key)
+        if credentials is None:
+            credentials = get_role_credentials(
+                source, region, role_arn, directory, options
+            )
+            if credentials:
+                credentials_cache.save_credentials(directory, key, credentials)
+
+    return credentials or source
+
+
+def get_role_credentials(source, region, role_arn, directory=None, options=None):
+    """
+    Assume the role and return its credentials.
+
+    Returns None if the source credentials already belong to the role.
+    With a cache directory, the identity of the source credentials is looked up
+    there before calling sts:GetCallerIdentity.
+    """
+    access_key = source["AccessKeyId"]
+    current_arn = directory and credentials_cache.load_identity(directory, access_key)
+    if not current_arn:
+        with timing.phase("get_caller_identity"):
+            current_arn = _xml_text(
+                call_sts(source, region, "GetCallerIdentity", {}, options), "Arn"
+            )
+        if directory:
+            credentials_cache.save_identity(directory, access_key, current_arn)
+
+    if f"assumed-role/{role_arn.split('/')[-1]}/" in current_arn:
+        return None
+
+    with timing.phase("assume_role"):
+        response = call_sts(
+            source,
+            region,
+            "AssumeRole",
+            {
+                "RoleArn": role_arn,
+                "RoleSessionName": "terraform-aws-secret-data-source",
+            },
+            options,
+        )
+    return {
+        name: _xml_text(response, name)
+        for name in ("AccessKeyId", "SecretAccessKey", "SessionToken", "Expiration")
+    }
+
+
+def call_secretsmanager(credentials, region, action, params, options=None):
+    """
+    Call a Secrets Manager API action and return the decoded JSON response.
+    """
+    body = json.dumps(params).encode()
+    response = _request(
+        credentials,
+        region,
+        "secretsmanager",
+        action,
+        body,
+        {
+            "Content-Type": "application/x-amz-json-1.1",
+            "X-Amz-Target": f"secretsmanager.{action}",
+        },
+        options,
+    )
+    return json.loads(response)
+
+
+def call_sts(credentials, region, action, params, options=None):
+    """
+    Call an STS API action and return the parsed XML response.
+    """
+    body = urllib.parse.urlencode(
+        {"Action": action, "Version": STS_VERSION, **params}
+    ).encode()
+    response = _request(
+        credentials,
+        region,
+        "sts",
+        action,
+        body,
+        {"Content-Type": "application/x-www-form-urlencoded; charset=utf-8"},
+        options,
+    )
+    return ET.fromstring(response)
+
+
+def endpoint_url(service, region, options=None):
+    """
+    Return the endpoint of the service: the one from the client options or
+    AWS_ENDPOINT_URL_* if given, otherwise the (FIPS) endpoint in the region.
+    """
+    options = options or {}
+    override = (
+        client_options.endpoint_url(options, service)
+        or os.environ.get(ENDPOINT_ENV[service])
+        or os.environ.get("AWS_ENDPOINT_URL")
+    )
+    if override:
+        return override.rstrip("/") + "/"
+
+    host = f"{service}-fips" if options.get("use_fips_endpoint") else service
+    suffix = "amazonaws.com.cn" if region.startswith("cn-") else "amazonaws.com"
+    return f"https://{host}.{region}.{suffix}/"
+
+
+def sign(method, url, headers, body, credentials, region, service, now=None):
+    """
+    Return the headers with a Signature Version 4 Authorization header added.
+    """
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    parsed = urllib.parse.urlsplit(url)
+
+    headers = dict(headers)
+    headers["Host"] = parsed.netloc
+    headers["X-Amz-Date"] = amz_date
+    if credentials.get("SessionToken"):
+        headers["X-Amz-Security-Token"] = credentials["SessionToken"]
+
+    canonical_headers = {
+        name.lower(): " ".join(str(value).split()) for name, value in headers.items()
+    }
+    signed_headers = ";".join(sorted(canonical_headers))
+    canonical_query = "&".join(
+        f"{_quote(k)}={_quote(v)}"
+        for k, v in sorted(urllib.parse.parse_qsl(parsed.query, True))
+    )
+    canonical_request = "\n".join(
+        [
+            method,
+            _quote(parsed.path or "/", safe="/"),
+            canonical_query,
+            "".join(f"{k}:{canonical_headers[k]}\n" for k in sorted(canonical_headers)),
+            signed_headers,
+            hashlib.sha256(body).hexdigest(),
+        ]
+    )
+    string_to_sign = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+
+    key = ("AWS4" + credentials["SecretAccessKey"]).encode()
+    for part in (amz_date[:8], region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    headers["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={credentials['AccessKeyId']}/{scope}, "
+        f"SignedHeaders={signed_headers}, Signature={signature}"
+    )
+    return headers
+
+
+def resolve_credentials():
+    """
+    Find the default AWS credentials the way botocore would, for the sources
+    that don't need botocore. Returns None if there are none of those.
+
+    The result has the shape of the ``Credentials`` element of sts:AssumeRole.
+    """
+    if os.environ.get("AWS_ACCESS_KEY_ID") and os.environ.get("AWS_SECRET_ACCESS_KEY"):
+        return _credentials(
+            os.environ["AWS_ACCESS_KEY_ID"],
+            os.environ["AWS_SECRET_ACCESS_KEY"],
+            os.environ.get("AWS_SESSION_TOKEN"),
+        )
+
+    profile = os.environ.get("AWS_PROFILE") or os.environ.get(
+        "AWS_DEFAULT_PROFILE", "default"
+    )
+    shared = _profile_credentials(profile)
+    if shared is not False:
+        return shared
+
+    if os.environ.get("AWS_CONTAINER_CREDENTIALS_RELATIVE_URI") or os.environ.get(
+        "AWS_CONTAINER_CREDENTIALS_FULL_URI"
+    ):
+        return _container_credentials()
+
+    if os.environ.get("AWS_EC2_METADATA_DISABLED", "").lower() != "true":
+        return _instance_credentials()
+
+    return None
+
+
+def _profile_credentials(profile):
+    """
+    Return static keys of the profile, None if the profile exists but needs
+    botocore, or False if the shared files don't mention it.
+    """
+    files = [
+        (
+            os.environ.get("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials"),
+            profile,
+        ),
+        (
+            os.environ.get("AWS_CONFIG_FILE", "~/.aws/config"),
+            profile if profile == "default" else f"profile {profile}",
+        ),
+    ]
+    found = False
+    for path, section in files:
+        config = configparser.RawConfigParser()
+        try:
+            config.read(os.path.expanduser(path))
+        except configparser.Error:
+            return None
+        if not config.has_section(section):
+            continue
+
+        found = True
+        options = config[section]
+        if "aws_access_key_id" in options and "aws_secret_access_key" in options:
+            return _credentials(
+                options["aws_access_key_id"],
+                options["aws_secret_access_key"],
+                options.get("aws_session_token"),
+            )
+        if any(
+            option in options
+            for option in (
+                "role_arn",
+                "source_profile",
+                "credential_process",
+                "sso_session",
+                "sso_start_url",
+                "web_identity_token_file",
+            )
+        ):
+            return None
+
+    # A profile was named explicitly but has no keys: let botocore explain.
+    if found or profile != "default":
+        return None
+    return False
+
+
+def _container_credentials():
+    url = os.environ.get("AWS_CONTAINER_CREDENTIALS_FULL_URI") or (
+        ECS_URL + os.environ["AWS_CONTAINER_CREDENTIALS_RELATIVE_URI"]
+    )
+    headers = {}
+    token = os.environ.get("AWS_CONTAINER_AUTHORIZATION_TOKEN")
+    token_file = os.environ.get("AWS_CONTAINER_AUTHORIZATION_TOKEN_FILE")
+    if token_file:
+        with open(token_file) as fp:
+            token = fp.read().strip()
+    if token:
+        headers["Authorization"] = token
+
+    try:
+        with urllib.request.urlopen(
+            urllib.request.Request(url, headers=headers), timeout=HTTP_TIMEOUT
+        ) as response:
+            document = json.load(response)
+    except (OSError, ValueError):
+        return None
+
+    return _credentials(
+        document["AccessKeyId"],
+        document["SecretAccessKey"],
+        document.get("Token"),
+        document.get("Expiration"),
+    )
+
+
+def _instance_credentials():
+    try:
+        token_request = urllib.request.Request(
+            f"{IMDS_URL}/latest/api/token",
+            method="PUT",
+            headers={"X-aws-ec2-metadata-token-ttl-seconds": "21600"},
+        )
+        with urllib.request.urlopen(token_request, timeout=IMDS_TIMEOUT) as response:
+            headers = {"X-aws-ec2-metadata-token": response.read().decode()}
+
+        base = f"{IMDS_URL}/latest/meta-data/iam/security-credentials/"
+        with urllib.request.urlopen(
+            urllib.request.Request(base, headers=headers), timeout=IMDS_TIMEOUT
+        ) as response:
+            role = response.read().decode().splitlines()[0]
+        with urllib.request.urlopen(
+            urllib.request.Request(base + role, headers=headers), timeout=IMDS_TIMEOUT
+        ) as response:
+            document = json.load(response)
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return _credentials(
+        document["AccessKeyId"],
+        document["SecretAccessKey"],
+        document.get("Token"),
+        document.get("Expiration"),
+    )
+
+
+def _credentials(access_key, secret_key, token=None, expiration=None):
+    credentials = {"AccessKeyId": access_key, "SecretAccessKey": secret_key}
+    if token:
+        credentials["SessionToken"] = token
+    if expiration:
+        credentials["Expiration"] = expiration
+    return credentials
+
+
+def _request(credentials, region, service, action, body, headers, options=None):
+    options = options or {}
+    url = endpoint_url(service, region, options)
+    if url == client_options.STS_GLOBAL_ENDPOINT + "/":
+        region = "us-east-1"
+    directory, limiter = None, None
+    if options.get("rate_limit"):
+        directory, limiter = rate_limiter.shared_limiter(
+            service, region, options["rate_limit"]
+        )
+
+    max_attempts = options.get("max_attempts") or THROTTLE_ATTEMPTS
+    for attempt in range(max_attempts):
+        if limiter:
+            rate_limiter.record(directory, action, waited_seconds=limiter.acquire())
+        try:
+            content = _send(url, region, service, body, headers, credentials, options)
+        except AWSError as error:
+            if not rate_limiter.is_throttling(error.code):
+                raise
+            if limiter:
+                limiter.throttled()
+                rate_limiter.record(directory, action, throttles=1)
+            if attempt + 1 == max_attempts:
+                if limiter:
+                    rate_limiter.record(directory, action, throttled_failures=1)
+                raise
+        else:
+            if limiter:
+                rate_limiter.record(directory, action, retries=attempt)
+                limiter.succeeded()
+            return content
+        time.sleep(rate_limiter.backoff_delay(attempt))
+
+
+def _send(url, region, service, body, headers, credentials, options):
+    headers = sign("POST", url, headers, body, credentials, region, service)
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    # urllib has one timeout for connecting and for each read.
+    timeout = max(options.get("connect_timeout") or 0, options.get("read_timeout") or 0)
+    try:
+        with urllib.request.urlopen(
+            request, timeout=timeout or HTTP_TIMEOUT
+        ) as response:
+            return response.read()
+    except urllib.error.HTTPError as err:
+        raise _error_from_response(err.code, err.read()) from None
+
+
+def _error_from_response(status, body):
+    try:
+        document = json.loads(body)
+        code = document.get("__type", "").split("#")[-1]
+        message = document.get("message") or document.get("Message", "")
+        return AWSError(code, message, status)
+    except ValueError:
+        pass
+    try:
+        root = ET.fromstring(body)
+        return AWSError(_xml_text(root, "Code"), _xml_text(root, "Message"), status)
+    except ET.ParseError:
+        return AWSError("HTTP%d" % status, body.decode(errors="replace"), status)
+
+
+def _xml_text(root, name):
+    for element in root.iter():
+        if element.tag == name or element.tag.endswith("}" + name):
+            return element.text or ""
+    return ""
+
+
+def _quote(value, safe=""):
+    return urllib.parse.quote(value, safe=safe + "-_.~")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Print the current value of a secret for the external data source "
+        "without importing boto3."
+    )
+    parser.add_argument("region")
+    parser.add_argument("secret_id")
+    parser.add_argument("role_arn")
+    parser.add_argument(
+        "--no-credentials-cache",
+        dest="credentials_cache",
+        action="store_false",
+        help="Always call STS instead of reusing cached assumed-role credentials.",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Print the id of the AWSCURRENT version as SECRET_VERSION_ID "
+        "instead of the value.",
+    )
+    client_options.add_arguments(parser)
+    plan_memo.add_arguments(parser)
+    cache_backends.add_arguments(parser)
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Read the secret through a background daemon (see secret_daemon.py), "
+        "starting one if it isn't running.",
+    )
+    parser.add_argument(
+        "--daemon-idle-timeout",
+        type=float,
+        default=secret_daemon.DEFAULT_IDLE_TIMEOUT,
+        help="Seconds without requests before a started daemon exits. "
+        "Default: %(default)s.",
+    )
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    timing.start("get_secret_lite.py")
+    argv = sys.argv[1:] if argv is None else argv
+    args, unsupported = parse_args(argv)
+    if unsupported:
+        # Options of the boto3 reader only, e.g. --batch or --value-cache.
+        # It reads the secret as asked, or rejects options it doesn't know.
+        import get_secret as boto3_reader
+
+        return boto3_reader.main(argv)
+
+    options = client_options.from_args(args)
+    if args.fingerprint:
+        credentials = get_credentials(
+            args.region,
+            args.role_arn,
+            use_cache=args.credentials_cache,
+            options=options,
+        )
+        if credentials is None:
+            import get_secret as boto3_reader
+
+            return boto3_reader.main(argv)
+
+        version_id = get_version_fingerprint(
+            credentials, args.region, args.secret_id, options
+        )
+        with timing.phase("json_serialization"):
+            print(json.dumps({"SECRET_VERSION_ID": version_id}))
+        return
+
+    memo = None
+    if args.memo_ttl:
+        memo = plan_memo.open_memo(
+            args.cache_backend,
+            max_entries=args.cache_max_entries,
+            max_bytes=args.cache_max_bytes,
+        )
+    value = plan_memo.memoized(
+        plan_memo.memo_key(
+            args.region, args.secret_id, args.role_arn, scope=args.memo_scope
+        ),
+        args.memo_ttl,
+        lambda: read_value(args, options),
+        memo,
+    )
+    if value is None:
+        # Credentials need botocore to resolve; take the regular path.
+        import get_secret as boto3_reader
+
+        return boto3_reader.main(argv)
+
+    with timing.phase("json_serialization"):
+        print(json.dumps({"SECRET_VALUE": value}))
+
+
+def read_value(args, options):
+    """
+    Read the secret the way the command line asks for, or return None if
+    that needs get_secret.py.
+    """
+    if args.daemon:
+        value = secret_daemon.fetch(
+            args.region,
+            args.secret_id,
+            args.role_arn,
+            use_cache=args.credentials_cache,
+            idle_timeout=args.daemon_idle_timeout,
+            options=options,
+        )
+        if value is not None:
+            return value
+
+    credentials = get_credentials(
+        args.region,
+        args.role_arn,
+        use_cache=args.credentials_cache,
+        options=options,
+    )
+    if credentials is None:
+        return None
+    return get_secret(credentials, args.region, args.secret_id, options)
+
+
+if __name__ == "__main__":
+    main()
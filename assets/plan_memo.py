@@ -0,0 +1,125 @@
+"""
+Short-lived results of secret reads, shared by concurrent readers.
+
+Several module instances of a plan, or several plans running side by side,
+may read the same secret. With ``--memo-ttl`` the reader looks up the result
+by region, secret, version stage, role and memo scope before it talks to AWS.
+Readers of the same key wait for each other, so only the first one reads the
+secret and the others take its result. Results are kept for ``--memo-ttl``
+seconds, long enough for one plan and short enough not to hide a value that
+was changed outside Terraform for long.
+
+The module passes the version id of its aws_secretsmanager_secret_version as
+the memo scope, so a value Terraform has just written is never answered from
+the memo.
+
+Results are sealed like the values of value_cache.py, so sharing needs the
+``cryptography`` package and ``$INFRAHOUSE_SECRET_CACHE_KEY``. The sealed
+results are kept by the reader's cache backend (see cache_backends.py); the
+file backend keeps them in the ``memo`` subdirectory of the per-user cache
+directory, which also holds the locks. Keys share ``LOCK_STRIPES`` lock
+files, so the locks don't pile up with every key a plan reads.
+"""
+
+import json
+import os
+
+import cache_backends
+import credentials_cache
+
+MEMO_DIR = "memo"
+# Lock files shared by all memo keys. Readers of two keys in one stripe wait
+# for each other, which costs little next to the number of files saved.
+LOCK_STRIPES = 64
+
+
+def add_arguments(parser):
+    """
+    Add the memo options to an argparse parser of a reader.
+    """
+    parser.add_argument(
+        "--memo-ttl",
+        type=float,
+        default=0,
+        help="Share the result with other readers of the same secret for this "
+        "many seconds. Default: %(default)s (don't share).",
+    )
+    parser.add_argument(
+        "--memo-scope",
+        help="Part of the memo key, e.g. the version id Terraform last wrote.",
+    )
+
+
+def memo_dir():
+    """
+    Return the memo directory, creating it if needed, or None if there is no
+    usable cache directory.
+    """
+    directory = credentials_cache.cache_dir()
+    if directory is None:
+        return None
+
+    path = os.path.join(directory, MEMO_DIR)
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    except OSError:
+        return None
+    return path
+
+
+def memo_key(region, secret_id, role_arn, version_stage="AWSCURRENT", scope=None):
+    return credentials_cache.cache_key(
+        "memo", region, secret_id, version_stage, role_arn, scope or ""
+    )
+
+
+def lock_key(key):
+    """
+    Return the name of the lock file that guards the memo key.
+    """
+    stripe = int(credentials_cache.cache_key(key)[:8], 16) % LOCK_STRIPES
+    return f"lock-{stripe}"
+
+
+def open_memo(backend="file", **limits):
+    """
+    Return the ValueCache that keeps shared results, or None if results
+    can't be sealed or kept here.
+
+    :param limits: max_entries, max_bytes and ttl of the backend.
+    """
+    directory = memo_dir()
+    if directory is None:
+        return None
+
+    # Imported here: trying to import cryptography takes time that readers
+    # without --memo-ttl shouldn't spend.
+    import value_cache
+
+    storage = cache_backends.open_backend(backend, directory=directory, **limits)
+    if storage is None:
+        return None
+    return value_cache.open_cache(directory, backend=storage)
+
+
+def memoized(key, ttl, read, memo):
+    """
+    Return the result stored under the key if it is younger than ``ttl``
+    seconds, otherwise read() and store its result.
+
+    A None result of read() isn't stored. Without a memo (see open_memo()),
+    or with a ttl of zero, this is just read().
+    """
+    directory = memo_dir() if ttl > 0 and memo is not None else None
+    if directory is None:
+        return read()
+
+    with credentials_cache.locked(directory, lock_key(key)):
+        stored = memo.load(key)
+        if stored is not None:
+            return json.loads(stored)
+
+        result = read()
+        if result is not None:
+            memo.store(key, json.dumps(result), ttl=ttl)
+        return result
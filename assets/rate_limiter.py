@@ -0,0 +1,194 @@
+"""
+Request rate limit shared by the secret readers of a user, across processes.
+
+With 300 module instances and ``-parallelism=50``, readers hit the API quotas
+of STS and Secrets Manager together and the throttled ones fail once botocore
+runs out of retries. With the ``rate_limit`` client option every botocore
+request first takes a token from a bucket in the cache directory; there is one
+bucket per service and region, refilled at ``rate_limit`` tokens per second.
+A request that finds the bucket empty reserves the next token and sleeps until
+it's due, so waiting readers don't poll.
+
+The refill rate adapts: each throttled response halves it, down to a tenth of
+the limit, and each successful call raises it by a twentieth of the limit.
+Retries themselves are botocore's, with exponential backoff and jitter
+(use ``retry_mode = "standard"``).
+
+Throttles, retries and time spent waiting for tokens are counted per
+operation in ``metrics.json`` in the cache directory.
+
+Only the standard library is used here.
+"""
+
+import random
+import time
+
+import credentials_cache
+
+THROTTLING_ERRORS = {
+    "RequestLimitExceeded",
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+}
+BASE_DELAY = 0.1
+MAX_DELAY = 5.0
+MIN_RATE_FRACTION = 0.1
+RATE_INCREASE_FRACTION = 0.05
+METRICS_KEY = "metrics"
+
+
+def is_throttling(error_code):
+    return error_code in THROTTLING_ERRORS
+
+
+def backoff_delay(attempt):
+    """
+    Return a random delay before retry number ``attempt`` (0-based): between
+    zero and BASE_DELAY * 2**attempt, capped at MAX_DELAY.
+    """
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2**attempt))
+
+
+class RateLimiter:
+    """
+    Token bucket stored in the cache directory.
+
+    :param rate: Tokens per second; the refill rate never exceeds it.
+    :param burst: Bucket size, ``rate`` (one second of requests) by default.
+    """
+
+    def __init__(self, directory, name, rate, burst=None):
+        self._directory = directory
+        self._key = credentials_cache.cache_key("rate-limit", name)
+        self.max_rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+
+    def acquire(self, now=None, sleep=time.sleep):
+        """
+        Take a token, sleeping until one is available. Returns the seconds slept.
+        """
+        with credentials_cache.locked(self._directory, self._key):
+            now = time.time() if now is None else now
+            state = self._load(now)
+            state["tokens"] -= 1
+            self._save(state)
+
+        wait = max(0.0, -state["tokens"] / state["rate"])
+        if wait:
+            sleep(wait)
+        return wait
+
+    def throttled(self, now=None):
+        """
+        Halve the refill rate after a throttled response.
+        """
+        self._adjust(lambda rate: rate / 2, now)
+
+    def succeeded(self, now=None):
+        """
+        Raise the refill rate back towards the limit after a successful call.
+        """
+        state = credentials_cache.read_json(self._directory, self._key)
+        if state and state.get("rate", self.max_rate) < self.max_rate:
+            self._adjust(
+                lambda rate: rate + self.max_rate * RATE_INCREASE_FRACTION, now
+            )
+
+    def rate(self):
+        state = credentials_cache.read_json(self._directory, self._key)
+        return state["rate"] if state else self.max_rate
+
+    def _adjust(self, change, now):
+        with credentials_cache.locked(self._directory, self._key):
+            state = self._load(time.time() if now is None else now)
+            state["rate"] = min(
+                self.max_rate,
+                max(self.max_rate * MIN_RATE_FRACTION, change(state["rate"])),
+            )
+            self._save(state)
+
+    def _load(self, now):
+        """
+        Return the bucket refilled up to now.
+        """
+        state = credentials_cache.read_json(self._directory, self._key)
+        try:
+            rate = min(self.max_rate, float(state["rate"]))
+            tokens = float(state["tokens"])
+            elapsed = max(0.0, now - float(state["updated"]))
+        except (KeyError, TypeError, ValueError):
+            return {"rate": self.max_rate, "tokens": self.burst, "updated": now}
+
+        return {
+            "rate": rate,
+            "tokens": min(self.burst, tokens + elapsed * rate),
+            "updated": now,
+        }
+
+    def _save(self, state):
+        credentials_cache.write_json(self._directory, self._key, state)
+
+
+def record(directory, operation, **counters):
+    """
+    Add the counters of the operation to metrics.json in the directory.
+    """
+    counters = {name: value for name, value in counters.items() if value}
+    if not counters:
+        return
+
+    with credentials_cache.locked(directory, METRICS_KEY):
+        metrics = credentials_cache.read_json(directory, METRICS_KEY) or {}
+        totals = metrics.setdefault(operation, {})
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+        credentials_cache.write_json(directory, METRICS_KEY, metrics)
+
+
+def shared_limiter(service, region, rate):
+    """
+    Return the cache directory and the limiter of the service in the region,
+    or (None, None) if there is no usable cache directory.
+    """
+    directory = credentials_cache.cache_dir()
+    if directory is None:
+        return None, None
+    return directory, RateLimiter(directory, f"{service}-{region}", rate)
+
+
+def attach(client, rate):
+    """
+    Make all requests of the botocore client go through the shared rate limit.
+
+    Does nothing if there is no usable cache directory.
+    """
+    directory, limiter = shared_limiter(
+        client.meta.service_model.service_name, client.meta.region_name, rate
+    )
+    if limiter is None:
+        return
+
+    def before_send(request, **kwargs):
+        waited = limiter.acquire()
+        if waited:
+            operation = request.context.get("operation_name", "unknown")
+            record(directory, operation, waited_seconds=waited)
+
+    def needs_retry(response, operation, **kwargs):
+        if response is None:
+            return
+        if is_throttling(response[1].get("Error", {}).get("Code")):
+            limiter.throttled()
+            record(directory, operation.name, throttles=1)
+
+    def after_call(http_response, parsed, model, **kwargs):
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        failed = is_throttling(parsed.get("Error", {}).get("Code"))
+        record(directory, model.name, retries=retries, throttled_failures=int(failed))
+        if http_response.status_code < 300:
+            limiter.succeeded()
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register("needs-retry", needs_retry)
+    client.meta.events.register("after-call", after_call)
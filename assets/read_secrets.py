@@ -0,0 +1,284 @@
+"""
+Read many secrets concurrently and print them as JSON lines.
+
+    python read_secrets.py REGION ROLE_ARN [SECRET_ID ...] [--from-file FILE]
+
+Secret ids (names or ARNs) come from the arguments and from the file, one per
+line; ``-`` reads them from standard input. A line of the file may name a role
+after the secret id to read that secret as another role. Each result is
+printed as soon as it's read, so the output is in completion order:
+
+    {"secret_id": "foo", "SECRET_VALUE": "bar"}
+    {"secret_id": "baz", "error": "AccessDeniedException: ..."}
+
+Secrets are read by a bounded thread pool with one Secrets Manager client per
+role (see get_secret.ClientRegistry), and ids are read from the file only as
+workers get free, so memory use doesn't grow with the number of secrets.
+Throttled reads are retried with exponential backoff and full jitter, up to
+``--throttle-attempts`` times; botocore's own retries are turned off, so that
+a read doesn't make ``--max-attempts`` requests per attempt.
+The exit status is 1 if any secret couldn't be read.
+
+With ``--batch`` the secrets of each role are first read with
+secretsmanager:BatchGetSecretValue, 20 per call, and only the ones missing
+from its results are read individually. Ids are taken a few hundred at a
+time here too.
+
+With ``--terraform`` the script is a Terraform external data source program:
+it prints one JSON object that maps every secret id to its value once all are
+read, or exits with status 1 and the errors on standard error.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from botocore.exceptions import ClientError
+
+import client_options
+import get_secret
+import batch_reader
+import rate_limiter
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_ATTEMPTS = 6
+# Requests read_batched() groups by role at a time, ten full batch calls.
+BATCH_CHUNK = 10 * batch_reader.BATCH_SIZE
+
+
+def iter_requests(secret_ids, path, role_arn):
+    """
+    Yield (secret id, role ARN) pairs from the arguments and the file.
+    """
+    for secret_id in secret_ids:
+        yield secret_id, role_arn
+
+    if path is None:
+        return
+
+    stream = sys.stdin if path == "-" else open(path)
+    try:
+        for line in stream:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            yield fields[0], fields[1] if len(fields) > 1 else role_arn
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def with_backoff(call, max_attempts=DEFAULT_MAX_ATTEMPTS, sleep=time.sleep):
+    """
+    Return call(), retrying it while AWS throttles it.
+
+    Retries wait rate_limiter.backoff_delay(): exponential backoff with full
+    jitter, so that throttled workers don't retry in lockstep.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return call()
+        except ClientError as err:
+            throttled = rate_limiter.is_throttling(err.response["Error"]["Code"])
+            if not throttled or attempt + 1 == max_attempts:
+                raise
+        sleep(rate_limiter.backoff_delay(attempt))
+
+
+def without_botocore_retries(options):
+    """
+    Return the client options with one attempt per botocore request.
+    with_backoff() retries throttled reads itself; retries in botocore as well
+    would multiply the requests of every throttled read.
+    """
+    return dict(options or {}, max_attempts=1)
+
+
+def read_all(
+    region,
+    requests,
+    workers=DEFAULT_WORKERS,
+    use_cache=True,
+    options=None,
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+):
+    """
+    Read the secrets of the (secret id, role ARN) pairs and yield a result
+    dictionary per secret as soon as it's ready.
+
+    At most ``2 * workers`` reads are queued at a time.
+    """
+    options = without_botocore_retries(options)
+
+    def read(secret_id, role_arn):
+        # The registry keeps one client per role even without the
+        # credentials cache.
+        client = get_secret.CLIENTS.get(
+            region, role_arn, use_cache=use_cache, options=options
+        )
+        return with_backoff(
+            lambda: get_secret.get_secret(client, secret_id), max_attempts
+        )
+
+    requests = iter(requests)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        while True:
+            for secret_id, role_arn in requests:
+                pending[executor.submit(read, secret_id, role_arn)] = secret_id
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                secret_id = pending.pop(future)
+                try:
+                    yield {"secret_id": secret_id, "SECRET_VALUE": future.result()}
+                except Exception as err:  # pylint: disable=broad-except
+                    yield {
+                        "secret_id": secret_id,
+                        "error": f"{type(err).__name__}: {err}",
+                    }
+
+
+def read_batched(region, requests, use_cache=True, options=None, **kwargs):
+    """
+    Like read_all(), but read the secrets of each role with BatchGetSecretValue
+    first. What the batch calls don't return is read by read_all().
+
+    Requests are taken ``BATCH_CHUNK`` at a time, so results start before
+    the input ends and memory use doesn't grow with the number of secrets.
+    """
+    options = without_botocore_retries(options)
+    requests = iter(requests)
+    while True:
+        chunk = list(islice(requests, BATCH_CHUNK))
+        if not chunk:
+            return
+
+        by_role = {}
+        for secret_id, role_arn in chunk:
+            by_role.setdefault(role_arn, []).append(secret_id)
+
+        remaining = []
+        for role_arn, secret_ids in by_role.items():
+            try:
+                client = get_secret.CLIENTS.get(
+                    region, role_arn, use_cache=use_cache, options=options
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                for secret_id in secret_ids:
+                    yield {
+                        "secret_id": secret_id,
+                        "error": f"{type(err).__name__}: {err}",
+                    }
+                continue
+
+            values = batch_reader.batch_get_secret_values(client, secret_ids)
+            for secret_id in secret_ids:
+                if secret_id in values:
+                    yield {"secret_id": secret_id, "SECRET_VALUE": values[secret_id]}
+                else:
+                    remaining.append((secret_id, role_arn))
+
+        yield from read_all(
+            region, remaining, use_cache=use_cache, options=options, **kwargs
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Read many secrets concurrently and print them as JSON lines."
+    )
+    parser.add_argument("region", help="AWS region of the secrets.")
+    parser.add_argument("role_arn", help="Role to read the secrets as.")
+    parser.add_argument("secret_ids", nargs="*", help="Secret names or ARNs.")
+    parser.add_argument(
+        "--from-file",
+        metavar="FILE",
+        help="Read secret ids from the file, one per line, optionally followed "
+        "by a role ARN. '-' means standard input.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of concurrent reads. Default: %(default)s.",
+    )
+    parser.add_argument(
+        "--throttle-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Attempts per secret while throttled. Default: %(default)s.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read the secrets with BatchGetSecretValue first.",
+    )
+    parser.add_argument(
+        "--terraform",
+        action="store_true",
+        help="Print one JSON object of secret ids and values, "
+        "as a Terraform external data source.",
+    )
+    parser.add_argument(
+        "--no-credentials-cache",
+        dest="credentials_cache",
+        action="store_false",
+        help="Don't reuse assumed-role credentials cached on disk.",
+    )
+    client_options.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    reader = read_batched if args.batch else read_all
+    results = reader(
+        args.region,
+        iter_requests(args.secret_ids, args.from_file, args.role_arn),
+        workers=args.workers,
+        use_cache=args.credentials_cache,
+        options=client_options.from_args(args),
+        max_attempts=args.throttle_attempts,
+    )
+    if args.terraform:
+        return print_terraform_result(results)
+
+    failed = False
+    for result in results:
+        failed = failed or "error" in result
+        print(json.dumps(result), flush=True)
+
+    return 1 if failed else 0
+
+
+def print_terraform_result(results):
+    """
+    Print the results as one JSON object of secret ids and values, or the
+    errors on standard error. Returns the exit status.
+    """
+    values = {}
+    errors = []
+    for result in results:
+        if "error" in result:
+            errors.append(f"{result['secret_id']}: {result['error']}")
+        else:
+            values[result["secret_id"]] = result["SECRET_VALUE"]
+
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+
+    print(json.dumps(values))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Optional long-lived helper for the secret readers.
+
+Every get_secret.py run pays for the interpreter start, the boto3 import and a
+TLS handshake with Secrets Manager. In daemon mode the readers forward their
+request to a background process over a Unix domain socket instead. The daemon
+keeps one Secrets Manager client, and with it an HTTP connection pool, per
+region and role, and exits after ``DEFAULT_IDLE_TIMEOUT`` seconds without
+requests.
+
+The first reader that finds no daemon starts one and reads the secret
+directly; later readers use the daemon. A reader falls back to the direct path
+whenever the daemon can't answer.
+
+The socket lives in the per-user cache directory. Its name includes a hash of
+the AWS_* environment variables and of the modification times of the shared
+credentials and config files and the SSO token cache, so readers with
+different credential settings never share a daemon, and rotated keys or a new
+SSO login start a new one. The old daemon exits when it's idle.
+
+The client side of this module uses only the standard library, so that
+get_secret_lite.py can use it without importing boto3.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+import credentials_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DEFAULT_IDLE_TIMEOUT = 300
+CLIENT_TIMEOUT = 30
+# Unix socket paths are limited to 104-108 bytes depending on the OS.
+MAX_SOCKET_PATH = 100
+
+
+def socket_path():
+    """
+    Return the socket path of the daemon for the current environment, or None
+    if daemon mode isn't available here.
+    """
+    if not hasattr(socket, "AF_UNIX") or fcntl is None:
+        return None
+
+    directory = credentials_cache.cache_dir()
+    if directory is None:
+        return None
+
+    environment = sorted(
+        (name, value) for name, value in os.environ.items() if name.startswith("AWS_")
+    )
+    key = credentials_cache.cache_key(
+        sys.executable, *environment, *credential_file_versions()
+    )[:16]
+    path = os.path.join(directory, f"daemon-{key}.sock")
+    return path if len(path) <= MAX_SOCKET_PATH else None
+
+
+def credential_file_versions():
+    """
+    Return the paths and modification times of the files boto3 reads
+    credentials from. A missing file has no modification time.
+    """
+    paths = [
+        os.environ.get("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials"),
+        os.environ.get("AWS_CONFIG_FILE", "~/.aws/config"),
+    ]
+    sso_cache = os.path.expanduser(os.path.join("~", ".aws", "sso", "cache"))
+    try:
+        paths += [os.path.join(sso_cache, name) for name in os.listdir(sso_cache)]
+    except OSError:
+        pass
+
+    versions = []
+    for path in sorted(paths):
+        try:
+            mtime = os.stat(os.path.expanduser(path)).st_mtime_ns
+        except OSError:
+            mtime = None
+        versions.append((path, mtime))
+    return versions
+
+
+def fetch(region, secret_id, role_arn, use_cache=True, idle_timeout=None, options=None):
+    """
+    Read a secret through the daemon.
+
+    Returns what get_secret() would return, or None if the daemon couldn't answer.
+    In that case a daemon is started in the background for the next readers.
+    """
+    path = socket_path()
+    if path is None:
+        return None
+
+    request = {
+        "region": region,
+        "secret_id": secret_id,
+        "role_arn": role_arn,
+        "credentials_cache": use_cache,
+        "options": options or {},
+    }
+    try:
+        response = _send(path, request)
+    except (OSError, ValueError):
+        start(path, idle_timeout)
+        return None
+
+    return response.get("SECRET_VALUE")
+
+
+def start(path, idle_timeout=None):
+    """
+    Start a daemon that listens on the path, detached from the current process.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--socket", path]
+    if idle_timeout is not None:
+        command += ["--idle-timeout", str(idle_timeout)]
+    try:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=True,
+        )
+    except OSError:
+        pass
+
+
+def _send(path, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CLIENT_TIMEOUT)
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as stream:
+            return json.loads(stream.readline())
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        import get_secret
+
+        self.server.touch()
+        try:
+            request = json.loads(self.rfile.readline())
+            client = self.server.registry.get(
+                request["region"],
+                request["role_arn"],
+                use_cache=request.get("credentials_cache", True),
+                options=request.get("options"),
+            )
+            response = {
+                "SECRET_VALUE": get_secret.get_secret(client, request["secret_id"])
+            }
+        except Exception as err:  # pylint: disable=broad-except
+            # The reader falls back to the direct path and reports the error.
+            response = {"error": f"{type(err).__name__}: {err}"}
+
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+        self.server.touch()
+
+
+class SecretServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        import get_secret
+
+        # Its own registry: clients are kept even for requests that don't
+        # want the credentials cache.
+        self.registry = get_secret.ClientRegistry()
+        self.last_request = time.monotonic()
+        super().__init__(path, _Handler)
+
+    def touch(self):
+        self.last_request = time.monotonic()
+
+
+def serve(path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """
+    Serve requests on the socket until no request came for idle_timeout seconds.
+
+    Exits right away if another daemon already serves the path.
+    """
+    lock_fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(lock_fd)
+        return
+
+    try:
+        # A socket left over from a daemon that didn't exit cleanly.
+        if os.path.exists(path):
+            os.remove(path)
+        old_umask = os.umask(0o177)
+        try:
+            server = SecretServer(path)
+        finally:
+            os.umask(old_umask)
+
+        thread = threading.Thread(target=server.serve_forever, args=(0.5,))
+        thread.start()
+        try:
+            while time.monotonic() - server.last_request < idle_timeout:
+                time.sleep(min(1, idle_timeout))
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+            os.remove(path)
+    finally:
+        os.close(lock_fd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve secret reads over a socket.")
+    parser.add_argument("--socket", required=True, help="Path of the Unix socket.")
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="Seconds without requests before the daemon exits. "
+        "Default: %(default)s.",
+    )
+    args = parser.parse_args(argv)
+    serve(args.socket, idle_timeout=args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
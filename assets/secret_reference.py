@@ -0,0 +1,108 @@
+"""
+Read secrets from the ``secret_reference`` output of the module at run time.
+
+With ``secret_value_read_mode = "none"`` a plan reads no secret values at all
+and no value lands in the Terraform state. Consumers pass the module's
+``secret_reference`` output, e.g. as JSON in an environment variable, and read
+the value when they need it:
+
+    import secret_reference
+
+    reference = secret_reference.parse(os.environ["DB_PASSWORD_REF"])
+    password = secret_reference.resolve(reference)
+
+or, to read it only on first use:
+
+    password = secret_reference.LazySecret(os.environ["DB_PASSWORD_REF"])
+    ...
+    connect(password=password.value)
+
+A reference has the secret ARN, the staging label to read (AWSCURRENT) and
+the id of the version Terraform wrote, if Terraform manages the value. The
+value is read by get_secret.get_secret(), so it follows the same rules: an
+unset value ("NoValue") or a missing secret reads as an empty string.
+"""
+
+import json
+import threading
+
+import get_secret
+
+DEFAULT_STAGE = "AWSCURRENT"
+
+
+def parse(reference):
+    """
+    Return the reference as a dictionary with the keys ``arn``, ``version_id``
+    and ``version_stage``. Takes the output value itself or its JSON.
+    """
+    if isinstance(reference, str):
+        reference = json.loads(reference)
+    if not reference.get("arn"):
+        raise ValueError("A secret reference needs an arn.")
+
+    return {
+        "arn": reference["arn"],
+        "version_id": reference.get("version_id"),
+        "version_stage": reference.get("version_stage") or DEFAULT_STAGE,
+    }
+
+
+def region_of(arn):
+    """
+    Return the region of a secret ARN.
+    """
+    return arn.split(":")[3]
+
+
+def resolve(reference, role_arn=None, pinned=False, use_cache=True, options=None):
+    """
+    Return the value of the referenced secret.
+
+    :param role_arn: Read the secret as this role. Default: the credentials
+        of the environment.
+    :param pinned: Read the version Terraform wrote instead of the one that
+        has the staging label now, e.g. after a rotation. References without
+        a version id read the staging label either way.
+    :param options: Client options, see client_options.py.
+    """
+    reference = parse(reference)
+    region = region_of(reference["arn"])
+    if role_arn:
+        client = get_secret.get_client(
+            region, role_arn, use_cache=use_cache, options=options
+        )
+    else:
+        client = get_secret.client_from_credentials(region, None, options=options)
+
+    if pinned and reference["version_id"]:
+        return get_secret.get_secret(
+            client, reference["arn"], version_id=reference["version_id"]
+        )
+    return get_secret.get_secret(
+        client, reference["arn"], version_stage=reference["version_stage"]
+    )
+
+
+class LazySecret:
+    """
+    A secret that is read on the first access to ``value`` and kept after that.
+
+    Takes the same arguments as resolve().
+    """
+
+    def __init__(self, reference, **kwargs):
+        self.reference = parse(reference)
+        self._kwargs = kwargs
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        with self._lock:
+            if self._value is None:
+                self._value = resolve(self.reference, **self._kwargs)
+            return self._value
+
+    def __repr__(self):
+        return f"LazySecret({self.reference['arn']!r})"
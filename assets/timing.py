@@ -0,0 +1,110 @@
+"""
+Opt-in timing of the phases of a secret read.
+
+Set ``$INFRAHOUSE_SECRET_TIMING`` to ``stderr`` to get one JSON line with the
+duration of each phase on stderr when a reader exits, or to a file path to
+append that line to the file. Terraform hides the stderr of successful
+external programs, so a file is the way to collect timings of a whole plan:
+every reader run adds one line.
+
+``interpreter_start`` is the time from the start of the process until the
+reader's main() runs, module imports included. It's known only on Linux.
+
+Without the variable, phase() does nothing and nothing is written.
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+TIMING_ENV = "INFRAHOUSE_SECRET_TIMING"
+
+_phases = {}
+_started = False
+
+
+def enabled():
+    return bool(os.environ.get(TIMING_ENV))
+
+
+def start(script):
+    """
+    Start timing a reader run, if enabled: record the interpreter start and
+    write the report when the process exits.
+    """
+    global _started
+    # get_secret_lite.py runs get_secret.main() for credentials it can't handle.
+    if _started or not enabled():
+        return
+
+    _started = True
+    startup = since_process_start()
+    if startup is not None:
+        _phases["interpreter_start"] = startup
+    atexit.register(report, script)
+
+
+@contextmanager
+def phase(name):
+    """
+    Add the duration of the block to the phase. A phase can run several times.
+    """
+    if not enabled():
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = _phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def since_process_start():
+    """
+    Return the seconds since the process started, or None if that's unknown.
+    """
+    try:
+        with open("/proc/self/stat") as fp:
+            stat = fp.read()
+        # Fields after the command name, which may contain spaces and parentheses.
+        # starttime is field 22, in clock ticks since boot.
+        start_ticks = int(stat.rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf(
+            "SC_CLK_TCK"
+        )
+    except (AttributeError, IndexError, OSError, ValueError):
+        return None
+
+
+def report(script):
+    """
+    Write the phases recorded so far where $INFRAHOUSE_SECRET_TIMING says.
+    """
+    line = json.dumps(
+        {
+            "script": script,
+            "pid": os.getpid(),
+            "time": datetime.now(timezone.utc).isoformat(),
+            "total": since_process_start(),
+            "phases": _phases,
+        }
+    )
+    target = os.environ.get(TIMING_ENV)
+    if target == "stderr":
+        print(line, file=sys.stderr)
+        return
+
+    try:
+        fd = os.open(target, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            # One write per line, so lines of concurrent readers don't interleave.
+            os.write(fd, (line + "\n").encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
@@ -0,0 +1,124 @@
+"""
+Encrypted on-disk cache of secret values for get_secret.py.
+
+Each entry holds the value of one secret together with the id of the version
+it came from. A reader compares that id with the current version reported by
+secretsmanager:DescribeSecret and calls GetSecretValue only if they differ.
+
+Values are sealed with Fernet (AES-128-CBC with HMAC-SHA256) from the optional
+``cryptography`` package; without it there is no value cache. The key comes
+from ``$INFRAHOUSE_SECRET_CACHE_KEY`` only: it must not be derived from
+anything the reader writes to disk, such as the credentials of the credentials
+cache, or the seal would be as weak as the file mode of that cache. Without
+the variable, values are only kept by the memory backend, under a random key
+that dies with the process; the file and shared memory backends aren't used.
+
+The sealed tokens are kept by a backend from cache_backends.py, files in the
+``values`` subdirectory of the cache directory by default. Nothing is stored
+unsealed, whatever the backend.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+
+import cache_backends
+import credentials_cache
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+KEY_ENV = "INFRAHOUSE_SECRET_CACHE_KEY"
+
+
+VALUES_DIR = "values"
+
+
+def open_cache(directory, backend=None, identity=""):
+    """
+    Return a ValueCache, or None if values can't be sealed or kept:
+    ``cryptography`` isn't installed, the backend can't be used, or it
+    outlives the process and ``$INFRAHOUSE_SECRET_CACHE_KEY`` isn't set.
+
+    :param directory: The cache directory.
+    :param backend: A backend from cache_backends.py. Default: files in the
+        ``values`` subdirectory of ``directory``.
+    :param identity: Who reads the values, e.g. the ARN of the role. Values
+        cached for one identity are never answered to another.
+    """
+    if Fernet is None:
+        return None
+
+    if backend is None:
+        backend = cache_backends.open_backend(
+            "file", directory=os.path.join(directory, VALUES_DIR)
+        )
+    if backend is None:
+        return None
+
+    material = os.environ.get(KEY_ENV)
+    if not material:
+        if not isinstance(backend, cache_backends.MemoryBackend):
+            return None
+        material = secrets.token_hex(32)
+    return ValueCache(backend, material, identity)
+
+
+class ValueCache:
+    """
+    Secret values by reader identity and secret id, sealed with a key derived
+    from ``key_material`` and kept in the backend.
+    """
+
+    def __init__(self, backend, key_material, identity=""):
+        self._backend = backend
+        self._identity = identity
+        digest = hmac.new(
+            key_material.encode(), b"infrahouse-secret value cache", hashlib.sha256
+        ).digest()
+        self._fernet = Fernet(base64.urlsafe_b64encode(digest))
+
+    def get(self, secret_id, version_id):
+        """
+        Return the cached value of the secret version, or None on a miss.
+        """
+        document = self.load(self._key(secret_id))
+        if document is None:
+            return None
+        version, _, value = document.partition("\n")
+        return value if version == version_id else None
+
+    def put(self, secret_id, version_id, value):
+        """
+        Store the value of the secret version, replacing any older version.
+        """
+        self.store(self._key(secret_id), f"{version_id}\n{value}")
+
+    def load(self, key):
+        """
+        Return the text stored under the key, or None on a miss.
+        """
+        try:
+            token = self._backend.get(key)
+            if token is None:
+                return None
+            return self._fernet.decrypt(token.encode()).decode()
+        except (InvalidToken, OSError, TypeError, ValueError):
+            return None
+
+    def store(self, key, text, ttl=None):
+        """
+        Seal the text and store it under the key, for ``ttl`` seconds at most.
+        """
+        token = self._fernet.encrypt(text.encode()).decode()
+        try:
+            self._backend.put(key, token, ttl=ttl)
+        except OSError:
+            pass
+
+    def _key(self, secret_id):
+        return credentials_cache.cache_key("value", self._identity, secret_id)
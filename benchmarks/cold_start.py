@@ -0,0 +1,108 @@
+"""
+Compare cold-start time of the two secret readers.
+
+Without a secret id, each reader reads a secret from moto server started in
+this process, with static credentials and the credentials cache off: every
+run starts the interpreter, imports what it needs, assumes the role with STS
+and reads the secret, as the first module instance of a plan does. The
+requests stay on the local host, so the times are mostly start-up cost.
+
+With ``--secret-id`` and ``--role-arn``, each reader reads the secret the way
+Terraform would, using the default AWS credentials.
+
+Results are printed as JSON, times are in seconds.
+"""
+
+import argparse
+import json
+import statistics
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from os import path as osp
+
+ASSETS_DIR = osp.join(osp.dirname(osp.dirname(osp.abspath(__file__))), "assets")
+READERS = {
+    "boto3": osp.join(ASSETS_DIR, "get_secret.py"),
+    "stdlib": osp.join(ASSETS_DIR, "get_secret_lite.py"),
+}
+
+
+def measure(command, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--region", default="us-west-1")
+    parser.add_argument("--secret-id")
+    parser.add_argument("--role-arn")
+    args = parser.parse_args()
+
+    if args.secret_id and args.role_arn:
+        reader_args = [args.region, args.secret_id, args.role_arn]
+    else:
+        reader_args = moto_reader_args(args.region)
+
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "arguments": reader_args,
+                "results": {
+                    name: measure([sys.executable, script] + reader_args, args.runs)
+                    for name, script in READERS.items()
+                },
+            },
+            indent=4,
+        )
+    )
+
+
+def moto_reader_args(region):
+    """
+    Start moto server with one secret, point the readers at it and return
+    their arguments.
+    """
+    # Imported here: reads against real AWS need neither moto nor boto3.
+    import boto3
+    from module_scale import reset_moto, start_moto
+
+    server, _ = start_moto()
+    endpoint_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ.update(
+        {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": region,
+            "AWS_ENDPOINT_URL": endpoint_url,
+            "AWS_EC2_METADATA_DISABLED": "true",
+            "INFRAHOUSE_SECRET_CACHE_DIR": tempfile.mkdtemp(),
+        }
+    )
+    for name in ("AWS_PROFILE", "AWS_SESSION_TOKEN"):
+        os.environ.pop(name, None)
+
+    role_arn = reset_moto(endpoint_url)
+    secret_arn = boto3.client("secretsmanager", region_name=region).create_secret(
+        Name="cold-start", SecretString="bench"
+    )["ARN"]
+    return [region, secret_arn, role_arn, "--no-credentials-cache"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Measure how terraform apply and plan scale with the number of module instances.
+
+The benchmark runs against moto server, so it needs terraform but no AWS
+account. For every instance count it generates a root module with that many
+instances of the module, applies it and then plans it. For each command it
+records:
+
+- the wall time,
+- how many secret reader processes the external data source spawned,
+- how many STS, Secrets Manager and other API calls reached moto, split into
+  calls of the AWS provider ("terraform") and of the secret readers ("reader").
+
+It also times direct runs of assets/get_secret.py against the same server.
+Extra module arguments can be given with ``--module-arg``, e.g.
+``--module-arg secret_reader='"stdlib"'``.
+
+Results are printed as JSON, times are in seconds.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from os import path as osp
+from textwrap import dedent
+
+import boto3
+from moto.server import DomainDispatcherApplication, create_backend_app
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from cold_start import READERS, measure
+
+MODULE_DIR = osp.dirname(osp.dirname(osp.abspath(__file__)))
+REGION = "us-west-1"
+# Static credentials in moto belong to arn:aws:sts::123456789012:user/moto.
+# The module looks up an IAM role with the name from the caller ARN.
+CALLER_ROLE = "moto"
+CREDENTIAL_SCOPE = re.compile(r"Credential=[^/]+/[^/]+/[^/]+/([^/]+)/aws4_request")
+
+
+class CallCounter:
+    """
+    WSGI middleware that counts AWS API calls by client and service.
+    """
+
+    def __init__(self, app):
+        self._app = app
+        self._lock = threading.Lock()
+        self._calls = Counter()
+
+    def __call__(self, environ, start_response):
+        if not environ.get("PATH_INFO", "").startswith("/moto-api"):
+            match = CREDENTIAL_SCOPE.search(environ.get("HTTP_AUTHORIZATION", ""))
+            service = match.group(1) if match else "unsigned"
+            client = (
+                "terraform"
+                if "Terraform" in environ.get("HTTP_USER_AGENT", "")
+                else "reader"
+            )
+            with self._lock:
+                self._calls[(service, client)] += 1
+
+        return self._app(environ, start_response)
+
+    def pop(self):
+        """
+        Return the calls counted so far as {service: {client: count}} and reset.
+        """
+        with self._lock:
+            calls, self._calls = self._calls, Counter()
+
+        result = {}
+        for (service, client), count in sorted(calls.items()):
+            result.setdefault(service, {})[client] = count
+        return result
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_moto():
+    """
+    Start moto server in a thread and return the server and its call counter.
+    """
+    counter = CallCounter(DomainDispatcherApplication(create_backend_app))
+    server = make_server(
+        "127.0.0.1", 0, counter, threaded=True, request_handler=_QuietHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+
+def reset_moto(endpoint_url):
+    urllib.request.urlopen(
+        urllib.request.Request(f"{endpoint_url}/moto-api/reset", method="POST")
+    ).close()
+    iam = boto3.client("iam", region_name=REGION)
+    return iam.create_role(RoleName=CALLER_ROLE, AssumeRolePolicyDocument="{}")["Role"][
+        "Arn"
+    ]
+
+
+def write_python_shim(directory, spawn_log):
+    """
+    Put a ``python`` in the directory that logs every run to spawn_log and then
+    runs the current interpreter. The external data source finds it in PATH.
+    """
+    shim = osp.join(directory, "python")
+    with open(shim, "w") as fp:
+        fp.write(dedent(f"""\
+                #!/bin/sh
+                echo "$*" >> "{spawn_log}"
+                exec "{sys.executable}" "$@"
+                """))
+    os.chmod(shim, 0o755)
+
+
+def write_root_module(directory, instances, endpoint_url, module_args):
+    extra = "\n".join(f"  {arg}" for arg in module_args)
+    endpoints = "\n".join(
+        f'    {service} = "{endpoint_url}"'
+        for service in ("iam", "kms", "secretsmanager", "sts")
+    )
+    with open(osp.join(directory, "main.tf"), "w") as fp:
+        fp.write(f"""
+provider "aws" {{
+  region                      = "{REGION}"
+  access_key                  = "testing"
+  secret_key                  = "testing"
+  skip_credentials_validation = true
+  skip_metadata_api_check     = true
+  skip_requesting_account_id  = true
+  endpoints {{
+{endpoints}
+  }}
+}}
+
+module "secret" {{
+  count              = {instances}
+  source             = "{MODULE_DIR}"
+  secret_description = "terraform-aws-secret scale benchmark"
+  secret_name        = "module-scale-${{count.index}}"
+  secret_value       = "bench"
+  environment        = "development"
+  service_name       = "module-scale"
+{extra}
+}}
+""")
+
+
+def run_terraform(directory, args, counter, spawn_log, parallelism):
+    """
+    Run a terraform command and return what it cost.
+    """
+    open(spawn_log, "w").close()
+    counter.pop()
+    started = time.perf_counter()
+    subprocess.run(
+        ["terraform", f"-chdir={directory}", *args, f"-parallelism={parallelism}"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    wall_time = time.perf_counter() - started
+    with open(spawn_log) as fp:
+        spawns = sum(1 for _ in fp)
+
+    return {
+        "wall_time": wall_time,
+        "process_spawns": spawns,
+        "calls": counter.pop(),
+    }
+
+
+def benchmark(instances, workdir, endpoint_url, counter, args):
+    directory = osp.join(workdir, str(instances))
+    os.makedirs(directory)
+    reset_moto(endpoint_url)
+    write_root_module(directory, instances, endpoint_url, args.module_arg)
+    subprocess.run(
+        ["terraform", f"-chdir={directory}", "init", "-input=false"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    spawn_log = osp.join(workdir, "spawns.log")
+    return {
+        command[0]: run_terraform(
+            directory, command, counter, spawn_log, args.parallelism
+        )
+        for command in (
+            ["apply", "-auto-approve", "-input=false"],
+            ["plan", "-input=false"],
+        )
+    }
+
+
+def benchmark_get_secret(endpoint_url, counter, runs):
+    role_arn = reset_moto(endpoint_url)
+    secret_arn = boto3.client("secretsmanager", region_name=REGION).create_secret(
+        Name="module-scale-direct", SecretString="bench"
+    )["ARN"]
+    counter.pop()
+    result = measure(
+        [sys.executable, READERS["boto3"], REGION, secret_arn, role_arn], runs
+    )
+    result["calls"] = counter.pop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--parallelism", type=int, default=10)
+    parser.add_argument(
+        "--runs", type=int, default=10, help="Direct get_secret.py runs."
+    )
+    parser.add_argument(
+        "--module-arg",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Extra argument of the module, VALUE in HCL. Can be repeated.",
+    )
+    args = parser.parse_args()
+
+    server, counter = start_moto()
+    endpoint_url = f"http://127.0.0.1:{server.server_port}"
+    workdir = tempfile.mkdtemp(prefix="module-scale-")
+    bin_dir = osp.join(workdir, "bin")
+    os.makedirs(bin_dir)
+    write_python_shim(bin_dir, osp.join(workdir, "spawns.log"))
+    os.environ.update(
+        {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": REGION,
+            "AWS_ENDPOINT_URL": endpoint_url,
+            "AWS_EC2_METADATA_DISABLED": "true",
+            "INFRAHOUSE_SECRET_CACHE_DIR": osp.join(workdir, "cache"),
+            "PATH": bin_dir + os.pathsep + os.environ.get("PATH", ""),
+        }
+    )
+    try:
+        results = {
+            "module_args": args.module_arg,
+            "parallelism": args.parallelism,
+            "instances": {
+                str(instances): benchmark(
+                    instances, workdir, endpoint_url, counter, args
+                )
+                for instances in args.instances
+            },
+            "get_secret": benchmark_get_secret(endpoint_url, counter, args.runs),
+        }
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compare terraform plan time of the secret value read modes.
+
+For every instance count the benchmark creates a root module with that many
+instances of the module, applies it once, and then times ``terraform plan``
+with each ``secret_value_read_mode``. Every plan refreshes the same secrets,
+so the difference between the modes is the cost of reading the values.
+The secrets are destroyed at the end unless ``--workdir`` is given; then the
+root modules and their state stay there, one directory per instance count.
+
+It needs terraform and AWS credentials of an assumed role, like the module
+itself. Results are printed as JSON, times are in seconds.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from os import path as osp
+from textwrap import dedent
+
+MODULE_DIR = osp.dirname(osp.dirname(osp.abspath(__file__)))
+READ_MODES = ["external", "native", "none"]
+
+
+def write_root_module(directory, region, role_arn):
+    assume_role = f'assume_role {{ role_arn = "{role_arn}" }}' if role_arn else ""
+    with open(osp.join(directory, "main.tf"), "w") as fp:
+        fp.write(dedent(f"""
+                provider "aws" {{
+                  region = "{region}"
+                  {assume_role}
+                }}
+
+                variable "instances" {{}}
+                variable "read_mode" {{}}
+
+                module "secret" {{
+                  count                  = var.instances
+                  source                 = "{MODULE_DIR}"
+                  secret_description     = "terraform-aws-secret plan benchmark"
+                  secret_name_prefix     = "plan-benchmark-${{count.index}}-"
+                  secret_value           = "bench"
+                  environment            = "development"
+                  service_name           = "plan-benchmark"
+                  secret_value_read_mode = var.read_mode
+                }}
+                """))
+
+
+def terraform(directory, *args, instances, read_mode, parallelism):
+    command = [
+        "terraform",
+        f"-chdir={directory}",
+        *args,
+        "-input=false",
+        f"-parallelism={parallelism}",
+        "-var",
+        f"instances={instances}",
+        "-var",
+        f"read_mode={read_mode}",
+    ]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+
+def measure(directory, instances, read_mode, runs, parallelism):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        terraform(
+            directory,
+            "plan",
+            "-lock=false",
+            instances=instances,
+            read_mode=read_mode,
+            parallelism=parallelism,
+        )
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+    }
+
+
+def benchmark(instances, args):
+    if args.workdir:
+        directory = osp.join(args.workdir, str(instances))
+        os.makedirs(directory, exist_ok=True)
+        return _benchmark(directory, instances, args, destroy=False)
+
+    with tempfile.TemporaryDirectory(prefix="plan-benchmark-") as directory:
+        return _benchmark(directory, instances, args, destroy=True)
+
+
+def _benchmark(directory, instances, args, destroy):
+    write_root_module(directory, args.region, args.role_arn)
+    subprocess.run(
+        ["terraform", f"-chdir={directory}", "init", "-input=false"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    options = {"instances": instances, "parallelism": args.parallelism}
+    terraform(directory, "apply", "-auto-approve", read_mode=args.modes[0], **options)
+    try:
+        return {
+            mode: measure(directory, instances, mode, args.runs, args.parallelism)
+            for mode in args.modes
+        }
+    finally:
+        if destroy:
+            terraform(
+                directory,
+                "destroy",
+                "-auto-approve",
+                read_mode=args.modes[0],
+                **options,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--instances", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument(
+        "--modes", nargs="+", choices=READ_MODES, default=["external", "native"]
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--parallelism", type=int, default=10)
+    parser.add_argument("--region", default="us-west-1")
+    parser.add_argument("--role-arn", help="Role the AWS provider assumes.")
+    parser.add_argument(
+        "--workdir", help="Keep the root modules and the secrets in this directory."
+    )
+    args = parser.parse_args()
+
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "parallelism": args.parallelism,
+                "results": {
+                    str(instances): benchmark(instances, args)
+                    for instances in args.instances
+                },
+            },
+            indent=4,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,10 +11,42 @@ data "aws_iam_role" "caller_role" {
 # Returns the actual value after user sets it via AWS Console/CLI.
 # This enables the "external update" workflow. See README for use cases.
 data "external" "secret_value" {
-  program = [
-    "python", "${path.module}/assets/get_secret.py", data.aws_region.current.name,
-    aws_secretsmanager_secret.secret.id, data.aws_iam_role.caller_role.arn
+  count = var.secret_value_read_mode == "external" ? 1 : 0
+  program = concat(
+    [
+      "python", "${path.module}/assets/${local.get_secret_script}", data.aws_region.current.name,
+      aws_secretsmanager_secret.secret.id, data.aws_iam_role.caller_role.arn
+    ],
+    local.get_secret_options,
+  )
+  depends_on = [
+    aws_secretsmanager_secret_version.current
   ]
+}
+
+# The same value read by the AWS provider with its own credentials,
+# for secret_value_read_mode = "native". No process is spawned per instance.
+data "aws_secretsmanager_secret_version" "secret_value" {
+  count         = var.secret_value_read_mode == "native" ? 1 : 0
+  secret_id     = aws_secretsmanager_secret.secret.id
+  version_stage = "AWSCURRENT"
+  depends_on = [
+    aws_secretsmanager_secret_version.current
+  ]
+}
+
+# Only the id of the AWSCURRENT version, for secret_value_read_mode = "fingerprint".
+# The state keeps the id instead of the value, whatever the size of the secret.
+data "external" "secret_fingerprint" {
+  count = var.secret_value_read_mode == "fingerprint" ? 1 : 0
+  program = concat(
+    [
+      "python", "${path.module}/assets/${local.get_secret_script}", data.aws_region.current.name,
+      aws_secretsmanager_secret.secret.id, data.aws_iam_role.caller_role.arn, "--fingerprint"
+    ],
+    local.client_config_options,
+    var.cache_credentials ? [] : ["--no-credentials-cache"],
+  )
   depends_on = [
     aws_secretsmanager_secret_version.current
   ]
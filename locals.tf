@@ -9,47 +9,56 @@ locals {
     (var.secret_name == null && var.secret_name_prefix != null)
   )
 
-  access_analyzer_actions = [
-    "secretsmanager:DescribeSecret",
-    "secretsmanager:GetResourcePolicy",
-    "secretsmanager:ListSecrets",
-  ]
-  list_actions = [
-    "secretsmanager:BatchGetSecretValue",
-    "secretsmanager:ListSecrets",
-  ]
-  admin_actions = [
-    "secretsmanager:CreateSecret",
-    "secretsmanager:DeleteSecret",
-    "secretsmanager:StopReplicationToReplica",
-    "secretsmanager:ReplicateSecretToRegions",
-    "secretsmanager:RemoveRegionsFromReplication",
-  ]
-  read_actions = [
-    "secretsmanager:DescribeSecret",
-    "secretsmanager:GetSecretValue",
-    "secretsmanager:GetRandomPassword",
-    "secretsmanager:ListSecretVersionIds",
-    "secretsmanager:GetResourcePolicy",
-  ]
-  write_actions = [
-    "secretsmanager:PutSecretValue",
-    "secretsmanager:CancelRotateSecret",
-    "secretsmanager:UpdateSecret",
-    "secretsmanager:RestoreSecret",
-    "secretsmanager:RotateSecret",
-    "secretsmanager:UpdateSecretVersionStage",
-  ]
-  permission_management_actions = [
-    "secretsmanager:DeleteResourcePolicy",
-    "secretsmanager:PutResourcePolicy",
-    "secretsmanager:ValidateResourcePolicy",
-  ]
-  tagging_actions = [
-    "secretsmanager:TagResource",
-    "secretsmanager:UntagResource",
-  ]
-  all_actions = ["*"]
+  get_secret_script = var.secret_reader == "stdlib" ? "get_secret_lite.py" : "get_secret.py"
+
+  # Arguments for assets/get_secret.py after the positional
+  # region, secret id and role ARN.
+  get_secret_options = concat(
+    var.cache_credentials ? [] : ["--no-credentials-cache"],
+    var.batch_secret_reads ? ["--batch"] : [],
+    var.use_secret_daemon ? ["--daemon"] : [],
+    var.cache_secret_values ? ["--value-cache"] : [],
+    local.client_config_options,
+    local.memo_options,
+    var.cache_secret_values || var.secret_value_memo_ttl > 0 ? local.cache_backend_options : [],
+  )
+
+  # var.secret_cache_backend as arguments of assets/cache_backends.py.
+  cache_backend_options = flatten([
+    for name, value in var.secret_cache_backend : [
+      name == "type" ? "--cache-backend" : "--cache-${replace(name, "_", "-")}",
+      tostring(value),
+    ]
+    if value != null
+  ])
+
+  # Reads shared for var.secret_value_memo_ttl seconds, see assets/plan_memo.py.
+  # The version id keeps a value Terraform has just written from being
+  # answered by an older read.
+  memo_options = var.secret_value_memo_ttl > 0 ? [
+    "--memo-ttl", tostring(var.secret_value_memo_ttl),
+    "--memo-scope", aws_secretsmanager_secret_version.current.version_id,
+  ] : []
+
+  # var.secret_reader_client_config as arguments of assets/client_options.py.
+  client_config_options = concat(
+    flatten([
+      for name, value in var.secret_reader_client_config : [
+        "--${replace(name, "_", "-")}", tostring(value)
+      ]
+      if value != null && !contains(["sts_regional_endpoint", "use_fips_endpoint"], name)
+    ]),
+    var.secret_reader_client_config.use_fips_endpoint == true ? ["--use-fips-endpoint"] : [],
+    var.secret_reader_client_config.sts_regional_endpoint == false ? ["--sts-global-endpoint"] : [],
+  )
+
+  # The secret value as read by var.secret_value_read_mode, null for "none".
+  read_secret_value = one(
+    concat(
+      data.external.secret_value[*].result["SECRET_VALUE"],
+      data.aws_secretsmanager_secret_version.secret_value[*].secret_string,
+    )
+  )
 
   default_module_tags = {
     environment : var.environment
@@ -58,13 +67,6 @@ locals {
     created_by_module : "infrahouse/secret/aws"
   }
 
-  readers_only = var.readers != null ? (
-    var.writers != null ? setsubtract(
-      toset(var.readers),
-      toset(var.writers)
-    ) : var.readers
-  ) : null
-
   cross_account_writers = [
     for arn in concat(
       var.admins == null ? [] : var.admins,
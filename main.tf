@@ -20,7 +20,7 @@ resource "aws_secretsmanager_secret" "secret" {
   name_prefix             = var.secret_name_prefix
   kms_key_id              = local.effective_kms_key_id
   recovery_window_in_days = 0
-  policy                  = data.aws_iam_policy_document.permission-policy.json
+  policy                  = module.permission_policy.json
   tags = merge(
     {
       owner : var.owner == null ? data.aws_iam_role.caller_role.arn : var.owner
@@ -0,0 +1,50 @@
+locals {
+  access_analyzer_actions = [
+    "secretsmanager:DescribeSecret",
+    "secretsmanager:GetResourcePolicy",
+    "secretsmanager:ListSecrets",
+  ]
+  list_actions = [
+    "secretsmanager:BatchGetSecretValue",
+    "secretsmanager:ListSecrets",
+  ]
+  admin_actions = [
+    "secretsmanager:CreateSecret",
+    "secretsmanager:DeleteSecret",
+    "secretsmanager:StopReplicationToReplica",
+    "secretsmanager:ReplicateSecretToRegions",
+    "secretsmanager:RemoveRegionsFromReplication",
+  ]
+  read_actions = [
+    "secretsmanager:DescribeSecret",
+    "secretsmanager:GetSecretValue",
+    "secretsmanager:GetRandomPassword",
+    "secretsmanager:ListSecretVersionIds",
+    "secretsmanager:GetResourcePolicy",
+  ]
+  write_actions = [
+    "secretsmanager:PutSecretValue",
+    "secretsmanager:CancelRotateSecret",
+    "secretsmanager:UpdateSecret",
+    "secretsmanager:RestoreSecret",
+    "secretsmanager:RotateSecret",
+    "secretsmanager:UpdateSecretVersionStage",
+  ]
+  permission_management_actions = [
+    "secretsmanager:DeleteResourcePolicy",
+    "secretsmanager:PutResourcePolicy",
+    "secretsmanager:ValidateResourcePolicy",
+  ]
+  tagging_actions = [
+    "secretsmanager:TagResource",
+    "secretsmanager:UntagResource",
+  ]
+  all_actions = ["*"]
+
+  readers_only = var.readers != null ? (
+    var.writers != null ? setsubtract(
+      toset(var.readers),
+      toset(var.writers)
+    ) : var.readers
+  ) : null
+}
@@ -0,0 +1,178 @@
+data "aws_iam_policy_document" "permission-policy" {
+  statement {
+    principals {
+      identifiers = ["*"]
+      type        = "AWS"
+    }
+    condition {
+      test     = "ArnLike"
+      values   = concat(var.admins == null ? [] : var.admins, [var.caller_role_arn])
+      variable = "aws:PrincipalArn"
+    }
+    actions = local.all_actions
+    resources = [
+      "*"
+    ]
+  }
+
+  ## Writers
+  dynamic "statement" {
+    for_each = var.writers != null ? [{}] : []
+    content {
+      principals {
+        identifiers = ["*"]
+        type        = "AWS"
+      }
+      condition {
+        test     = "ArnLike"
+        values   = var.writers
+        variable = "aws:PrincipalArn"
+      }
+      actions = concat(
+        local.list_actions,
+        local.read_actions,
+        local.write_actions
+      )
+      resources = [
+        "*"
+      ]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = var.writers != null ? [{}] : []
+    content {
+      effect = "Deny"
+      principals {
+        identifiers = ["*"]
+        type        = "AWS"
+      }
+      condition {
+        test     = "ArnLike"
+        values   = var.writers
+        variable = "aws:PrincipalArn"
+      }
+      actions = concat(
+        local.admin_actions,
+        local.permission_management_actions,
+        local.tagging_actions
+      )
+      resources = [
+        "*"
+      ]
+    }
+  }
+
+  ## Readers
+  dynamic "statement" {
+    for_each = var.readers != null ? [{}] : []
+    content {
+      principals {
+        identifiers = ["*"]
+        type        = "AWS"
+      }
+      condition {
+        test     = "ArnLike"
+        values   = local.readers_only
+        variable = "aws:PrincipalArn"
+      }
+      actions = local.read_actions
+      resources = [
+        "*"
+      ]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = var.readers != null ? [{}] : []
+    content {
+      effect = "Deny"
+      principals {
+        identifiers = ["*"]
+        type        = "AWS"
+      }
+      condition {
+        test     = "ArnLike"
+        values   = local.readers_only
+        variable = "aws:PrincipalArn"
+      }
+      actions = concat(
+        local.list_actions,
+        local.admin_actions,
+        local.write_actions,
+        local.permission_management_actions,
+        local.tagging_actions
+      )
+      resources = [
+        "*"
+      ]
+    }
+  }
+
+  # Access Analyzer permissions
+  dynamic "statement" {
+    for_each = var.access_analyzer_role_arns
+    content {
+      effect = "Allow"
+      principals {
+        type = "AWS"
+        identifiers = [
+          statement.key
+        ]
+      }
+      actions   = local.access_analyzer_actions
+      resources = ["*"]
+    }
+  }
+
+  dynamic "statement" {
+    for_each = var.access_analyzer_role_arns
+    content {
+      effect = "Deny"
+      principals {
+        type = "AWS"
+        identifiers = [
+          statement.key
+        ]
+      }
+      actions = setsubtract(
+        concat(
+          local.list_actions,
+          local.read_actions,
+          local.write_actions,
+          local.admin_actions,
+          local.permission_management_actions,
+          local.tagging_actions,
+        ),
+        local.access_analyzer_actions
+      )
+      resources = ["*"]
+    }
+  }
+
+  ## The rest
+  statement {
+    effect = "Deny"
+    principals {
+      type        = "AWS"
+      identifiers = ["*"]
+    }
+    actions = local.all_actions
+    resources = [
+      "*"
+    ]
+    condition {
+      test = "ArnNotLike"
+      values = concat(
+        [
+          var.caller_role_arn,
+        ],
+        tolist(var.access_analyzer_role_arns),
+        var.admins == null ? [] : var.admins,
+        var.writers == null ? [] : var.writers,
+        var.readers == null ? [] : var.readers
+      )
+      variable = "aws:PrincipalArn"
+    }
+  }
+}
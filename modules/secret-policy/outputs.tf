@@ -0,0 +1,4 @@
+output "json" {
+  description = "The resource policy of the secret as JSON."
+  value       = data.aws_iam_policy_document.permission-policy.json
+}
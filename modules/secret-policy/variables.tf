@@ -0,0 +1,28 @@
+variable "caller_role_arn" {
+  description = "ARN of the role that manages the secret. It gets full access."
+  type        = string
+}
+
+variable "access_analyzer_role_arns" {
+  description = "ARNs of the IAM Access Analyzer service roles. They may only describe the secret."
+  type        = set(string)
+  default     = []
+}
+
+variable "admins" {
+  description = "List of role ARNs that will have all permissions of the secret."
+  type        = list(string)
+  default     = null
+}
+
+variable "writers" {
+  description = "List of role ARNs that will have write permissions of the secret."
+  type        = list(string)
+  default     = null
+}
+
+variable "readers" {
+  description = "List of role ARNs that will have read permissions of the secret."
+  type        = list(string)
+  default     = null
+}
@@ -0,0 +1,40 @@
+# Read once for all secrets of the module call.
+data "aws_caller_identity" "current" {}
+data "aws_region" "current" {}
+
+data "aws_iam_role" "caller_role" {
+  name = split("/", split(":", data.aws_caller_identity.current.arn)[5])[1]
+}
+
+data "aws_iam_roles" "access-analyzer" {
+  name_regex  = "AWSServiceRoleForAccessAnalyzer"
+  path_prefix = "/aws-service-role/access-analyzer.amazonaws.com/"
+}
+
+# All secret values, read by one process for secret_value_read_mode = "external".
+# BatchGetSecretValue returns up to 20 secrets per call.
+data "external" "secret_values" {
+  count = var.secret_value_read_mode == "external" && length(var.secrets) > 0 ? 1 : 0
+  program = concat(
+    [
+      "python", "${path.module}/../../assets/read_secrets.py", data.aws_region.current.name,
+      data.aws_iam_role.caller_role.arn
+    ],
+    [for key in sort(keys(var.secrets)) : aws_secretsmanager_secret.secret[key].arn],
+    ["--batch", "--terraform"],
+    local.client_config_options,
+    var.cache_credentials ? [] : ["--no-credentials-cache"],
+  )
+  depends_on = [
+    aws_secretsmanager_secret_version.current
+  ]
+}
+
+data "aws_secretsmanager_secret_version" "secret_value" {
+  for_each      = var.secret_value_read_mode == "native" ? var.secrets : {}
+  secret_id     = aws_secretsmanager_secret.secret[each.key].id
+  version_stage = "AWSCURRENT"
+  depends_on = [
+    aws_secretsmanager_secret_version.current
+  ]
+}
@@ -0,0 +1,43 @@
+locals {
+  module_version = "1.3.0"
+
+  default_module_tags = {
+    environment : var.environment
+    service : var.service_name
+    account : data.aws_caller_identity.current.account_id
+    created_by_module : "infrahouse/secret/aws"
+  }
+
+  # var.secret_reader_client_config as arguments of assets/client_options.py.
+  client_config_options = concat(
+    flatten([
+      for name, value in var.secret_reader_client_config : [
+        "--${replace(name, "_", "-")}", tostring(value)
+      ]
+      if value != null && !contains(["sts_regional_endpoint", "use_fips_endpoint"], name)
+    ]),
+    var.secret_reader_client_config.use_fips_endpoint == true ? ["--use-fips-endpoint"] : [],
+    var.secret_reader_client_config.sts_regional_endpoint == false ? ["--sts-global-endpoint"] : [],
+  )
+
+  # The version ids Terraform wrote, null for the secrets whose value is
+  # managed outside Terraform.
+  written_version_ids = {
+    for key, version in aws_secretsmanager_secret_version.current :
+    key => nonsensitive(lookup(var.secret_values, key, null) == null) ? null : version.version_id
+  }
+
+  # The values read by var.secret_value_read_mode, by the keys of var.secrets.
+  external_values = one(data.external.secret_values[*].result)
+  read_secret_values = merge(
+    {
+      for key, secret in aws_secretsmanager_secret.secret :
+      key => local.external_values[secret.arn]
+      if local.external_values != null
+    },
+    {
+      for key, version in data.aws_secretsmanager_secret_version.secret_value :
+      key => version.secret_string
+    },
+  )
+}
@@ -0,0 +1,38 @@
+module "permission_policy" {
+  source   = "../secret-policy"
+  for_each = var.secrets
+
+  caller_role_arn           = data.aws_iam_role.caller_role.arn
+  access_analyzer_role_arns = data.aws_iam_roles.access-analyzer.arns
+  admins                    = each.value.admins
+  writers                   = each.value.writers
+  readers                   = each.value.readers
+}
+
+resource "aws_secretsmanager_secret" "secret" {
+  for_each                = var.secrets
+  description             = each.value.secret_description
+  name                    = each.value.secret_name
+  name_prefix             = each.value.secret_name_prefix
+  kms_key_id              = each.value.kms_key_id == null ? var.kms_key_id : each.value.kms_key_id
+  recovery_window_in_days = 0
+  policy                  = module.permission_policy[each.key].json
+  tags = merge(
+    {
+      owner : coalesce(each.value.owner, var.owner, data.aws_iam_role.caller_role.arn)
+      module_version : local.module_version
+    },
+    var.tags,
+    each.value.tags,
+    local.default_module_tags,
+  )
+}
+
+resource "aws_secretsmanager_secret_version" "current" {
+  for_each      = var.secrets
+  secret_id     = aws_secretsmanager_secret.secret[each.key].id
+  secret_string = lookup(var.secret_values, each.key, null) == null ? "NoValue" : var.secret_values[each.key]
+  version_stages = [
+    lookup(var.secret_values, each.key, null) == null ? "INITIAL" : "AWSCURRENT"
+  ]
+}
@@ -0,0 +1,31 @@
+output "secrets" {
+  description = <<-EOT
+    The secrets by the keys of var.secrets: their arn, name, id and
+    reference, the same as the secret_reference output of the root module.
+    version_id is null for a secret without a value.
+  EOT
+  value = {
+    for key, secret in aws_secretsmanager_secret.secret : key => {
+      arn  = secret.arn
+      name = secret.name
+      id   = secret.id
+      reference = {
+        arn           = secret.arn
+        version_id    = local.written_version_ids[key]
+        version_stage = "AWSCURRENT"
+      }
+    }
+  }
+}
+
+output "secret_values" {
+  description = <<-EOT
+    The secret values by the keys of var.secrets, null for a secret without a
+    value. Empty with secret_value_read_mode = "none".
+  EOT
+  value = {
+    for key, value in local.read_secret_values :
+    key => contains(["", "NoValue"], value) ? null : value
+  }
+  sensitive = true
+}
@@ -0,0 +1,133 @@
+variable "secrets" {
+  description = <<-EOT
+    Secrets to manage, by a key of your choice. Each secret needs exactly one
+    of secret_name or secret_name_prefix. readers, writers and admins work as
+    in the root module. owner, kms_key_id and tags override or extend the
+    module-wide values of the same name. The values are in var.secret_values.
+  EOT
+  type = map(object({
+    secret_description = string
+    secret_name        = optional(string)
+    secret_name_prefix = optional(string)
+    readers            = optional(list(string))
+    writers            = optional(list(string))
+    admins             = optional(list(string))
+    owner              = optional(string)
+    kms_key_id         = optional(string)
+    tags               = optional(map(string), {})
+  }))
+
+  validation {
+    condition = alltrue([
+      for secret in values(var.secrets) :
+      (secret.secret_name == null) != (secret.secret_name_prefix == null)
+    ])
+    error_message = "Exactly one of secret_name or secret_name_prefix must be set for every secret (not both, not neither)"
+  }
+}
+
+variable "secret_values" {
+  description = <<-EOT
+    Optional values of the secrets, by the keys of var.secrets. A secret
+    without a value gets the placeholder "NoValue", like in the root module.
+  EOT
+  type        = map(string)
+  default     = {}
+  sensitive   = true
+}
+
+variable "environment" {
+  description = "Name of environment."
+  type        = string
+
+  validation {
+    condition     = can(regex("^[a-z0-9_]+$", var.environment))
+    error_message = "environment must contain only lowercase letters, numbers, and underscores (no hyphens). Got: ${var.environment}"
+  }
+}
+
+variable "service_name" {
+  description = "Descriptive name of a service that will use these secrets."
+  type        = string
+}
+
+variable "owner" {
+  description = "A tag owner with this value will be placed on the secrets."
+  type        = string
+  default     = null
+}
+
+variable "kms_key_id" {
+  description = <<-EOT
+    ARN or ID of a customer-managed KMS key to encrypt the secrets.
+    When null (default), the secrets use the AWS-managed key
+    (aws/secretsmanager).
+  EOT
+  type        = string
+  default     = null
+}
+
+variable "tags" {
+  description = "Tags to apply to all secrets."
+  type        = map(string)
+  default     = {}
+}
+
+variable "secret_value_read_mode" {
+  description = <<-EOT
+    How the module reads the secret values back for the secret_values output.
+    "external" (default) reads all of them with one assets/read_secrets.py
+    process, with BatchGetSecretValue. "native" uses one
+    aws_secretsmanager_secret_version data source per secret. "none" reads
+    nothing and leaves secret_values empty.
+  EOT
+  type        = string
+  default     = "external"
+
+  validation {
+    condition     = contains(["external", "native", "none"], var.secret_value_read_mode)
+    error_message = "secret_value_read_mode must be one of \"external\", \"native\" or \"none\"."
+  }
+}
+
+variable "cache_credentials" {
+  description = <<-EOT
+    Whether the secret reader may cache the assumed-role credentials on disk,
+    see the variable of the same name in the root module.
+  EOT
+  type        = bool
+  default     = true
+}
+
+variable "secret_reader_client_config" {
+  description = <<-EOT
+    Settings of the AWS clients the secret reader uses, see the variable of
+    the same name in the root module.
+  EOT
+  type = object({
+    sts_regional_endpoint       = optional(bool)
+    retry_mode                  = optional(string)
+    max_attempts                = optional(number)
+    connect_timeout             = optional(number)
+    read_timeout                = optional(number)
+    max_pool_connections        = optional(number)
+    use_fips_endpoint           = optional(bool)
+    secretsmanager_endpoint_url = optional(string)
+    sts_endpoint_url            = optional(string)
+    rate_limit                  = optional(number)
+  })
+  default = {}
+
+  validation {
+    condition = contains(
+      ["legacy", "standard", "adaptive"],
+      coalesce(var.secret_reader_client_config.retry_mode, "standard")
+    )
+    error_message = "secret_reader_client_config.retry_mode must be one of \"legacy\", \"standard\" or \"adaptive\"."
+  }
+
+  validation {
+    condition     = coalesce(var.secret_reader_client_config.rate_limit, 1) > 0
+    error_message = "secret_reader_client_config.rate_limit must be greater than zero."
+  }
+}
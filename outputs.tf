@@ -28,8 +28,39 @@ output "kms_key_id" {
 }
 
 output "secret_value" {
-  description = "The current secret value. If the value isn't set yet, return `null`."
-  # External data source converts null to empty string, so we convert back to null
-  value     = data.external.secret_value.result["SECRET_VALUE"] == "" ? null : data.external.secret_value.result["SECRET_VALUE"]
+  description = <<-EOT
+    The current secret value. If the value isn't set yet, return `null`.
+    Always `null` when secret_value_read_mode is "fingerprint" or "none".
+  EOT
+  # The external data source returns an empty string for the "NoValue" placeholder,
+  # the native one returns the placeholder itself. Both mean there is no value.
+  # coalesce() maps null (read mode "none") to the placeholder, too.
+  value     = contains(["", "NoValue"], coalesce(local.read_secret_value, "NoValue")) ? null : local.read_secret_value
   sensitive = true
 }
+
+output "secret_version_fingerprint" {
+  description = <<-EOT
+    Id of the AWSCURRENT version as read at plan time when
+    secret_value_read_mode is "fingerprint"; it changes whenever the value
+    does. Null in the other modes or if the secret has no value yet.
+  EOT
+  value = one([
+    for result in data.external.secret_fingerprint[*].result : result["SECRET_VERSION_ID"]
+    if result["SECRET_VERSION_ID"] != ""
+  ])
+}
+
+output "secret_reference" {
+  description = <<-EOT
+    Where to read the secret value at run time instead of at plan time: the
+    secret's arn, the version_stage to read and the version_id Terraform
+    wrote, null when the value is managed outside Terraform. Use it with
+    secret_value_read_mode = "none" and assets/secret_reference.py.
+  EOT
+  value = {
+    arn           = aws_secretsmanager_secret.secret.arn
+    version_id    = nonsensitive(var.secret_value == null) ? null : aws_secretsmanager_secret_version.current.version_id
+    version_stage = "AWSCURRENT"
+  }
+}
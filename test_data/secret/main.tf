@@ -12,6 +12,8 @@ module "test" {
   secret_value = var.secret_value == "generate" ? random_password.value.result : var.secret_value
   tags         = var.tags
   environment  = "development"
+
+  secret_value_read_mode = var.secret_value_read_mode
 }
 
 resource "random_password" "value" {
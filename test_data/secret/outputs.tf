@@ -10,3 +10,7 @@ output "secret_arn" {
 output "secret_name" {
   value = module.test.secret_name
 }
+
+output "secret_version_fingerprint" {
+  value = module.test.secret_version_fingerprint
+}
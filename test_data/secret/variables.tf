@@ -14,3 +14,4 @@ variable "secret_value" {
   default = "bar"
 }
 variable "tags" { default = null }
+variable "secret_value_read_mode" { default = "external" }
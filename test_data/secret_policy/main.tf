@@ -0,0 +1,11 @@
+# Renders the secret policy offline: aws_iam_policy_document makes no API calls.
+module "policy" {
+  source   = "../../modules/secret-policy"
+  for_each = var.cases
+
+  caller_role_arn           = each.value.caller_role_arn
+  access_analyzer_role_arns = each.value.access_analyzer_role_arns
+  admins                    = each.value.admins
+  writers                   = each.value.writers
+  readers                   = each.value.readers
+}
@@ -0,0 +1,3 @@
+output "policies" {
+  value = { for name, policy in module.policy : name => jsondecode(policy.json) }
+}
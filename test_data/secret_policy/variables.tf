@@ -0,0 +1,9 @@
+variable "cases" {
+  type = map(object({
+    caller_role_arn           = string
+    access_analyzer_role_arns = optional(set(string), [])
+    admins                    = optional(list(string))
+    writers                   = optional(list(string))
+    readers                   = optional(list(string))
+  }))
+}
@@ -0,0 +1,21 @@
+# Secrets that tests share: applied once per session, see tests/test_module.py.
+module "test" {
+  source             = "../../"
+  for_each           = var.secrets
+  secret_description = "Foo ${each.key} description"
+  secret_name        = "${var.secret_name}-${each.key}"
+  admins = concat(
+    tolist(data.aws_iam_roles.sso-admin.arns),
+    each.value.admins
+  )
+  writers      = each.value.writers
+  readers      = each.value.readers
+  secret_value = each.value.secret_value == "generate" ? random_password.value[each.key].result : each.value.secret_value
+  environment  = "development"
+  service_name = "secret-tester"
+}
+
+resource "random_password" "value" {
+  for_each = var.secrets
+  length   = 16
+}
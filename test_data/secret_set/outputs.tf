@@ -0,0 +1,8 @@
+output "secret_names" {
+  value = { for key, secret in module.test : key => secret.secret_name }
+}
+
+output "secret_values" {
+  value     = { for key, secret in module.test : key => secret.secret_value }
+  sensitive = true
+}
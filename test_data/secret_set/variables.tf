@@ -0,0 +1,14 @@
+variable "region" {}
+variable "role_arn" {
+  default = null
+}
+
+variable "secret_name" {}
+variable "secrets" {
+  type = map(object({
+    admins       = optional(list(string), [])
+    writers      = optional(list(string))
+    readers      = optional(list(string))
+    secret_value = optional(string)
+  }))
+}
@@ -0,0 +1,17 @@
+module "test" {
+  source       = "../../modules/secrets"
+  environment  = "development"
+  service_name = "secret-tester"
+
+  secrets = {
+    for name in var.secret_names : name => {
+      secret_name        = name
+      secret_description = "Secret ${name}"
+      admins             = var.admins
+      readers            = var.readers
+    }
+  }
+  secret_values = var.secret_values
+
+  secret_value_read_mode = var.secret_value_read_mode
+}
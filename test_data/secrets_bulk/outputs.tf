@@ -0,0 +1,8 @@
+output "secrets" {
+  value = module.test.secrets
+}
+
+output "secret_values" {
+  value     = module.test.secret_values
+  sensitive = true
+}
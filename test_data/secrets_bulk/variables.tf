@@ -0,0 +1,15 @@
+variable "region" {}
+variable "role_arn" {
+  default = null
+}
+
+variable "admins" { default = [] }
+variable "readers" { default = [] }
+variable "secret_names" { default = ["foo-bulk-0", "foo-bulk-1", "foo-bulk-2"] }
+variable "secret_values" {
+  default = {
+    "foo-bulk-0" = "bar0"
+    "foo-bulk-1" = "bar1"
+  }
+}
+variable "secret_value_read_mode" { default = "external" }
@@ -1,11 +1,24 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.resources import as_file, files
+from os import path as osp
+from pathlib import Path
 from textwrap import dedent
 
 import boto3
 import pytest
-import logging
-from os import path as osp
-
 from infrahouse_core.logging import setup_logging
+import pytest_infrahouse.terraform
 from pytest_infrahouse import terraform_apply
 
 MODULE_VERSION = "1.3.0"
@@ -13,6 +26,26 @@ DEFAULT_PROGRESS_INTERVAL = 10
 
 LOG = logging.getLogger()
 TERRAFORM_ROOT_DIR = "test_data"
+# Tests in these files deploy to a real AWS account, see the "aws" marker.
+AWS_TEST_FILES = ("test_module.py", "test_module_cmk.py")
+REPO_ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+ASSETS_DIR = osp.join(REPO_ROOT, "assets")
+# Set by pytest-xdist in its workers, e.g. "gw3".
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "main")
+# Providers and lock files shared by the terraform init runs of all sessions.
+TERRAFORM_CACHE_DIR = os.environ.get(
+    "TERRAFORM_TEST_CACHE_DIR",
+    osp.join(osp.expanduser("~"), ".cache", "terraform-aws-secret-tests"),
+)
+# (terraform directory, seconds init took, seconds saved) of this process.
+INIT_TIMES = []
+# (terraform directory, seconds) of the inits terraform_apply() runs again.
+REINIT_TIMES = []
+# (description, seconds, attempts) of the wait_for() calls of this process.
+CONVERGENCE_TIMES = []
+
+# assets/get_secret.py is a script, not a package; make its modules importable.
+sys.path.insert(0, ASSETS_DIR)
 
 
 setup_logging(LOG, debug_botocore=False)
@@ -23,6 +56,37 @@ def pytest_configure(config):
         "markers",
         "manual: cross-account test, run by hand only (excluded from CI)",
     )
+    config.addinivalue_line(
+        "markers",
+        "aws: deploys to a real AWS account; deselect with -m 'not aws' "
+        "for the offline tier",
+    )
+
+
+def pytest_terminal_summary(terminalreporter):
+    if INIT_TIMES:
+        took = sum(seconds for _, seconds, _ in INIT_TIMES)
+        saved = sum(seconds for _, _, seconds in INIT_TIMES)
+        terminalreporter.write_line(
+            f"terraform init: {len(INIT_TIMES)} runs took {took:.1f}s, "
+            f"the provider cache saved {saved:.1f}s"
+        )
+    if REINIT_TIMES:
+        took = sum(seconds for _, seconds in REINIT_TIMES)
+        terminalreporter.write_line(
+            f"terraform init again in terraform_apply: {len(REINIT_TIMES)} runs "
+            f"took {took:.1f}s"
+        )
+    for description, seconds, attempts in CONVERGENCE_TIMES:
+        terminalreporter.write_line(
+            f"converged: {description} after {seconds:.1f}s, {attempts} attempts"
+        )
+
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if item.path.name in AWS_TEST_FILES:
+            item.add_marker(pytest.mark.aws)
 
 
 def get_secretsmanager_client_by_role(role_name, boto3_session, region):
@@ -36,3 +100,272 @@ def get_secretsmanager_client_by_role(role_name, boto3_session, region):
         aws_secret_access_key=response["Credentials"]["SecretAccessKey"],
         aws_session_token=response["Credentials"]["SessionToken"],
     ).client("secretsmanager", region_name=region)
+
+
+def wait_for(
+    description,
+    check,
+    timeout=60,
+    retry_on=(),
+    base_delay=0.25,
+    max_delay=8,
+    sleep=time.sleep,
+    clock=time.monotonic,
+):
+    """
+    Call check() until it returns a true value, and return that value.
+
+    Use it for changes that take a while to propagate, e.g. IAM and KMS
+    permissions. The first call is immediate; the waits after that grow
+    exponentially from base_delay to max_delay, with full jitter. Exceptions
+    of the types in retry_on count as "not yet". How long it took is logged
+    and listed at the end of the run.
+
+    :raise TimeoutError: if check() isn't true after timeout seconds. The last
+        retried exception, if any, is its cause.
+    """
+    started = clock()
+    deadline = started + timeout
+    error = None
+    for attempt in range(1, sys.maxsize):
+        try:
+            result = check()
+            error = None
+        except retry_on as err:
+            result, error = None, err
+        if result:
+            seconds = clock() - started
+            CONVERGENCE_TIMES.append((description, seconds, attempt))
+            LOG.info("%s after %.1fs, %d attempts", description, seconds, attempt)
+            return result
+
+        now = clock()
+        if now >= deadline:
+            raise TimeoutError(
+                f"Not {description} after {timeout}s, {attempt} attempts"
+            ) from error
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+        sleep(min(delay, deadline - now))
+
+
+def copy_terraform_root(source_dir, destination):
+    """
+    Copy the Terraform files of a root module to destination and return it.
+
+    Relative module sources are rewritten to point at the original location,
+    so the copy works anywhere.
+    """
+
+    def rewrite(match):
+        target = osp.normpath(osp.join(source_dir, match.group(2)))
+        source = osp.relpath(target, destination)
+        if not source.startswith(".."):
+            source = f"./{source}"
+        return f'{match.group(1)}"{source}"'
+
+    os.makedirs(destination, exist_ok=True)
+    for name in os.listdir(source_dir):
+        if not name.endswith(".tf"):
+            continue
+        with open(osp.join(source_dir, name)) as fp:
+            content = fp.read()
+        with open(osp.join(destination, name), "w") as fp:
+            fp.write(re.sub(r'(source\s*=\s*)"(\.\.?/[^"]*)"', rewrite, content))
+    return destination
+
+
+def terraform_init(terraform_dir):
+    """
+    Run terraform init in terraform_dir with the shared provider cache and
+    return the seconds it took.
+
+    Providers are kept in $TF_PLUGIN_CACHE_DIR. Terraform links them from
+    there only if the lock file already has their checksums. So the first
+    init of a configuration saves its lock file in the cache, named by a hash
+    of the files that choose the providers. Later inits of the same
+    configuration start from that lock file and download nothing.
+    """
+    os.environ.setdefault(
+        "TF_PLUGIN_CACHE_DIR", osp.join(TERRAFORM_CACHE_DIR, "plugins")
+    )
+    os.makedirs(os.environ["TF_PLUGIN_CACHE_DIR"], exist_ok=True)
+    locks_dir = osp.join(TERRAFORM_CACHE_DIR, "locks")
+    os.makedirs(locks_dir, exist_ok=True)
+
+    key = provider_key(terraform_dir)
+    seed = osp.join(locks_dir, f"{key}.hcl")
+    lock_file = osp.join(terraform_dir, ".terraform.lock.hcl")
+    seeded = osp.exists(seed)
+    if seeded:
+        shutil.copyfile(seed, lock_file)
+
+    # Concurrent installs into the plugin cache aren't safe.
+    with open(osp.join(TERRAFORM_CACHE_DIR, "init.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        started = time.monotonic()
+        subprocess.run(
+            ["terraform", "init", "-input=false", "-no-color"],
+            cwd=terraform_dir,
+            check=True,
+        )
+        took = time.monotonic() - started
+
+        cold_times = osp.join(TERRAFORM_CACHE_DIR, "cold-init-times.json")
+        try:
+            with open(cold_times) as fp:
+                cold = json.load(fp)
+        except (OSError, ValueError):
+            cold = {}
+        if not seeded:
+            shutil.copyfile(lock_file, f"{seed}.tmp")
+            os.replace(f"{seed}.tmp", seed)
+            cold[key] = took
+            with open(cold_times, "w") as fp:
+                json.dump(cold, fp)
+
+    saved = max(cold.get(key, took) - took, 0)
+    INIT_TIMES.append((terraform_dir, took, saved))
+    LOG.info(
+        "terraform init in %s took %.1fs, %.1fs less than without the cache",
+        terraform_dir,
+        took,
+        saved,
+    )
+    return took
+
+
+def provider_key(terraform_dir):
+    """
+    Return a hash of what decides the providers of the root module in
+    terraform_dir: its Terraform files without the module sources, which
+    differ between copies, and the terraform.tf files of this repository.
+    """
+    digest = hashlib.sha256()
+    paths = [
+        osp.join(terraform_dir, name)
+        for name in sorted(os.listdir(terraform_dir))
+        if name.endswith(".tf")
+    ]
+    paths.append(osp.join(REPO_ROOT, "terraform.tf"))
+    modules_dir = osp.join(REPO_ROOT, "modules")
+    for name in sorted(os.listdir(modules_dir)):
+        paths.append(osp.join(modules_dir, name, "terraform.tf"))
+
+    for path in paths:
+        if not osp.exists(path):
+            continue
+        with open(path) as fp:
+            content = re.sub(r"(?m)^\s*source\s*=.*$", "", fp.read())
+        digest.update(osp.basename(path).encode())
+        digest.update(content.encode())
+    return digest.hexdigest()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def time_terraform_apply_init():
+    """
+    Time the terraform init that terraform_apply() runs before every apply,
+    after the one of terraform_init(), so that the summary counts it too.
+    """
+    run_with_retries = pytest_infrahouse.terraform.run_with_retries
+
+    def timed(cmd, *args, **kwargs):
+        if cmd[:2] != ["terraform", "init"]:
+            return run_with_retries(cmd, *args, **kwargs)
+        started = time.monotonic()
+        try:
+            return run_with_retries(cmd, *args, **kwargs)
+        finally:
+            REINIT_TIMES.append((kwargs.get("cwd"), time.monotonic() - started))
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(pytest_infrahouse.terraform, "run_with_retries", timed)
+        yield
+
+
+@pytest.fixture
+def terraform_root(tmp_path):
+    """
+    Return a function that copies a root module of test_data into the test's
+    temporary directory and returns the path of the copy.
+
+    Every test gets its own tfvars, providers and state, so tests can run in
+    parallel with pytest-xdist (``pytest -n auto``).
+    """
+
+    def copy(name):
+        terraform_module_dir = copy_terraform_root(
+            osp.join(REPO_ROOT, TERRAFORM_ROOT_DIR, name), str(tmp_path / name)
+        )
+        LOG.info("Terraform root %s: %s", name, terraform_module_dir)
+        return terraform_module_dir
+
+    return copy
+
+
+@pytest.fixture(scope="session")
+def secret_name():
+    """
+    Name of the test secret, unique to the pytest-xdist worker.
+    """
+    return f"foo-{WORKER_ID}"
+
+
+@pytest.fixture(scope="session")
+def probe_role(request, aws_region, test_role_arn, keep_after, tmp_path_factory):
+    """
+    The probe role of pytest-infrahouse, applied from a copy per worker.
+
+    The plugin applies its module in place, which workers running in parallel
+    would share.
+    """
+    calling_test = osp.basename(request.node.path)
+    with as_file(files("pytest_infrahouse").joinpath("data/probe-role")) as source:
+        module_dir = str(tmp_path_factory.mktemp("probe-role"))
+        shutil.copytree(
+            source,
+            module_dir,
+            ignore=shutil.ignore_patterns(".terraform*", "terraform.tfstate*"),
+            dirs_exist_ok=True,
+        )
+    with open(osp.join(module_dir, "terraform.tfvars"), "w") as fp:
+        fp.write(f'region       = "{aws_region}"\n')
+        fp.write(f'calling_test = "{calling_test}"\n')
+        if test_role_arn:
+            fp.write(f'role_arn     = "{test_role_arn}"\n')
+            fp.write(f'trusted_arns = ["{test_role_arn}"]\n')
+
+    terraform_init(module_dir)
+    with terraform_apply(
+        module_dir,
+        destroy_after=not keep_after,
+        json_output=True,
+    ) as tf_output:
+        yield tf_output
+
+
+@pytest.fixture
+def secret_cache_dir(monkeypatch):
+    # Not under tmp_path: paths of pytest-xdist workers are too long for the
+    # Unix socket of assets/secret_daemon.py.
+    with tempfile.TemporaryDirectory(prefix="secret-cache-") as directory:
+        cache_dir = Path(directory) / "cache"
+        monkeypatch.setenv("INFRAHOUSE_SECRET_CACHE_DIR", str(cache_dir))
+        yield cache_dir
+
+
+@pytest.fixture
+def moto_aws(monkeypatch):
+    """
+    A local moto stand-in for AWS, with fake credentials in the environment.
+    """
+    for name in ("AWS_PROFILE", "AWS_ENDPOINT_URL", "AWS_SESSION_TOKEN"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-west-1")
+    # Imported here: only the offline tests need moto.
+    from moto import mock_aws
+
+    with mock_aws():
+        yield
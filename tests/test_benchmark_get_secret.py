@@ -0,0 +1,58 @@
+"""
+Micro-benchmarks of assets/get_secret.py, without AWS.
+
+Run them alone with ``make bench-micro``.
+"""
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import get_secret
+
+pytest.importorskip("pytest_benchmark")
+
+REGION = "us-west-1"
+ROLE_ARN = "arn:aws:iam::123456789012:role/secret-reader"
+
+
+@pytest.fixture
+def stubbed_client():
+    client = boto3.client(
+        "secretsmanager",
+        region_name=REGION,
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    with Stubber(client) as stubber:
+        yield client, stubber
+
+
+@pytest.mark.benchmark(group="get_secret")
+def test_get_secret_stubbed(benchmark, stubbed_client):
+    client, stubber = stubbed_client
+
+    def read():
+        stubber.add_response(
+            "get_secret_value",
+            {"SecretString": "bar", "VersionId": "v1" * 16},
+            {"SecretId": "foo"},
+        )
+        return get_secret.get_secret(client, "foo")
+
+    assert benchmark(read) == "bar"
+
+
+@pytest.mark.benchmark(group="get_secret")
+def test_get_secret_moto(benchmark, moto_aws):
+    client = get_secret.client_from_credentials(REGION, None)
+    client.create_secret(Name="foo", SecretString="bar")
+
+    assert benchmark(get_secret.get_secret, client, "foo") == "bar"
+
+
+@pytest.mark.benchmark(group="get_client")
+@pytest.mark.parametrize("use_cache", [True, False], ids=["cached", "uncached"])
+def test_get_client_moto(benchmark, moto_aws, secret_cache_dir, use_cache):
+    client = benchmark(get_secret.get_client, REGION, ROLE_ARN, use_cache=use_cache)
+    assert client.meta.region_name == REGION
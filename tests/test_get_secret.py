@@ -0,0 +1,1045 @@
+import json
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+import batch_reader
+import cache_backends
+import client_options
+import credentials_cache
+import get_secret
+import get_secret_lite
+import plan_memo
+import rate_limiter
+import read_secrets
+import secret_daemon
+import secret_reference
+import timing
+import value_cache
+
+
+@pytest.fixture(autouse=True)
+def client_registry(monkeypatch):
+    registry = get_secret.ClientRegistry()
+    monkeypatch.setattr(get_secret, "CLIENTS", registry)
+    return registry
+
+
+def _credentials(expires_in=timedelta(hours=1)):
+    return {
+        "AccessKeyId": "ASIAEXAMPLE",
+        "SecretAccessKey": "secret",
+        "SessionToken": "token",
+        "Expiration": datetime.now(timezone.utc) + expires_in,
+    }
+
+
+def test_parse_client_options():
+    args = get_secret.parse_args(
+        [
+            "r",
+            "s",
+            "a",
+            "--retry-mode",
+            "adaptive",
+            "--max-attempts",
+            "5",
+            "--read-timeout",
+            "2.5",
+            "--sts-global-endpoint",
+        ]
+    )
+    assert client_options.from_args(args) == {
+        "retry_mode": "adaptive",
+        "max_attempts": 5,
+        "read_timeout": 2.5,
+        "sts_regional_endpoint": False,
+    }
+    assert client_options.from_args(get_secret.parse_args(["r", "s", "a"])) == {}
+
+
+def test_make_client_options(monkeypatch):
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL_STS", raising=False)
+    session = boto3.Session(
+        aws_access_key_id="AKIAEXAMPLE",
+        aws_secret_access_key="secret",
+        region_name="eu-west-1",
+    )
+    sts = get_secret.make_client(session, "sts")
+    assert sts.meta.endpoint_url == "https://sts.eu-west-1.amazonaws.com"
+
+    sts = get_secret.make_client(
+        session,
+        "sts",
+        {
+            "sts_regional_endpoint": False,
+            "retry_mode": "adaptive",
+            "max_attempts": 7,
+            "connect_timeout": 3,
+            "max_pool_connections": 30,
+        },
+    )
+    assert sts.meta.endpoint_url == client_options.STS_GLOBAL_ENDPOINT
+    assert sts.meta.region_name == "us-east-1"
+    assert sts.meta.config.retries == {"mode": "adaptive", "total_max_attempts": 7}
+    assert sts.meta.config.connect_timeout == 3
+    assert sts.meta.config.max_pool_connections == 30
+
+    secretsmanager = get_secret.make_client(
+        session,
+        "secretsmanager",
+        {"secretsmanager_endpoint_url": "https://vpce.example"},
+    )
+    assert secretsmanager.meta.endpoint_url == "https://vpce.example"
+
+
+def test_cache_dir_permissions(secret_cache_dir):
+    directory = credentials_cache.cache_dir()
+    assert directory == str(secret_cache_dir)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+def test_cache_dir_rejects_shared_directory(secret_cache_dir):
+    secret_cache_dir.mkdir(mode=0o755)
+    os.chmod(secret_cache_dir, 0o755)
+    assert credentials_cache.cache_dir() is None
+
+
+def test_save_load_credentials(secret_cache_dir):
+    directory = credentials_cache.cache_dir()
+    key = credentials_cache.cache_key("role", "us-west-1", "AKIA")
+    credentials_cache.save_credentials(directory, key, _credentials())
+
+    path = os.path.join(directory, f"{key}.json")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert credentials_cache.load_credentials(directory, key)["SessionToken"] == "token"
+
+
+@pytest.mark.parametrize(
+    "expires_in", [timedelta(minutes=4), timedelta(minutes=-1)], ids=["soon", "past"]
+)
+def test_load_credentials_expired(secret_cache_dir, expires_in):
+    directory = credentials_cache.cache_dir()
+    key = credentials_cache.cache_key("role")
+    credentials_cache.save_credentials(directory, key, _credentials(expires_in))
+    assert credentials_cache.load_credentials(directory, key) is None
+
+
+def test_load_credentials_corrupted(secret_cache_dir):
+    directory = credentials_cache.cache_dir()
+    key = credentials_cache.cache_key("role")
+    with open(os.path.join(directory, f"{key}.json"), "w") as fp:
+        fp.write("{not json")
+    assert credentials_cache.load_credentials(directory, key) is None
+
+
+def test_get_client_reuses_cached_credentials(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIASOURCE")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "source-secret")
+    calls = []
+
+    def fake_role_credentials(role_arn, **kwargs):
+        calls.append(role_arn)
+        return _credentials()
+
+    monkeypatch.setattr(get_secret, "get_role_credentials", fake_role_credentials)
+    role_arn = "arn:aws:iam::123456789012:role/caller"
+    for _ in range(3):
+        client = get_secret.get_client("us-west-1", role_arn)
+        assert client._request_signer._credentials.access_key == "ASIAEXAMPLE"
+
+    assert calls == [role_arn]
+
+    # A different source identity doesn't reuse the cache entry
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAOTHER")
+    get_secret.get_client("us-west-1", role_arn)
+    assert calls == [role_arn, role_arn]
+
+
+@pytest.mark.parametrize(
+    "expires_in, builds",
+    [(timedelta(hours=1), 1), (timedelta(minutes=4), 3)],
+    ids=["valid", "expiring"],
+)
+def test_get_client_registry(secret_cache_dir, monkeypatch, expires_in, builds):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIASOURCE")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "source-secret")
+    calls = []
+
+    def fake_role_credentials(role_arn, **kwargs):
+        calls.append(role_arn)
+        return _credentials(expires_in)
+
+    monkeypatch.setattr(get_secret, "get_role_credentials", fake_role_credentials)
+    role_arn = "arn:aws:iam::123456789012:role/caller"
+    clients = {id(get_secret.get_client("us-west-1", role_arn)) for _ in range(3)}
+    assert len(clients) == len(calls) == builds
+
+
+def test_default_session_shared(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIASOURCE")
+    session = get_secret.default_session("us-west-1")
+    assert get_secret.default_session("us-west-1") is session
+    assert get_secret.default_session("us-east-1") is not session
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAOTHER")
+    assert get_secret.default_session("us-west-1") is not session
+
+
+def test_get_client_without_cache(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIASOURCE")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "source-secret")
+    calls = []
+    monkeypatch.setattr(
+        get_secret,
+        "get_role_credentials",
+        lambda role_arn, **kwargs: calls.append(role_arn) or _credentials(),
+    )
+    for _ in range(2):
+        get_secret.get_client("us-west-1", "role", use_cache=False)
+
+    assert len(calls) == 2
+    assert not secret_cache_dir.exists() or not any(
+        p.suffix == ".json" for p in secret_cache_dir.iterdir()
+    )
+
+
+def test_parse_args_backward_compatible():
+    args = get_secret.parse_args(["us-west-1", "foo", "arn:aws:iam::1:role/r"])
+    assert (args.region, args.secret_id, args.role_arn) == (
+        "us-west-1",
+        "foo",
+        "arn:aws:iam::1:role/r",
+    )
+    assert args.credentials_cache is True
+    assert (
+        get_secret.parse_args(
+            ["r", "s", "a", "--no-credentials-cache"]
+        ).credentials_cache
+        is False
+    )
+
+
+class FakeBatchClient:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.batch_calls = []
+        self.get_calls = []
+        self._lock = threading.Lock()
+
+    def batch_get_secret_value(self, SecretIdList):
+        with self._lock:
+            self.batch_calls.append(list(SecretIdList))
+        values = []
+        errors = []
+        for secret_id in SecretIdList:
+            if secret_id in self.secrets:
+                values.append(
+                    {
+                        "ARN": secret_id,
+                        "Name": secret_id.split(":")[-1],
+                        "SecretString": self.secrets[secret_id],
+                    }
+                )
+            else:
+                errors.append(
+                    {"SecretId": secret_id, "ErrorCode": "ResourceNotFoundException"}
+                )
+        return {"SecretValues": values, "Errors": errors}
+
+    def get_secret_value(self, SecretId):
+        with self._lock:
+            self.get_calls.append(SecretId)
+        return {"SecretString": self.secrets[SecretId]}
+
+
+def test_batch_get_secret_values_chunks():
+    secrets = {f"arn:aws:secretsmanager:secret:s{i}": f"v{i}" for i in range(45)}
+    secrets["arn:aws:secretsmanager:secret:placeholder"] = "NoValue"
+    client = FakeBatchClient(secrets)
+
+    values = batch_reader.batch_get_secret_values(
+        client, list(secrets) + ["arn:aws:secretsmanager:secret:missing"]
+    )
+
+    assert [len(c) for c in client.batch_calls] == [20, 20, 7]
+    assert values["arn:aws:secretsmanager:secret:s7"] == "v7"
+    assert values["arn:aws:secretsmanager:secret:placeholder"] == ""
+    assert values["arn:aws:secretsmanager:secret:missing"] == ""
+
+
+def test_fetch_in_batch_concurrent(secret_cache_dir):
+    secrets = {f"arn:aws:secretsmanager:secret:s{i}": f"v{i}" for i in range(30)}
+    client = FakeBatchClient(secrets)
+    spool = batch_reader.spool_dir("us-west-1", "role", "AKIA")
+
+    def read(secret_id):
+        return batch_reader.fetch_in_batch(
+            client,
+            secret_id,
+            spool,
+            fallback=lambda: get_secret.get_secret(client, secret_id),
+            window=0.3,
+        )
+
+    with ThreadPoolExecutor(max_workers=len(secrets)) as pool:
+        results = dict(zip(secrets, pool.map(read, secrets)))
+
+    assert results == secrets
+    assert not client.get_calls
+    # All requests arrive within the window of the first leader
+    assert sum(len(c) for c in client.batch_calls) == len(secrets)
+    assert len(client.batch_calls) <= 3
+    assert not os.listdir(os.path.join(spool, "pending"))
+    assert not os.listdir(os.path.join(spool, "responses"))
+
+
+def test_fetch_in_batch_falls_back(secret_cache_dir):
+    client = FakeBatchClient({"arn:s1": "v1"})
+    client.batch_get_secret_value = lambda **kwargs: {"SecretValues": []}
+    spool = batch_reader.spool_dir("us-west-1", "role", "AKIA")
+
+    value = batch_reader.fetch_in_batch(
+        client,
+        "arn:s1",
+        spool,
+        fallback=lambda: get_secret.get_secret(client, "arn:s1"),
+        window=0,
+    )
+    assert value == "v1"
+    assert client.get_calls == ["arn:s1"]
+
+
+def test_fetch_in_batch_large_values(secret_cache_dir):
+    # Larger than a pipe buffer
+    secrets = {f"arn:s{i}": f"{i}" * 100_000 for i in range(3)}
+    client = FakeBatchClient(secrets)
+    spool = batch_reader.spool_dir("us-west-1", "role", "AKIA")
+
+    def read(secret_id):
+        return batch_reader.fetch_in_batch(
+            client, secret_id, spool, fallback=lambda: None, window=0.3
+        )
+
+    with ThreadPoolExecutor(max_workers=len(secrets)) as pool:
+        results = dict(zip(secrets, pool.map(read, secrets)))
+
+    assert results == secrets
+    assert not client.get_calls
+
+
+def test_batch_reader_removes_stale(secret_cache_dir):
+    spool = batch_reader.spool_dir("us-west-1", "role", "AKIA")
+    old = time.time() - batch_reader.DEFAULT_TIMEOUT - 1
+    for name in ("pending/old.json", "responses/old.json", "pending/new.json"):
+        with open(os.path.join(spool, name), "w") as fp:
+            fp.write("{}")
+    for name in ("pending/old.json", "responses/old.json"):
+        os.utime(os.path.join(spool, name), (old, old))
+
+    batch_reader.remove_stale(spool)
+    assert os.listdir(os.path.join(spool, "pending")) == ["new.json"]
+    assert not os.listdir(os.path.join(spool, "responses"))
+
+
+def test_batch_get_secret_values_logs_errors(caplog):
+    client = FakeBatchClient({"arn:s1": "v1"})
+
+    def denied(**kwargs):
+        raise ClientError(
+            {"Error": {"Code": "AccessDeniedException"}}, "BatchGetSecretValue"
+        )
+
+    client.batch_get_secret_value = denied
+    assert batch_reader.batch_get_secret_values(client, ["arn:s1"]) == {}
+    assert "AccessDeniedException" in caplog.text
+
+
+@pytest.mark.parametrize("token", [None, "session-token"])
+def test_lite_signature_matches_botocore(token):
+    credentials = {"AccessKeyId": "AKIDEXAMPLE", "SecretAccessKey": "secret"}
+    if token:
+        credentials["SessionToken"] = token
+    now = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    url = "https://secretsmanager.us-west-1.amazonaws.com/"
+    body = b'{"SecretId": "foo"}'
+    headers = {
+        "Content-Type": "application/x-amz-json-1.1",
+        "X-Amz-Target": "secretsmanager.GetSecretValue",
+    }
+
+    signed = get_secret_lite.sign(
+        "POST", url, headers, body, credentials, "us-west-1", "secretsmanager", now
+    )
+
+    request = AWSRequest(method="POST", url=url, data=body, headers=headers)
+    auth = SigV4Auth(
+        Credentials("AKIDEXAMPLE", "secret", token), "secretsmanager", "us-west-1"
+    )
+    # Sign at a fixed time: the same steps as SigV4Auth.add_auth()
+    request.context["timestamp"] = now.strftime("%Y%m%dT%H%M%SZ")
+    auth._modify_request_before_signing(request)
+    signature = auth.signature(
+        auth.string_to_sign(request, auth.canonical_request(request)), request
+    )
+
+    assert signed["Authorization"].endswith(f"Signature={signature}")
+
+
+def test_lite_endpoint_url(monkeypatch):
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL_STS", raising=False)
+    assert (
+        get_secret_lite.endpoint_url("sts", "eu-north-1")
+        == "https://sts.eu-north-1.amazonaws.com/"
+    )
+    monkeypatch.setenv("AWS_ENDPOINT_URL", "http://localhost:5000")
+    assert get_secret_lite.endpoint_url("sts", "eu-north-1") == "http://localhost:5000/"
+
+
+def test_lite_endpoint_url_options(monkeypatch):
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL_STS", raising=False)
+    assert (
+        get_secret_lite.endpoint_url("sts", "us-east-2", {"use_fips_endpoint": True})
+        == "https://sts-fips.us-east-2.amazonaws.com/"
+    )
+    assert (
+        get_secret_lite.endpoint_url(
+            "sts", "us-east-2", {"sts_regional_endpoint": False}
+        )
+        == "https://sts.amazonaws.com/"
+    )
+    monkeypatch.setenv("AWS_ENDPOINT_URL", "http://localhost:5000")
+    assert (
+        get_secret_lite.endpoint_url(
+            "sts", "us-east-2", {"sts_endpoint_url": "https://vpce.example"}
+        )
+        == "https://vpce.example/"
+    )
+
+
+def test_lite_resolve_credentials(tmp_path, monkeypatch):
+    for name in (
+        "AWS_ACCESS_KEY_ID",
+        "AWS_SECRET_ACCESS_KEY",
+        "AWS_SESSION_TOKEN",
+        "AWS_PROFILE",
+        "AWS_DEFAULT_PROFILE",
+        "AWS_CONTAINER_CREDENTIALS_RELATIVE_URI",
+        "AWS_CONTAINER_CREDENTIALS_FULL_URI",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_EC2_METADATA_DISABLED", "true")
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(tmp_path / "credentials"))
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(tmp_path / "config"))
+    (tmp_path / "credentials").write_text(
+        "[default]\naws_access_key_id = AKIAFILE\naws_secret_access_key = s\n"
+    )
+    (tmp_path / "config").write_text(
+        "[profile sso]\nsso_session = corp\nsso_account_id = 123456789012\n"
+    )
+
+    assert get_secret_lite.resolve_credentials()["AccessKeyId"] == "AKIAFILE"
+
+    # Profiles that need botocore aren't resolved
+    monkeypatch.setenv("AWS_PROFILE", "sso")
+    assert get_secret_lite.resolve_credentials() is None
+
+    # Environment variables win
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAENV")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "s")
+    assert get_secret_lite.resolve_credentials()["AccessKeyId"] == "AKIAENV"
+
+
+def test_lite_hands_unsupported_options_over(monkeypatch):
+    calls = []
+    monkeypatch.setattr(get_secret, "main", calls.append)
+    argv = ["us-west-1", "foo", "arn:role", "--batch", "--value-cache"]
+    get_secret_lite.main(argv)
+    assert calls == [argv]
+
+    monkeypatch.undo()
+    with pytest.raises(SystemExit):
+        get_secret_lite.main(["us-west-1", "foo", "arn:role", "--no-such-option"])
+
+
+def test_lite_error_from_response():
+    err = get_secret_lite._error_from_response(
+        400,
+        b'{"__type": "ResourceNotFoundException", "message": "not found"}',
+    )
+    assert err.code == "ResourceNotFoundException"
+
+    err = get_secret_lite._error_from_response(
+        403,
+        b"<ErrorResponse><Error><Code>AccessDenied</Code>"
+        b"<Message>no</Message></Error></ErrorResponse>",
+    )
+    assert (err.code, err.message) == ("AccessDenied", "no")
+
+
+def test_daemon_serves_requests(secret_cache_dir, monkeypatch):
+    client = FakeBatchClient({"arn:s1": "v1", "arn:placeholder": "NoValue"})
+    monkeypatch.setattr(
+        get_secret.ClientRegistry, "get", lambda self, *args, **kwargs: client
+    )
+    path = secret_daemon.socket_path()
+    server = threading.Thread(target=secret_daemon.serve, args=(path, 1))
+    server.start()
+    try:
+        for _ in range(50):
+            if os.path.exists(path):
+                break
+            time.sleep(0.02)
+
+        assert secret_daemon.fetch("us-west-1", "arn:s1", "role") == "v1"
+        assert secret_daemon.fetch("us-west-1", "arn:placeholder", "role") == ""
+        # Errors make the reader fall back to the direct path
+        assert secret_daemon.fetch("us-west-1", "arn:missing", "role") is None
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    finally:
+        server.join()
+
+    # Exited after the idle timeout and cleaned up
+    assert not os.path.exists(path)
+
+
+def test_daemon_unavailable_starts_one(secret_cache_dir, monkeypatch):
+    started = []
+    monkeypatch.setattr(
+        secret_daemon, "start", lambda path, idle_timeout=None: started.append(path)
+    )
+    assert secret_daemon.fetch("us-west-1", "arn:s1", "role") is None
+    assert started == [secret_daemon.socket_path()]
+
+
+def test_daemon_socket_depends_on_environment(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv("AWS_PROFILE", "one")
+    path_one = secret_daemon.socket_path()
+    monkeypatch.setenv("AWS_PROFILE", "two")
+    assert secret_daemon.socket_path() != path_one
+
+
+def test_daemon_socket_depends_on_credential_files(
+    secret_cache_dir, tmp_path, monkeypatch
+):
+    credentials = tmp_path / "credentials"
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(credentials))
+    path_missing = secret_daemon.socket_path()
+
+    credentials.write_text("[default]\n")
+    os.utime(credentials, ns=(1, 1))
+    path_one = secret_daemon.socket_path()
+    assert path_one != path_missing
+    assert secret_daemon.socket_path() == path_one
+
+    # Rotated keys
+    os.utime(credentials, ns=(2, 2))
+    assert secret_daemon.socket_path() != path_one
+
+
+def test_get_caller_arn_cached_per_access_key(secret_cache_dir):
+    class FakeSTS:
+        calls = 0
+
+        def get_caller_identity(self):
+            self.calls += 1
+            return {"Arn": "arn:aws:sts::123456789012:assumed-role/caller/session"}
+
+    class FakeSession:
+        access_key = "ASIAONE"
+
+        def get_credentials(self):
+            return Credentials(self.access_key, "secret")
+
+    session, sts = FakeSession(), FakeSTS()
+    for _ in range(3):
+        assert get_secret.get_caller_arn(session, sts).endswith("/caller/session")
+    assert sts.calls == 1
+
+    session.access_key = "ASIATWO"
+    get_secret.get_caller_arn(session, sts)
+    assert sts.calls == 2
+
+    get_secret.get_caller_arn(session, sts, use_cache=False)
+    assert sts.calls == 3
+
+
+def test_identity_expires(secret_cache_dir):
+    directory = credentials_cache.cache_dir()
+    past = datetime.now(timezone.utc) - credentials_cache.IDENTITY_TTL
+    credentials_cache.save_identity(directory, "AKIA", "arn:old", now=past)
+    assert credentials_cache.load_identity(directory, "AKIA") is None
+
+    credentials_cache.save_identity(directory, "AKIA", "arn:new")
+    assert credentials_cache.load_identity(directory, "AKIA") == "arn:new"
+
+
+class FakeVersionedClient:
+    def __init__(self, value, version_id="v1"):
+        self.value = value
+        self.version_id = version_id
+        self.calls = []
+
+    def describe_secret(self, SecretId):
+        self.calls.append("DescribeSecret")
+        return {"VersionIdsToStages": {self.version_id: ["AWSCURRENT"], "v0": []}}
+
+    def get_secret_value(self, SecretId):
+        self.calls.append("GetSecretValue")
+        return {"SecretString": self.value, "VersionId": self.version_id}
+
+
+def test_value_cache_skips_unchanged_version(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv(value_cache.KEY_ENV, "secret-key")
+    cache = value_cache.open_cache(credentials_cache.cache_dir())
+    client = FakeVersionedClient("big value")
+
+    assert get_secret.get_secret(client, "arn:s1", cache=cache) == "big value"
+    assert get_secret.get_secret(client, "arn:s1", cache=cache) == "big value"
+    assert client.calls == ["DescribeSecret", "GetSecretValue", "DescribeSecret"]
+
+    client.value, client.version_id = "new value", "v2"
+    assert get_secret.get_secret(client, "arn:s1", cache=cache) == "new value"
+    assert client.calls[-1] == "GetSecretValue"
+
+    # Nothing readable on disk
+    for path in secret_cache_dir.rglob("*"):
+        assert path.is_dir() or b"value" not in path.read_bytes()
+
+
+def test_value_cache_placeholder(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv(value_cache.KEY_ENV, "secret-key")
+    cache = value_cache.open_cache(credentials_cache.cache_dir())
+    client = FakeVersionedClient("NoValue")
+    assert get_secret.get_secret(client, "arn:s1", cache=cache) == ""
+    assert get_secret.get_secret(client, "arn:s1", cache=cache) == ""
+    assert client.calls.count("GetSecretValue") == 1
+
+
+def test_value_cache_other_key_misses(secret_cache_dir, monkeypatch):
+    directory = credentials_cache.cache_dir()
+    monkeypatch.setenv(value_cache.KEY_ENV, "key-one")
+    value_cache.open_cache(directory).put("arn:s1", "v1", "value")
+    assert value_cache.open_cache(directory).get("arn:s1", "v1") == "value"
+    assert value_cache.open_cache(directory).get("arn:s1", "v2") is None
+
+    monkeypatch.setenv(value_cache.KEY_ENV, "key-two")
+    assert value_cache.open_cache(directory).get("arn:s1", "v1") is None
+
+
+def test_value_cache_other_role_misses(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv(value_cache.KEY_ENV, "secret-key")
+    reader = get_secret.get_value_cache("arn:aws:iam::1:role/reader")
+    reader.put("arn:s1", "v1", "value")
+
+    assert reader.get("arn:s1", "v1") == "value"
+    assert (
+        get_secret.get_value_cache("arn:aws:iam::1:role/other").get("arn:s1", "v1")
+        is None
+    )
+
+
+def test_value_cache_needs_key_to_persist(secret_cache_dir, monkeypatch):
+    monkeypatch.delenv(value_cache.KEY_ENV, raising=False)
+    directory = credentials_cache.cache_dir()
+    assert value_cache.open_cache(directory) is None
+    assert get_secret.get_value_cache("arn:role", "file") is None
+
+    # A process of its own may still keep values, under a key that dies with it.
+    cache = value_cache.open_cache(directory, backend=cache_backends.MemoryBackend())
+    cache.put("arn:s1", "v1", "value")
+    assert cache.get("arn:s1", "v1") == "value"
+
+
+def test_timing_disabled(monkeypatch):
+    monkeypatch.delenv(timing.TIMING_ENV, raising=False)
+    monkeypatch.setattr(timing, "_phases", {})
+    with timing.phase("get_secret_value"):
+        pass
+    assert timing._phases == {}
+
+
+def test_timing_report(tmp_path, monkeypatch):
+    report = tmp_path / "timing.jsonl"
+    monkeypatch.setenv(timing.TIMING_ENV, str(report))
+    monkeypatch.setattr(timing, "_phases", {})
+    for _ in range(2):
+        with timing.phase("get_secret_value"):
+            time.sleep(0.01)
+
+    timing.report("get_secret.py")
+    timing.report("get_secret.py")
+    lines = [json.loads(line) for line in report.read_text().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]["script"] == "get_secret.py"
+    assert lines[0]["phases"]["get_secret_value"] >= 0.02
+    assert stat.S_IMODE(report.stat().st_mode) == 0o600
+
+
+class FakeRoleClients:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.roles = []
+
+    def get(self, region, role_arn, **kwargs):
+        self.roles.append(role_arn)
+        return self
+
+    def get_secret_value(self, SecretId):
+        if SecretId not in self.secrets:
+            raise ClientError(
+                {"Error": {"Code": "AccessDeniedException", "Message": "no"}},
+                "GetSecretValue",
+            )
+        return {"SecretString": self.secrets[SecretId]}
+
+
+def test_read_secrets(tmp_path, monkeypatch, capsys):
+    secrets = {f"s{i}": f"v{i}" for i in range(50)}
+    clients = FakeRoleClients(secrets)
+    monkeypatch.setattr(get_secret, "CLIENTS", clients)
+    ids_file = tmp_path / "ids"
+    ids_file.write_text(
+        "# comment\n\n"
+        + "".join(f"{secret_id}\n" for secret_id in list(secrets)[1:])
+        + "forbidden arn:aws:iam::1:role/other\n"
+    )
+
+    assert read_secrets.main(["r", "role", "s0", "--from-file", str(ids_file)]) == 1
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {r["secret_id"]: r.get("SECRET_VALUE") for r in results} == dict(
+        secrets, forbidden=None
+    )
+    assert [r for r in results if "error" in r] == [
+        {
+            "secret_id": "forbidden",
+            "error": "ClientError: An error occurred (AccessDeniedException) "
+            "when calling the GetSecretValue operation: no",
+        }
+    ]
+    assert set(clients.roles) == {"role", "arn:aws:iam::1:role/other"}
+
+
+def test_read_secrets_terraform(monkeypatch, capsys):
+    class BatchClients(FakeRoleClients):
+        def batch_get_secret_value(self, SecretIdList):
+            # The batch call misses one secret; it's read individually.
+            return {
+                "SecretValues": [
+                    {"Name": secret_id, "SecretString": self.secrets[secret_id]}
+                    for secret_id in SecretIdList
+                    if secret_id in self.secrets and secret_id != "s1"
+                ]
+            }
+
+    clients = BatchClients({"s0": "v0", "s1": "v1", "s2": "NoValue"})
+    monkeypatch.setattr(get_secret, "CLIENTS", clients)
+
+    argv = ["r", "role", "s0", "s1", "s2"]
+    assert read_secrets.main(argv + ["--batch", "--terraform"]) == 0
+    out = capsys.readouterr().out
+    assert json.loads(out) == {"s0": "v0", "s1": "v1", "s2": ""}
+
+    assert read_secrets.main(argv + ["forbidden", "--batch", "--terraform"]) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err.startswith("forbidden: ClientError")
+
+
+def test_read_secrets_bounded_queue(monkeypatch):
+    monkeypatch.setattr(get_secret, "CLIENTS", FakeRoleClients({"s": "v"}))
+    consumed = []
+
+    def requests():
+        for i in range(100):
+            consumed.append(i)
+            yield "s", "role"
+
+    results = read_secrets.read_all("r", requests(), workers=2)
+    next(results)
+    assert len(consumed) <= 5
+    assert len(list(results)) == 99
+
+
+def test_read_batched_bounded_and_per_role_errors(monkeypatch):
+    class BatchClients(FakeRoleClients):
+        def get(self, region, role_arn, **kwargs):
+            if role_arn == "broken":
+                raise ValueError("no credentials")
+            return super().get(region, role_arn, **kwargs)
+
+        def batch_get_secret_value(self, SecretIdList):
+            return {
+                "SecretValues": [
+                    {"Name": secret_id, "SecretString": "v"}
+                    for secret_id in SecretIdList
+                ]
+            }
+
+    monkeypatch.setattr(get_secret, "CLIENTS", BatchClients({}))
+    consumed = []
+
+    def requests():
+        for i in range(3 * read_secrets.BATCH_CHUNK):
+            consumed.append(i)
+            yield f"s{i}", "broken" if i == 1 else "role"
+
+    results = read_secrets.read_batched("r", requests())
+    first = [next(results) for _ in range(read_secrets.BATCH_CHUNK)]
+    assert len(consumed) == read_secrets.BATCH_CHUNK
+    assert {"secret_id": "s1", "error": "ValueError: no credentials"} in first
+    assert len(list(results)) == 2 * read_secrets.BATCH_CHUNK
+
+
+def test_read_secrets_without_botocore_retries(monkeypatch):
+    options = []
+
+    class RecordingClients(FakeRoleClients):
+        def get(self, region, role_arn, **kwargs):
+            options.append(kwargs["options"])
+            return super().get(region, role_arn, **kwargs)
+
+    monkeypatch.setattr(get_secret, "CLIENTS", RecordingClients({"s": "v"}))
+    results = read_secrets.read_all(
+        "r", [("s", "role")], options={"max_attempts": 10, "read_timeout": 5}
+    )
+    assert list(results) == [{"secret_id": "s", "SECRET_VALUE": "v"}]
+    assert options == [{"max_attempts": 1, "read_timeout": 5}]
+
+
+def test_with_backoff():
+    sleeps = []
+    outcomes = iter(["Throttling", "ThrottlingException", None])
+
+    def call():
+        code = next(outcomes)
+        if code:
+            raise ClientError({"Error": {"Code": code}}, "GetSecretValue")
+        return "value"
+
+    assert read_secrets.with_backoff(call, sleep=sleeps.append) == "value"
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[1] <= 2 * rate_limiter.BASE_DELAY
+
+    def denied():
+        raise ClientError({"Error": {"Code": "AccessDenied"}}, "GetSecretValue")
+
+    with pytest.raises(ClientError):
+        read_secrets.with_backoff(denied, sleep=sleeps.append)
+    assert len(sleeps) == 2
+
+
+def test_rate_limiter_shared_bucket(secret_cache_dir):
+    directory = credentials_cache.cache_dir()
+    # Two processes with their own limiter objects share the bucket.
+    limiters = [rate_limiter.RateLimiter(directory, "sts-r", rate=10) for _ in "ab"]
+    sleeps = []
+    waits = [limiters[i % 2].acquire(now=100.0, sleep=sleeps.append) for i in range(12)]
+
+    assert waits[:10] == [0.0] * 10
+    assert waits[10:] == pytest.approx([0.1, 0.2])
+    assert sleeps == waits[10:]
+    # Reserved tokens are paid back before new ones are handed out.
+    assert limiters[0].acquire(now=100.3, sleep=sleeps.append) == pytest.approx(0)
+    assert limiters[0].acquire(now=100.3, sleep=sleeps.append) == pytest.approx(0.1)
+
+
+def test_rate_limiter_adapts(secret_cache_dir):
+    limiter = rate_limiter.RateLimiter(credentials_cache.cache_dir(), "sts-r", rate=10)
+    for _ in range(5):
+        limiter.throttled()
+    assert limiter.rate() == 1
+
+    limiter.succeeded()
+    assert limiter.rate() == pytest.approx(1.5)
+    for _ in range(30):
+        limiter.succeeded()
+    assert limiter.rate() == 10
+
+
+def test_rate_limited_client(secret_cache_dir):
+    from botocore.awsrequest import AWSResponse
+
+    class Raw:
+        def __init__(self, body):
+            self.body = body
+
+        def stream(self, **kwargs):
+            yield self.body
+
+    responses = iter(
+        [
+            (400, {"__type": "ThrottlingException", "message": "Rate exceeded"}),
+            (200, {"SecretString": "bar", "VersionId": "v1"}),
+        ]
+    )
+
+    def send(request, **kwargs):
+        status, body = next(responses)
+        return AWSResponse(request.url, status, {}, Raw(json.dumps(body).encode()))
+
+    session = boto3.Session(
+        aws_access_key_id="testing", aws_secret_access_key="testing", region_name="r"
+    )
+    client = get_secret.make_client(
+        session, "secretsmanager", {"retry_mode": "standard", "rate_limit": 5}
+    )
+    client.meta.events.register("before-send", send)
+
+    assert get_secret.get_secret(client, "foo") == "bar"
+    assert credentials_cache.read_json(
+        credentials_cache.cache_dir(), rate_limiter.METRICS_KEY
+    ) == {"GetSecretValue": {"throttles": 1, "retries": 1}}
+    limiter = rate_limiter.RateLimiter(
+        credentials_cache.cache_dir(), "secretsmanager-r", rate=5
+    )
+    assert limiter.rate() == pytest.approx(2.5 + 0.25)
+
+
+def test_plan_memo_shared_read(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv(value_cache.KEY_ENV, "secret-key")
+    reads = []
+
+    def read():
+        reads.append(1)
+        time.sleep(0.1)
+        return "bar"
+
+    memo = plan_memo.open_memo()
+    key = plan_memo.memo_key("r", "arn:secret", "arn:role", scope="v1")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(
+            executor.map(lambda _: plan_memo.memoized(key, 60, read, memo), range(8))
+        )
+
+    assert values == ["bar"] * 8
+    assert len(reads) == 1
+    path = os.path.join(plan_memo.memo_dir(), f"{key}.json")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path, "rb") as fp:
+        assert b"bar" not in fp.read()
+    # Another version Terraform wrote, or another role, is read anew.
+    other = plan_memo.memo_key("r", "arn:secret", "arn:role", scope="v2")
+    assert plan_memo.memoized(other, 60, lambda: "new", memo) == "new"
+
+
+def test_plan_memo_expires(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv(value_cache.KEY_ENV, "secret-key")
+    memo = plan_memo.open_memo()
+    key = plan_memo.memo_key("r", "arn:secret", "arn:role")
+    assert plan_memo.memoized(key, 0.2, lambda: None, memo) is None
+    assert plan_memo.memoized(key, 0.2, lambda: "old", memo) == "old"
+    assert plan_memo.memoized(key, 0.2, lambda: "new", memo) == "old"
+    time.sleep(0.2)
+    assert plan_memo.memoized(key, 0.2, lambda: "new", memo) == "new"
+    # Without a ttl or without a way to seal results, nothing is shared.
+    assert plan_memo.memoized(key, 0, lambda: "direct", memo) == "direct"
+    assert plan_memo.memoized(key, 60, lambda: "direct", None) == "direct"
+
+
+def test_plan_memo_bounded_locks(secret_cache_dir, monkeypatch):
+    monkeypatch.setenv(value_cache.KEY_ENV, "secret-key")
+    memo = plan_memo.open_memo()
+    for scope in range(200):
+        key = plan_memo.memo_key("r", "arn:secret", "arn:role", scope=str(scope))
+        assert plan_memo.memoized(key, 60, lambda: "v", memo) == "v"
+
+    locks = [n for n in os.listdir(plan_memo.memo_dir()) if n.endswith(".lock")]
+    assert 1 < len(locks) <= plan_memo.LOCK_STRIPES
+
+
+@pytest.mark.parametrize("backend", cache_backends.BACKENDS)
+def test_cache_backend_limits(secret_cache_dir, tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(cache_backends, "SHM_DIR", str(tmp_path / "shm"))
+    os.makedirs(cache_backends.SHM_DIR)
+    storage = cache_backends.open_backend(
+        backend, directory=str(tmp_path / "values"), max_entries=3, max_bytes=2200
+    )
+    storage.put("a", "1" * 600, now=100)
+    storage.put("b", "2" * 600, now=101)
+    storage.put("c", "3" * 600, ttl=5, now=102)
+    if backend == "file":
+        os.utime(tmp_path / "values" / "a.json", (103, 103))
+    assert storage.get("a", now=103) == "1" * 600
+    # "b" is the least recently used.
+    storage.put("d", "4" * 600, now=104)
+    assert storage.get("b", now=104) is None
+    assert storage.get("c", now=106) is not None
+    assert storage.get("c", now=107) is None
+    # A big entry pushes the others out to stay under max_bytes.
+    storage.put("e", "5" * 2100, now=108)
+    assert [storage.get(key, now=108) for key in "ad"] == [None, None]
+    assert storage.get("e", now=108) == "5" * 2100
+
+
+def test_file_backend_reads_entries_only_over_limits(tmp_path, monkeypatch):
+    storage = cache_backends.FileBackend(str(tmp_path), max_entries=3)
+    reads = []
+    read_json = credentials_cache.read_json
+    monkeypatch.setattr(
+        credentials_cache,
+        "read_json",
+        lambda directory, key: reads.append(key) or read_json(directory, key),
+    )
+
+    for key in "abc":
+        storage.put(key, key)
+    assert reads == []
+
+    storage.put("d", "d")
+    assert sorted(reads) == list("abcd")
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json", "d.json"]
+
+
+def test_secret_reference(moto_aws):
+    client = boto3.client("secretsmanager", region_name="us-west-1")
+    secret = client.create_secret(Name="foo", SecretString="first")
+    client.put_secret_value(SecretId="foo", SecretString="rotated")
+    reference = json.dumps(
+        {
+            "arn": secret["ARN"],
+            "version_id": secret["VersionId"],
+            "version_stage": "AWSCURRENT",
+        }
+    )
+
+    assert secret_reference.resolve(reference) == "rotated"
+    assert secret_reference.resolve(reference, pinned=True) == "first"
+
+    lazy = secret_reference.LazySecret(reference)
+    client.put_secret_value(SecretId="foo", SecretString="third")
+    assert lazy.value == "third"
+    client.put_secret_value(SecretId="foo", SecretString="fourth")
+    assert lazy.value == "third"
+
+    with pytest.raises(ValueError):
+        secret_reference.parse({"version_stage": "AWSCURRENT"})
+
+
+def test_version_fingerprint(monkeypatch):
+    client = FakeVersionedClient("big value")
+    assert get_secret.get_version_fingerprint(client, "arn:s1") == "v1"
+    assert client.calls == ["DescribeSecret"]
+
+    def describe_secret(credentials, region, action, params, options=None):
+        assert action == "DescribeSecret"
+        if params["SecretId"] == "missing":
+            raise get_secret_lite.AWSError("ResourceNotFoundException", "gone", 400)
+        return {"VersionIdsToStages": {"v0": ["AWSPREVIOUS"], "v1": ["AWSCURRENT"]}}
+
+    monkeypatch.setattr(get_secret_lite, "call_secretsmanager", describe_secret)
+    assert get_secret_lite.get_version_fingerprint({}, "r", "arn:s1") == "v1"
+    assert get_secret_lite.get_version_fingerprint({}, "r", "missing") == ""
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import boto3
+import pytest
+from moto.server import DomainDispatcherApplication, create_backend_app
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import get_secret
+
+pytest.importorskip("aiobotocore")
+
+import get_secret_async  # noqa: E402
+
+REGION = "us-west-1"
+ROLE_ARN = "arn:aws:iam::123456789012:role/secret-reader"
+# Round trip added to every request, to make the sequential cost visible.
+LATENCY = 0.05
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def moto_server(monkeypatch, secret_cache_dir):
+    app = DomainDispatcherApplication(create_backend_app)
+
+    def slow_app(environ, start_response):
+        time.sleep(LATENCY)
+        return app(environ, start_response)
+
+    server = make_server(
+        "127.0.0.1", 0, slow_app, threaded=True, request_handler=_QuietHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for name in ("AWS_PROFILE", "AWS_SESSION_TOKEN"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    monkeypatch.setenv("AWS_ENDPOINT_URL", f"http://127.0.0.1:{server.server_port}")
+    yield
+    # Backends of moto live in the process; start the next test empty.
+    urllib.request.urlopen(
+        urllib.request.Request(
+            f"http://127.0.0.1:{server.server_port}/moto-api/reset", method="POST"
+        )
+    ).close()
+    server.shutdown()
+
+
+@pytest.fixture
+def secret_ids(moto_server):
+    client = boto3.client("secretsmanager", region_name=REGION)
+    ids = [
+        client.create_secret(Name=f"secret-{i}", SecretString=f"value-{i}")["ARN"]
+        for i in range(20)
+    ]
+    ids.append(client.create_secret(Name="placeholder", SecretString="NoValue")["ARN"])
+    ids.append("missing")
+    return ids
+
+
+def test_read_secrets(secret_ids):
+    async def read():
+        async with get_secret_async.ClientPool() as pool:
+            return await get_secret_async.read_secrets(
+                pool, REGION, ROLE_ARN, secret_ids
+            )
+
+    values = asyncio.run(read())
+    assert list(values) == secret_ids
+    assert [values[secret_id] for secret_id in secret_ids[:2]] == [
+        "value-0",
+        "value-1",
+    ]
+    assert values[secret_ids[-2]] == values["missing"] == ""
+
+
+def test_pool_reuses_client(moto_server):
+    async def clients():
+        async with get_secret_async.ClientPool() as pool:
+            return await asyncio.gather(
+                *(pool.get(REGION, ROLE_ARN) for _ in range(5)),
+                pool.get(REGION, ROLE_ARN, options={"read_timeout": 5}),
+            )
+
+    clients = asyncio.run(clients())
+    assert len({id(client) for client in clients}) == 2
+
+
+def test_pool_closes_replaced_client(moto_server, monkeypatch):
+    closed = []
+
+    class RecordingExitStack(get_secret_async.AsyncExitStack):
+        async def aclose(self):
+            closed.append(self)
+            await super().aclose()
+
+    monkeypatch.setattr(get_secret_async, "AsyncExitStack", RecordingExitStack)
+    # Credentials that are always about to expire
+    monkeypatch.setattr(
+        get_secret,
+        "credentials_expiration",
+        lambda credentials: datetime.now(timezone.utc),
+    )
+
+    async def clients():
+        async with get_secret_async.ClientPool() as pool:
+            first = await pool.get(REGION, ROLE_ARN)
+            second = await pool.get(REGION, ROLE_ARN)
+            return first, second, len(closed)
+
+    first, second, closed_before_exit = asyncio.run(clients())
+    assert first is not second
+    assert closed_before_exit == 1
+    assert len(closed) == 2
+
+
+def test_async_faster_than_sequential(secret_ids):
+    client = get_secret.get_client(REGION, ROLE_ARN)
+    started = time.perf_counter()
+    sequential = [get_secret.get_secret(client, secret_id) for secret_id in secret_ids]
+    sequential_time = time.perf_counter() - started
+
+    async def read():
+        async with get_secret_async.ClientPool() as pool:
+            await pool.get(REGION, ROLE_ARN)
+            started = time.perf_counter()
+            values = await get_secret_async.read_secrets(
+                pool, REGION, ROLE_ARN, secret_ids
+            )
+            return values, time.perf_counter() - started
+
+    values, async_time = asyncio.run(read())
+    assert list(values.values()) == sequential
+    assert sequential_time >= LATENCY * len(secret_ids)
+    assert async_time < sequential_time / 3
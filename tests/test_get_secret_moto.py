@@ -0,0 +1,78 @@
+"""
+assets/get_secret.py and assets/read_secrets.py against moto, without AWS.
+
+Part of the offline tier: ``pytest -m "not aws"``.
+"""
+
+import json
+
+import boto3
+import pytest
+
+import get_secret
+import read_secrets
+
+REGION = "us-west-1"
+ROLE_ARN = "arn:aws:iam::123456789012:role/secret-reader"
+
+
+@pytest.fixture
+def secretsmanager(moto_aws, secret_cache_dir, monkeypatch):
+    monkeypatch.setattr(get_secret, "CLIENTS", get_secret.ClientRegistry())
+    client = boto3.client("secretsmanager", region_name=REGION)
+    client.create_secret(Name="foo", SecretString="bar")
+    client.create_secret(Name="placeholder", SecretString="NoValue")
+    return client
+
+
+def test_get_secret(secretsmanager):
+    assert get_secret.get_secret(secretsmanager, "foo") == "bar"
+    assert get_secret.get_secret(secretsmanager, "placeholder") == ""
+    assert get_secret.get_secret(secretsmanager, "missing") == ""
+
+    secretsmanager.put_secret_value(SecretId="placeholder", SecretString="set")
+    assert get_secret.get_secret(secretsmanager, "placeholder") == "set"
+
+
+def test_get_secret_version(secretsmanager):
+    first = secretsmanager.describe_secret(SecretId="foo")["VersionIdsToStages"]
+    secretsmanager.put_secret_value(SecretId="foo", SecretString="baz")
+
+    (version_id,) = first
+    assert get_secret.get_secret(secretsmanager, "foo") == "baz"
+    assert get_secret.get_secret(secretsmanager, "foo", version_id=version_id) == "bar"
+    assert (
+        get_secret.get_secret(secretsmanager, "foo", version_stage="AWSPREVIOUS")
+        == "bar"
+    )
+    assert get_secret.get_version_fingerprint(secretsmanager, "foo") != version_id
+
+
+@pytest.mark.parametrize("use_cache", [True, False], ids=["cached", "uncached"])
+def test_get_client(secretsmanager, use_cache):
+    client = get_secret.get_client(REGION, ROLE_ARN, use_cache=use_cache)
+
+    assert client.meta.region_name == REGION
+    assert get_secret.get_secret(client, "foo") == "bar"
+    credentials = client._request_signer._credentials
+    assert credentials.access_key != "testing"
+    if use_cache:
+        assert get_secret.get_client(REGION, ROLE_ARN) is client
+
+
+def test_main(secretsmanager, capsys):
+    get_secret.main([REGION, "foo", ROLE_ARN])
+    assert json.loads(capsys.readouterr().out) == {"SECRET_VALUE": "bar"}
+
+    get_secret.main([REGION, "placeholder", ROLE_ARN, "--no-credentials-cache"])
+    assert json.loads(capsys.readouterr().out) == {"SECRET_VALUE": ""}
+
+
+def test_read_secrets_terraform(secretsmanager, capsys):
+    argv = [REGION, ROLE_ARN, "foo", "placeholder", "missing"]
+    assert read_secrets.main(argv + ["--batch", "--terraform"]) == 0
+    assert json.loads(capsys.readouterr().out) == {
+        "foo": "bar",
+        "placeholder": "",
+        "missing": "",
+    }
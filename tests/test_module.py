@@ -8,8 +8,12 @@ from pytest_infrahouse import terraform_apply
 
 from tests.conftest import (
     LOG,
+    REPO_ROOT,
     TERRAFORM_ROOT_DIR,
+    copy_terraform_root,
+    wait_for,
     get_secretsmanager_client_by_role,
+    terraform_init,
     MODULE_VERSION,
 )
 
@@ -47,12 +51,144 @@ def init_terraform_tf(terraform_dir, aws_provider_version="~> 5.11"):
     with open(osp.join(terraform_dir, "terraform.tf"), "w") as fp:
         fp.write(terraform_tf_content)
 
+    terraform_init(terraform_dir)
+
+
+class SharedSecrets:
+    """
+    Secrets of test_data/secret_set, applied once for the tests that only
+    need a deployed secret. Tests that change a value get it restored after
+    them by the restore_shared_secrets fixture.
+    """
+
+    def __init__(self, terraform_module_dir, tf_output):
+        self.terraform_module_dir = terraform_module_dir
+        self.names = tf_output["secret_names"]["value"]
+        self.values = {
+            key: "NoValue" if value is None else value
+            for key, value in tf_output["secret_values"]["value"].items()
+        }
+
+    def name(self, key):
+        return self.names[key]
+
+    def value(self, key):
+        """
+        Return the value Terraform wrote, "NoValue" for the placeholder.
+        """
+        return self.values[key]
+
+    def reapply(self):
+        """
+        Apply the secrets again, e.g. to see Terraform revert a change.
+        """
+        with terraform_apply(
+            self.terraform_module_dir,
+            destroy_after=False,
+            json_output=False,
+            var_file="terraform.tfvars.json",
+        ):
+            pass
+
+
+@pytest.fixture(scope="session")
+def shared_secrets(
+    probe_role,
+    keep_after,
+    test_role_arn,
+    aws_region,
+    boto3_session,
+    secret_name,
+    tmp_path_factory,
+):
+    probe_role_arn = probe_role["role_arn"]["value"]
+    secrets = {
+        "reader": {"readers": [probe_role_arn], "secret_value": "bar"},
+        "reader-wildcard": {"readers": [f"{probe_role_arn}*"], "secret_value": "bar"},
+        "writer": {"writers": [probe_role_arn], "secret_value": "bar"},
+        "writer-wildcard": {"writers": [f"{probe_role_arn}*"], "secret_value": "bar"},
+        "duplicate": {
+            "writers": [probe_role_arn],
+            "readers": [probe_role_arn],
+            "secret_value": "bar",
+        },
+        "generated": {"writers": [probe_role_arn], "secret_value": "generate"},
+        "external": {"writers": [probe_role_arn]},
+    }
+    for secret in secrets.values():
+        secret["admins"] = [test_role_arn]
+
+    terraform_module_dir = copy_terraform_root(
+        osp.join(REPO_ROOT, TERRAFORM_ROOT_DIR, "secret_set"),
+        str(tmp_path_factory.mktemp("secret_set")),
+    )
+    with open(osp.join(terraform_module_dir, "terraform.tfvars.json"), "w") as fp:
+        json.dump(
+            {
+                "region": aws_region,
+                "role_arn": test_role_arn,
+                "secret_name": secret_name,
+                "secrets": secrets,
+            },
+            fp,
+            indent=4,
+        )
+    init_terraform_tf(terraform_module_dir)
+
+    with terraform_apply(
+        terraform_module_dir,
+        destroy_after=not keep_after,
+        json_output=True,
+        var_file="terraform.tfvars.json",
+    ) as tf_output:
+        LOG.info("%s", json.dumps(tf_output["secret_names"], indent=4))
+        shared = SharedSecrets(terraform_module_dir, tf_output)
+        # The probe role and the secret policies have just been created.
+        probe_role_client = get_secretsmanager_client_by_role(
+            probe_role_arn, boto3_session, aws_region
+        )
+        wait_for(
+            "the probe role reads a shared secret",
+            lambda: probe_role_client.get_secret_value(SecretId=shared.name("reader")),
+            retry_on=(ClientError,),
+        )
+        yield shared
+
+
+@pytest.fixture
+def restore_shared_secrets(shared_secrets, secretsmanager_client):
+    """
+    Put back the values of the shared secrets that a test changed.
+    """
+    yield
+    for key, value in shared_secrets.values.items():
+        secret_id = shared_secrets.name(key)
+        current = secretsmanager_client.get_secret_value(SecretId=secret_id)
+        if current["SecretString"] != value:
+            LOG.info("Restoring the value of %s", secret_id)
+            secretsmanager_client.put_secret_value(
+                SecretId=secret_id, SecretString=value
+            )
+
+
+@pytest.fixture
+def probe_role_client(restore_shared_secrets, probe_role, boto3_session, aws_region):
+    """
+    A Secrets Manager client of the probe role. The shared secrets it changes
+    are restored after the test.
+    """
+    return get_secretsmanager_client_by_role(
+        probe_role["role_arn"]["value"], boto3_session, aws_region
+    )
+
 
 @pytest.mark.parametrize(
     "aws_provider_version", ["~> 5.11", "~> 6.0"], ids=["aws-5", "aws-6"]
 )
 @pytest.mark.parametrize("probe_role_suffix", ["", "*"])
 def test_module(
+    terraform_root,
+    secret_name,
     probe_role,
     keep_after,
     test_role_arn,
@@ -60,12 +196,13 @@ def test_module(
     aws_region,
     aws_provider_version,
 ):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    terraform_module_dir = terraform_root("secret")
     probe_role_arn = probe_role["role_arn"]["value"]
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_name = "{secret_name}"
 
                 admins = [
                     "{probe_role_arn}{probe_role_suffix}"
@@ -82,14 +219,21 @@ def test_module(
 
 
 def test_module_no_access(
-    probe_role, keep_after, test_role_arn, aws_region, boto3_session
+    terraform_root,
+    secret_name,
+    probe_role,
+    keep_after,
+    test_role_arn,
+    aws_region,
+    boto3_session,
 ):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    terraform_module_dir = terraform_root("secret")
     probe_role_arn = probe_role["role_arn"]["value"]
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_name = "{secret_name}"
 
                 admins = [
                     "{test_role_arn}"
@@ -108,7 +252,7 @@ def test_module_no_access(
         )
         with pytest.raises(ClientError) as err:
             sm_client.get_secret_value(
-                SecretId="foo",
+                SecretId=secret_name,
             )
         assert err.type is ClientError
         # Example
@@ -125,134 +269,115 @@ def test_module_no_access(
 
 
 @pytest.mark.parametrize("probe_role_suffix", ["", "*"])
-def test_module_reads(
-    probe_role,
-    keep_after,
-    test_role_arn,
-    probe_role_suffix,
-    aws_region,
-    boto3_session,
-):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
-    probe_role_arn = probe_role["role_arn"]["value"]
-    with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
-        fp.write(dedent(f"""
-                region = "{aws_region}"
-                role_arn = "{test_role_arn}"
+def test_module_reads(shared_secrets, probe_role_client, probe_role_suffix):
+    secret_id = shared_secrets.name(f"reader{'-wildcard' if probe_role_suffix else ''}")
+
+    # Can read
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "bar"
+    )
+
+    # Can't write
+    with pytest.raises(ClientError) as err:
+        probe_role_client.put_secret_value(
+            SecretId=secret_id,
+            SecretString="barbar",
+        )
+    assert err.type is ClientError
+    assert err.value.response["Error"]["Code"] == "AccessDeniedException"
 
-                admins = [
-                    "{test_role_arn}"
-                ]
-                readers = [
-                    "{probe_role_arn}{probe_role_suffix}"
-                ]
-                """))
-    init_terraform_tf(terraform_module_dir)
 
-    with terraform_apply(
-        terraform_module_dir,
-        destroy_after=not keep_after,
-        json_output=True,
-    ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
-        sm_client = get_secretsmanager_client_by_role(
-            probe_role["role_arn"]["value"], boto3_session, aws_region
-        )
-        # Can read
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == "bar"
+@pytest.mark.parametrize("probe_role_suffix", ["", "*"])
+def test_module_writes(shared_secrets, probe_role_client, probe_role_suffix):
+    secret_id = shared_secrets.name(f"writer{'-wildcard' if probe_role_suffix else ''}")
+
+    # Can read
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "bar"
+    )
+
+    # Can write
+    probe_role_client.put_secret_value(
+        SecretId=secret_id,
+        SecretString="barbar",
+    )
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "barbar"
+    )
+
+    # Can't delete
+    with pytest.raises(ClientError) as err:
+        probe_role_client.delete_secret(
+            SecretId=secret_id, ForceDeleteWithoutRecovery=True
         )
-
-        # Can't write
-        with pytest.raises(ClientError) as err:
-            sm_client.put_secret_value(
-                SecretId="foo",
-                SecretString="barbar",
-            )
-        assert err.type is ClientError
-        assert err.value.response["Error"]["Code"] == "AccessDeniedException"
+    assert err.type is ClientError
+    assert err.value.response["Error"]["Code"] == "AccessDeniedException"
+
+
+def test_module_secret_value(shared_secrets, probe_role_client):
+    secret_id = shared_secrets.name("generated")
+    secret_value_0 = shared_secrets.value("generated")
+
+    # Can read
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == secret_value_0
+    )
+
+    # Overwrite the secret and make sure Terraform reverts the secret
+    probe_role_client.put_secret_value(
+        SecretId=secret_id,
+        SecretString="barbar",
+    )
+    shared_secrets.reapply()
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == secret_value_0
+    )
 
 
-@pytest.mark.parametrize("probe_role_suffix", ["", "*"])
-def test_module_writes(
-    probe_role,
+@pytest.mark.parametrize(
+    "read_mode, secret_value, expected",
+    [
+        ("external", "bar", "bar"),
+        ("native", "bar", "bar"),
+        ("native", None, None),
+        ("fingerprint", "bar", None),
+        ("none", "bar", None),
+    ],
+)
+def test_module_secret_value_read_mode(
+    terraform_root,
+    secret_name,
     keep_after,
     test_role_arn,
-    probe_role_suffix,
     aws_region,
-    boto3_session,
+    read_mode,
+    secret_value,
+    expected,
 ):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
-    probe_role_arn = probe_role["role_arn"]["value"]
-    with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
-        fp.write(dedent(f"""
-                region = "{aws_region}"
-                role_arn = "{test_role_arn}"
-
-                admins = [
-                    "{test_role_arn}"
-                ]
-                writers = [
-                    "{probe_role_arn}{probe_role_suffix}"
-                ]
-                """))
-    init_terraform_tf(terraform_module_dir)
-
-    with terraform_apply(
-        terraform_module_dir,
-        destroy_after=not keep_after,
-        json_output=True,
-    ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
-        sm_client = get_secretsmanager_client_by_role(
-            probe_role["role_arn"]["value"], boto3_session, aws_region
-        )
-
-        # Can read
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == "bar"
-        )
-
-        # Can write
-        sm_client.put_secret_value(
-            SecretId="foo",
-            SecretString="barbar",
-        )
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == "barbar"
-        )
-
-        # Can't delete
-        with pytest.raises(ClientError) as err:
-            sm_client.delete_secret(SecretId="foo", ForceDeleteWithoutRecovery=True)
-        assert err.type is ClientError
-        assert err.value.response["Error"]["Code"] == "AccessDeniedException"
-
-
-def test_module_secret_value(
-    probe_role, keep_after, test_role_arn, aws_region, boto3_session
-):
-    probe_role_arn = probe_role["role_arn"]["value"]
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    terraform_module_dir = terraform_root("secret")
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_name = "{secret_name}"
                 admins = []
-
-                writers = [
-                    "{probe_role_arn}"
-                ]
-                secret_value = "generate"
+                secret_value = {json.dumps(secret_value)}
+                secret_value_read_mode = "{read_mode}"
                 """))
     init_terraform_tf(terraform_module_dir)
 
@@ -261,113 +386,40 @@ def test_module_secret_value(
         destroy_after=not keep_after,
         json_output=True,
     ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
+        # terraform output -json leaves null outputs out.
+        assert tf_output.get("secret_value", {}).get("value") == expected
+        fingerprint = tf_output.get("secret_version_fingerprint", {}).get("value")
+        assert (fingerprint is not None) == (read_mode == "fingerprint")
 
-        secret_value_0 = tf_output["secret_value"]["value"]
-        sm_client = get_secretsmanager_client_by_role(
-            probe_role_arn, boto3_session, aws_region
-        )
-        # Can read
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == secret_value_0
-        )
 
-        # Overwrite the secret and make sure Terraform reverts the secret
-        sm_client.put_secret_value(
-            SecretId="foo",
-            SecretString="barbar",
-        )
-
-        with terraform_apply(
-            terraform_module_dir,
-            destroy_after=not keep_after,
-            json_output=True,
-        ):
-            sm_client = get_secretsmanager_client_by_role(
-                probe_role_arn, boto3_session, aws_region
-            )
-            assert (
-                sm_client.get_secret_value(
-                    SecretId="foo",
-                )["SecretString"]
-                == secret_value_0
-            )
-
-
-def test_module_external_value(
-    probe_role, keep_after, test_role_arn, aws_region, boto3_session
-):
+def test_module_external_value(shared_secrets, probe_role_client):
     """
     Create a secret, set the value outside of Terraform
     """
-    probe_role_arn = probe_role["role_arn"]["value"]
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
-    with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
-        fp.write(dedent(f"""
-                region = "{aws_region}"
-                role_arn = "{test_role_arn}"
-                admins = []
-
-                writers = [
-                    "{probe_role_arn}"
-                ]
-                secret_value = null
-                """))
-    init_terraform_tf(terraform_module_dir)
-    # Ensure destroy
-    with terraform_apply(
-        terraform_module_dir,
-        destroy_after=True,
-        json_output=True,
-    ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
-
-    # The test itself
-    with terraform_apply(
-        terraform_module_dir,
-        destroy_after=not keep_after,
-        json_output=True,
-    ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
-
-        # secret_value_0 = tf_output["secret_value"]["value"]
-        sm_client = get_secretsmanager_client_by_role(
-            probe_role_arn, boto3_session, aws_region
-        )
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == "NoValue"
-        )
-
-        # Overwrite the secret and make sure Terraform reverts the secret
-        sm_client.put_secret_value(
-            SecretId="foo",
-            SecretString="barbar",
-        )
-
-        with terraform_apply(
-            terraform_module_dir,
-            destroy_after=not keep_after,
-            json_output=True,
-        ):
-            sm_client = get_secretsmanager_client_by_role(
-                probe_role_arn, boto3_session, aws_region
-            )
-            assert (
-                sm_client.get_secret_value(
-                    SecretId="foo",
-                )["SecretString"]
-                == "barbar"
-            )
-
-
-def test_module_name_prefix(keep_after, test_role_arn, aws_region):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    secret_id = shared_secrets.name("external")
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "NoValue"
+    )
+
+    # Overwrite the secret and make sure Terraform doesn't revert the secret
+    probe_role_client.put_secret_value(
+        SecretId=secret_id,
+        SecretString="barbar",
+    )
+    shared_secrets.reapply()
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "barbar"
+    )
+
+
+def test_module_name_prefix(terraform_root, keep_after, test_role_arn, aws_region):
+    terraform_module_dir = terraform_root("secret")
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
@@ -389,13 +441,20 @@ def test_module_name_prefix(keep_after, test_role_arn, aws_region):
 
 
 def test_module_tags(
-    boto3_session, secretsmanager_client, keep_after, test_role_arn, aws_region
+    terraform_root,
+    secret_name,
+    boto3_session,
+    secretsmanager_client,
+    keep_after,
+    test_role_arn,
+    aws_region,
 ):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    terraform_module_dir = terraform_root("secret")
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_name = "{secret_name}"
                 tags = {{
                     tag1: "value1"
                 }}
@@ -451,7 +510,13 @@ def test_module_tags(
 
 
 def test_module_null_secret_value_output(
-    probe_role, keep_after, test_role_arn, aws_region, boto3_session
+    terraform_root,
+    secret_name,
+    probe_role,
+    keep_after,
+    test_role_arn,
+    aws_region,
+    boto3_session,
 ):
     """
     Test that when secret_value input is null:
@@ -459,11 +524,12 @@ def test_module_null_secret_value_output(
     2. After setting value via AWS SDK, output reflects the new value
     """
     probe_role_arn = probe_role["role_arn"]["value"]
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    terraform_module_dir = terraform_root("secret")
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_name = "{secret_name}"
                 admins = []
 
                 writers = [
@@ -492,7 +558,7 @@ def test_module_null_secret_value_output(
             probe_role_arn, boto3_session, aws_region
         )
         sm_client.put_secret_value(
-            SecretId="foo",
+            SecretId=secret_name,
             SecretString="externally-set-value",
         )
 
@@ -514,7 +580,9 @@ def test_module_null_secret_value_output(
             )
 
 
-def test_module_computed_reader_arn(keep_after, test_role_arn, aws_region):
+def test_module_computed_reader_arn(
+    terraform_root, secret_name, keep_after, test_role_arn, aws_region
+):
     """
     Regression test for #49.
 
@@ -523,11 +591,12 @@ def test_module_computed_reader_arn(keep_after, test_role_arn, aws_region):
     apply successfully and fall back to the AWS-managed key, instead of failing with
     "Invalid count argument" on module.cross_account_key.
     """
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret_computed_arn")
+    terraform_module_dir = terraform_root("secret_computed_arn")
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_name = "{secret_name}-computed-arn"
                 """))
     init_terraform_tf(terraform_module_dir)
 
@@ -545,25 +614,78 @@ def test_module_computed_reader_arn(keep_after, test_role_arn, aws_region):
         assert not tf_output.get("kms_key_id", {}).get("value")
 
 
-def test_module_duplicate_role(
-    probe_role, keep_after, test_role_arn, aws_region, boto3_session
+def test_module_duplicate_role(shared_secrets, probe_role_client):
+    """
+    A role listed both in readers and in writers keeps the permissions of a
+    writer: the deny of writes to readers doesn't apply to it.
+    """
+    secret_id = shared_secrets.name("duplicate")
+
+    # Can read
+    probe_role_client.describe_secret(SecretId=secret_id)
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "bar"
+    )
+
+    # A reader only can't write...
+    with pytest.raises(ClientError) as err:
+        probe_role_client.put_secret_value(
+            SecretId=shared_secrets.name("reader"),
+            SecretString="barbar",
+        )
+    assert err.value.response["Error"]["Code"] == "AccessDeniedException"
+
+    # ...but a reader that is also a writer can
+    probe_role_client.put_secret_value(
+        SecretId=secret_id,
+        SecretString="barbar",
+    )
+    assert (
+        probe_role_client.get_secret_value(
+            SecretId=secret_id,
+        )["SecretString"]
+        == "barbar"
+    )
+
+    # Can't delete
+    with pytest.raises(ClientError) as err:
+        probe_role_client.delete_secret(
+            SecretId=secret_id, ForceDeleteWithoutRecovery=True
+        )
+    assert err.value.response["Error"]["Code"] == "AccessDeniedException"
+
+
+@pytest.mark.parametrize("read_mode", ["external", "native"])
+def test_module_bulk(
+    terraform_root,
+    secret_name,
+    probe_role,
+    keep_after,
+    test_role_arn,
+    aws_region,
+    boto3_session,
+    read_mode,
 ):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret")
+    terraform_module_dir = terraform_root("secrets_bulk")
     probe_role_arn = probe_role["role_arn"]["value"]
+    names = [f"{secret_name}-bulk-{i}" for i in range(3)]
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
                 region = "{aws_region}"
                 role_arn = "{test_role_arn}"
+                secret_names = {json.dumps(names)}
+                secret_values = {json.dumps({names[0]: "bar0", names[1]: "bar1"})}
 
                 admins = [
                     "{test_role_arn}"
                 ]
-                writers = [
-                    "{probe_role_arn}"
-                ]
                 readers = [
                     "{probe_role_arn}"
                 ]
+                secret_value_read_mode = "{read_mode}"
                 """))
     init_terraform_tf(terraform_module_dir)
 
@@ -572,33 +694,25 @@ def test_module_duplicate_role(
         destroy_after=not keep_after,
         json_output=True,
     ) as tf_output:
-        LOG.info("%s", json.dumps(tf_output, indent=4))
+        LOG.info("%s", json.dumps(tf_output["secrets"], indent=4))
+        secrets = tf_output["secrets"]["value"]
+        assert sorted(secrets) == names
+        assert secrets[names[0]]["name"] == names[0]
+        assert secrets[names[0]]["reference"]["version_id"]
+        assert secrets[names[2]]["reference"]["version_id"] is None
+        assert tf_output["secret_values"]["value"] == {
+            names[0]: "bar0",
+            names[1]: "bar1",
+            names[2]: None,
+        }
+
+        # Every secret has its own policy
         sm_client = get_secretsmanager_client_by_role(
-            probe_role["role_arn"]["value"], boto3_session, aws_region
-        )
-
-        # Can read
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == "bar"
-        )
-
-        # Can write
-        sm_client.put_secret_value(
-            SecretId="foo",
-            SecretString="barbar",
-        )
-        assert (
-            sm_client.get_secret_value(
-                SecretId="foo",
-            )["SecretString"]
-            == "barbar"
+            probe_role_arn, boto3_session, aws_region
         )
-
-        # Can't delete
+        for i in range(2):
+            secret = sm_client.get_secret_value(SecretId=names[i])
+            assert secret["SecretString"] == f"bar{i}"
         with pytest.raises(ClientError) as err:
-            sm_client.delete_secret(SecretId="foo", ForceDeleteWithoutRecovery=True)
-        assert err.type is ClientError
+            sm_client.put_secret_value(SecretId=names[0], SecretString="baz")
         assert err.value.response["Error"]["Code"] == "AccessDeniedException"
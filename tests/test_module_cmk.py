@@ -1,16 +1,15 @@
 import json
 import os
-import time
 from os import path as osp
 from textwrap import dedent
 
 import boto3
 import pytest
+from botocore.exceptions import ClientError
 from infrahouse_core.aws.secretsmanager import Secret
-from infrahouse_core.timeout import timeout
 from pytest_infrahouse import terraform_apply
 
-from tests.conftest import LOG, TERRAFORM_ROOT_DIR
+from tests.conftest import LOG, wait_for
 from tests.test_module import init_terraform_tf
 
 CONSUMER_ROLE_ARN = os.environ.get(
@@ -32,12 +31,15 @@ def _assume_role_session(boto3_session, role_arn, region):
 
 
 @pytest.mark.manual
-def test_module_cmk(keep_after, test_role_arn, aws_region, boto3_session):
-    terraform_module_dir = osp.join(TERRAFORM_ROOT_DIR, "secret_cmk")
+def test_module_cmk(
+    terraform_root, secret_name, keep_after, test_role_arn, aws_region, boto3_session
+):
+    terraform_module_dir = terraform_root("secret_cmk")
     with open(osp.join(terraform_module_dir, "terraform.tfvars"), "w") as fp:
         fp.write(dedent(f"""
             region            = "{aws_region}"
             role_arn          = "{test_role_arn}"
+            secret_name       = "{secret_name}-cmk"
             consumer_role_arn = "{CONSUMER_ROLE_ARN}"
         """))
     init_terraform_tf(terraform_module_dir)
@@ -56,9 +58,15 @@ def test_module_cmk(keep_after, test_role_arn, aws_region, boto3_session):
             region=aws_region,
             session=consumer_session,
         )
-        assert secret.value == "bar"
+        # The consumer may read only after the key policy grants reach KMS.
+        wait_for(
+            "the consumer role reads the secret",
+            lambda: secret.value == "bar",
+            retry_on=(ClientError,),
+        )
         secret.update("barbar")
-        with timeout(5):
-            while secret.value != "barbar":
-                time.sleep(1)
-        assert secret.value == "barbar"
+        wait_for(
+            "the consumer role reads the updated secret",
+            lambda: secret.value == "barbar",
+            timeout=30,
+        )
@@ -0,0 +1,168 @@
+"""
+Who the secret policy of modules/secret-policy allows to do what, without AWS.
+
+The policy documents are rendered by Terraform, which needs no AWS access for
+them, and evaluated here the way Secrets Manager evaluates a resource policy:
+an explicit deny wins over an allow. Part of the offline tier:
+``pytest -m "not aws"``.
+"""
+
+import json
+import shutil
+from fnmatch import fnmatchcase
+from os import path as osp
+
+import pytest
+from pytest_infrahouse import terraform_apply
+
+from tests.conftest import (
+    REPO_ROOT,
+    TERRAFORM_ROOT_DIR,
+    copy_terraform_root,
+    terraform_init,
+)
+
+ACCOUNT = "123456789012"
+CALLER = f"arn:aws:iam::{ACCOUNT}:role/terraform"
+ADMIN = f"arn:aws:iam::{ACCOUNT}:role/admin"
+WRITER = f"arn:aws:iam::{ACCOUNT}:role/writer"
+READER = f"arn:aws:iam::{ACCOUNT}:role/reader"
+SSO_READER = (
+    f"arn:aws:iam::{ACCOUNT}:role/aws-reserved/sso.amazonaws.com/"
+    "AWSReservedSSO_ReadOnly_0123456789abcdef"
+)
+ANALYZER = (
+    f"arn:aws:iam::{ACCOUNT}:role/aws-service-role/"
+    "access-analyzer.amazonaws.com/AWSServiceRoleForAccessAnalyzer"
+)
+STRANGER = f"arn:aws:iam::{ACCOUNT}:role/stranger"
+
+CASES = {
+    "full": {
+        "caller_role_arn": CALLER,
+        "access_analyzer_role_arns": [ANALYZER],
+        "admins": [ADMIN],
+        "writers": [WRITER],
+        "readers": [READER, WRITER, SSO_READER.rsplit("_", 1)[0] + "_*"],
+    },
+    "caller_only": {
+        "caller_role_arn": CALLER,
+    },
+}
+
+READ = "secretsmanager:GetSecretValue"
+DESCRIBE = "secretsmanager:DescribeSecret"
+WRITE = "secretsmanager:PutSecretValue"
+LIST = "secretsmanager:BatchGetSecretValue"
+DELETE = "secretsmanager:DeleteSecret"
+PUT_POLICY = "secretsmanager:PutResourcePolicy"
+TAG = "secretsmanager:TagResource"
+
+
+@pytest.fixture(scope="session")
+def policies(tmp_path_factory):
+    if shutil.which("terraform") is None:
+        pytest.skip("terraform is not installed")
+
+    terraform_module_dir = copy_terraform_root(
+        osp.join(REPO_ROOT, TERRAFORM_ROOT_DIR, "secret_policy"),
+        str(tmp_path_factory.mktemp("secret_policy")),
+    )
+    with open(osp.join(terraform_module_dir, "terraform.tfvars.json"), "w") as fp:
+        json.dump({"cases": CASES}, fp)
+    terraform_init(terraform_module_dir)
+
+    with terraform_apply(
+        terraform_module_dir,
+        destroy_after=True,
+        json_output=True,
+        var_file="terraform.tfvars.json",
+    ) as tf_output:
+        yield tf_output["policies"]["value"]
+
+
+def arn_like(arn, pattern):
+    """
+    Match an ARN to an ArnLike pattern: each of the six fields separately,
+    with * and ? as wildcards.
+    """
+    arn_fields = arn.split(":", 5)
+    pattern_fields = pattern.split(":", 5)
+    return len(arn_fields) == len(pattern_fields) and all(
+        fnmatchcase(field, part.replace("[", "[[]"))
+        for field, part in zip(arn_fields, pattern_fields)
+    )
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _applies(statement, principal_arn, action):
+    principals = _as_list(statement.get("Principal", {}).get("AWS", []))
+    if "*" not in principals and principal_arn not in principals:
+        return False
+    if not any(
+        fnmatchcase(action, pattern) for pattern in _as_list(statement["Action"])
+    ):
+        return False
+
+    for test, variables in statement.get("Condition", {}).items():
+        patterns = _as_list(variables["aws:PrincipalArn"])
+        matched = any(arn_like(principal_arn, pattern) for pattern in patterns)
+        if test == "ArnLike" and not matched:
+            return False
+        if test == "ArnNotLike" and matched:
+            return False
+    return True
+
+
+def evaluate(policy, principal_arn, action):
+    """
+    Return "Deny" if a statement denies the action to the principal, "Allow"
+    if one allows it, otherwise None.
+    """
+    effects = {
+        statement.get("Effect", "Allow")
+        for statement in policy["Statement"]
+        if _applies(statement, principal_arn, action)
+    }
+    if "Deny" in effects:
+        return "Deny"
+    return "Allow" if "Allow" in effects else None
+
+
+@pytest.mark.parametrize(
+    "principal, allowed, denied",
+    [
+        (CALLER, [READ, WRITE, DELETE, PUT_POLICY, TAG], []),
+        (ADMIN, [READ, WRITE, LIST, DELETE, PUT_POLICY, TAG], []),
+        (WRITER, [READ, DESCRIBE, WRITE, LIST], [DELETE, PUT_POLICY, TAG]),
+        (READER, [READ, DESCRIBE], [WRITE, LIST, DELETE, PUT_POLICY, TAG]),
+        (SSO_READER, [READ, DESCRIBE], [WRITE, LIST, DELETE, PUT_POLICY]),
+        (ANALYZER, [DESCRIBE], [READ, WRITE, DELETE]),
+        (STRANGER, [], [READ, DESCRIBE, WRITE, LIST, DELETE, PUT_POLICY, TAG]),
+    ],
+    ids=["caller", "admin", "writer", "reader", "sso-reader", "analyzer", "stranger"],
+)
+def test_policy(policies, principal, allowed, denied):
+    policy = policies["full"]
+    assert {action: evaluate(policy, principal, action) for action in allowed} == {
+        action: "Allow" for action in allowed
+    }
+    assert {action: evaluate(policy, principal, action) for action in denied} == {
+        action: "Deny" for action in denied
+    }
+
+
+def test_policy_caller_only(policies):
+    policy = policies["caller_only"]
+    assert evaluate(policy, CALLER, READ) == "Allow"
+    for principal in (ADMIN, WRITER, READER, ANALYZER):
+        assert evaluate(policy, principal, READ) == "Deny"
+
+
+def test_arn_like():
+    assert arn_like(SSO_READER, SSO_READER.rsplit("_", 1)[0] + "_*")
+    assert arn_like(READER, "arn:aws:iam::*:role/reader")
+    assert not arn_like(READER, f"arn:aws:iam::{ACCOUNT}:role/read")
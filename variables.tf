@@ -39,6 +39,84 @@ variable "secret_description" {
   type        = string
 }
 
+variable "secret_reader" {
+  description = <<-EOT
+    Which implementation of the secret reader the external data source runs.
+    "boto3" runs assets/get_secret.py. "stdlib" runs assets/get_secret_lite.py,
+    which signs requests itself and doesn't import boto3, so it starts several
+    times faster. It supports credentials from environment variables, static keys
+    in shared files, ECS and EC2 instance metadata, and falls back to the boto3
+    reader for any other credential source. It doesn't support
+    batch_secret_reads or cache_secret_values; with either of them set, it
+    hands every read to the boto3 reader.
+  EOT
+  type        = string
+  default     = "boto3"
+
+  validation {
+    condition     = contains(["boto3", "stdlib"], var.secret_reader)
+    error_message = "secret_reader must be either \"boto3\" or \"stdlib\". Got: ${var.secret_reader}"
+  }
+}
+
+variable "secret_value_read_mode" {
+  description = <<-EOT
+    How the module reads the secret value for the secret_value output.
+    "external" runs the secret reader script (see secret_reader) as the caller
+    role. "native" uses the aws_secretsmanager_secret_version data source with
+    the AWS provider's credentials and spawns no process. "fingerprint" runs
+    the reader script for the id of the current version only, so the state
+    keeps a fingerprint of constant size instead of the value; secret_value is
+    then always null. "none" doesn't read the value at all; secret_value is
+    then always null.
+  EOT
+  type        = string
+  default     = "external"
+
+  validation {
+    condition     = contains(["external", "native", "fingerprint", "none"], var.secret_value_read_mode)
+    error_message = "secret_value_read_mode must be one of \"external\", \"native\", \"fingerprint\" or \"none\". Got: ${var.secret_value_read_mode}"
+  }
+}
+
+variable "secret_reader_client_config" {
+  description = <<-EOT
+    Settings of the AWS clients the secret reader uses. Unset fields keep the
+    defaults. STS is called in the secret's region unless sts_regional_endpoint
+    is false. retry_mode is one of "legacy", "standard" or "adaptive". Timeouts
+    are in seconds. The endpoint URLs point the reader at e.g. interface VPC
+    endpoints; use_fips_endpoint switches to the FIPS endpoints. rate_limit
+    caps the requests per second to each service and region, shared by all
+    readers on the host, and backs off when AWS throttles.
+  EOT
+  type = object({
+    sts_regional_endpoint       = optional(bool)
+    retry_mode                  = optional(string)
+    max_attempts                = optional(number)
+    connect_timeout             = optional(number)
+    read_timeout                = optional(number)
+    max_pool_connections        = optional(number)
+    use_fips_endpoint           = optional(bool)
+    secretsmanager_endpoint_url = optional(string)
+    sts_endpoint_url            = optional(string)
+    rate_limit                  = optional(number)
+  })
+  default = {}
+
+  validation {
+    condition = contains(
+      ["legacy", "standard", "adaptive"],
+      coalesce(var.secret_reader_client_config.retry_mode, "standard")
+    )
+    error_message = "secret_reader_client_config.retry_mode must be one of \"legacy\", \"standard\" or \"adaptive\"."
+  }
+
+  validation {
+    condition     = coalesce(var.secret_reader_client_config.rate_limit, 1) > 0
+    error_message = "secret_reader_client_config.rate_limit must be greater than zero."
+  }
+}
+
 variable "secret_value" {
   description = "Optional value of the secret."
   type        = string
@@ -79,6 +157,105 @@ variable "kms_key_id" {
   default     = null
 }
 
+variable "batch_secret_reads" {
+  description = <<-EOT
+    Whether assets/get_secret.py processes should read secret values together.
+    Processes that run within a short window and use the same role coordinate
+    through a spool directory next to the credentials cache: one of them
+    fetches all pending secrets with secretsmanager:BatchGetSecretValue,
+    20 secrets per call, and hands the values to the others.
+    Worth enabling in root modules with many instances of this module.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "cache_credentials" {
+  description = <<-EOT
+    Whether assets/get_secret.py may cache assumed-role credentials on disk.
+    The cache lives in a per-user directory ($XDG_CACHE_HOME/infrahouse-secret,
+    or $INFRAHOUSE_SECRET_CACHE_DIR if set) and lets all module instances in a
+    plan share one sts:AssumeRole result instead of calling STS once per instance.
+    It also remembers which identity each access key belongs to, so
+    sts:GetCallerIdentity runs once per set of credentials rather than per read.
+    Set to false to call STS on every read.
+  EOT
+  type        = bool
+  default     = true
+}
+
+variable "cache_secret_values" {
+  description = <<-EOT
+    Whether assets/get_secret.py may keep the last value of the secret on disk,
+    encrypted, and download it again only when the AWSCURRENT version changes.
+    Each read then costs a secretsmanager:DescribeSecret call, plus GetSecretValue
+    only after the value changed. Values are sealed with Fernet, which needs the
+    cryptography Python package and a key in $INFRAHOUSE_SECRET_CACHE_KEY;
+    without either, values aren't kept on disk or in shared memory.
+  EOT
+  type        = bool
+  default     = false
+}
+
+variable "secret_value_memo_ttl" {
+  description = <<-EOT
+    Seconds for which a read of the secret is shared with other readers of the
+    same secret, role and version, e.g. duplicate module instances or plans
+    of cloned environments running side by side. Concurrent readers wait for
+    the first one instead of calling AWS themselves. Results are sealed like
+    cached values (see cache_secret_values), so sharing needs the cryptography
+    Python package and $INFRAHOUSE_SECRET_CACHE_KEY, and kept by
+    secret_cache_backend until they expire.
+    0 (default) turns sharing off.
+  EOT
+  type        = number
+  default     = 0
+
+  validation {
+    condition     = var.secret_value_memo_ttl >= 0
+    error_message = "secret_value_memo_ttl must not be negative."
+  }
+}
+
+variable "secret_cache_backend" {
+  description = <<-EOT
+    Where the secret reader keeps sealed values for cache_secret_values and
+    secret_value_memo_ttl: "file" (default) in the per-user cache directory,
+    or "shared_memory" in a POSIX shared memory segment that never reaches a
+    disk. Least recently used entries
+    are evicted above max_entries (default 1024) or max_bytes (default 4 MiB).
+    ttl is the most seconds a cached value is kept; unset keeps values until
+    their version changes.
+  EOT
+  type = object({
+    type        = optional(string, "file")
+    max_entries = optional(number)
+    max_bytes   = optional(number)
+    ttl         = optional(number)
+  })
+  default = {}
+
+  validation {
+    condition     = contains(["file", "shared_memory"], var.secret_cache_backend.type)
+    error_message = "secret_cache_backend.type must be either \"file\" or \"shared_memory\". Got: ${var.secret_cache_backend.type}"
+  }
+}
+
+variable "use_secret_daemon" {
+  description = <<-EOT
+    Whether the secret reader should forward requests to a background daemon
+    over a Unix socket. The daemon keeps warm Secrets Manager clients and
+    connection pools per region and role, so module instances skip the boto3
+    import and the TLS handshake. The first reader starts the daemon, and the
+    daemon exits after 5 minutes without requests. Readers use the direct path
+    whenever the daemon isn't available. Changed AWS_* variables, credentials
+    or config files, or a new SSO login start a new daemon. Not supported on
+    Windows.
+  EOT
+  type        = bool
+  default     = false
+}
+
 variable "create_cross_account_cmk" {
   description = <<-EOT
     Whether to create a customer-managed KMS key for cross-account secret access.